@@ -1,8 +1,10 @@
 """Debugging and fixing"""
+import atexit
+import os
 import sys
 import traceback
+from queue import Queue, Empty
 from threading import Thread
-from time import sleep
 
 from colorama import init
 
@@ -63,14 +65,37 @@ class MessageReceiver:
     def error(self, message):
         raise NotImplementedError()
 
+    def receive(self, messages):
+        """Receives a batch of Message records, override to consume them directly"""
+        for x in messages:
+            x.send(self)
+
+
+class MessageLog(MessageReceiver):
+    """Collects the messages, to be replayed by another AutoFix"""
+    def __init__(self):
+        self.messages = []
+
+    def receive(self, messages):
+        self.messages.extend(messages)
+
 
 class Message:
+    LEVEL = None
+
     def __init__(self, message):
         self.message = message
 
+    def format(self):
+        """Formats the message for the output sink"""
+        raise NotImplementedError()
+
     def send(self, pipe):
         raise NotImplementedError()
 
+    def as_record(self):
+        return {'level': self.LEVEL, 'message': self.message}
+
 
 class AutoFix:
     # Fix Level
@@ -88,55 +113,96 @@ class AutoFix:
     ERROR_LEVELS = (bcolors.ENDC, bcolors.FAIL, bcolors.FAIL, bcolors.OKBLUE, bcolors.OKBLUE, bcolors.BOLD)
     RESULTS = ('NONE', 'ERROR', 'WARN', 'CHECK', 'SUCCESS')
 
+    MAX_BATCH = 1000  # most messages written at once
+
     class Info(Message):
+        LEVEL = 'INFO'
+
+        def format(self):
+            return self.message + '\n'
+
         def send(self, pipe):
-            message = self.message
-            print(message)
-            if pipe:
-                pipe.info(message)
+            pipe.info(self.message)
 
     class Warn(Message):
+        LEVEL = 'WARN'
+
+        def format(self):
+            return f'{bcolors.FAIL}WARN: {self.message}{bcolors.ENDC}\n'
+
         def send(self, pipe):
-            message = self.message
-            print(f'{bcolors.FAIL}WARN: {message}{bcolors.ENDC}')
-            if pipe:
-                pipe.warn(message)
+            pipe.warn(self.message)
 
     class Error(Message):
+        LEVEL = 'ERROR'
+
+        def format(self):
+            return f'{bcolors.FAIL}ERROR: {self.message}{bcolors.ENDC}\n'
+
         def send(self, pipe):
-            message = self.message
-            print(f'{bcolors.FAIL}ERROR: {message}{bcolors.ENDC}')
-            if pipe:
-                pipe.error(message)
+            pipe.error(self.message)
 
     def __init__(self, fix_level=3, loudness=3):
         if self.__AUTO_FIXER: raise RuntimeError('Autofixer already initialized')
         self.loudness = loudness
         self.fix_level = fix_level
-        self.queue = []
-        self.is_running = True
-        self.pipe = None  # if set, output is sent to the pipe, must implement info warn and error.
-        self.thread = Thread(target=self.run)
+        self.queue = Queue()
+        self.pipe = None  # if set, output is sent to the pipe, must implement MessageReceiver
+        self.sink = None  # text stream written to, sys.stdout if None
+        self.thread = Thread(target=self.run, daemon=True)
         AutoFix.__AUTO_FIXER = self
         self.thread.start()
 
     @staticmethod
     def quit():
+        """Writes the remaining messages and stops the output thread"""
         a = AutoFix.__AUTO_FIXER
         if a is not None:
-            a.is_running = False
-            a.thread.join()
             AutoFix.__AUTO_FIXER = None
+            a.queue.put(None)
+            a.thread.join()
 
     def run(self):
-        while self.is_running:
-            sleep(0.01)
-            if len(self.queue):
-                message = self.queue.pop(0)
-                message.send(self.pipe)
+        queue = self.queue
+        running = True
+        while running:
+            batch = [queue.get()]
+            try:
+                while len(batch) < self.MAX_BATCH:
+                    batch.append(queue.get_nowait())
+            except Empty:
+                pass
+            count = len(batch)
+            try:
+                if None in batch:  # quit, drop anything queued after
+                    running = False
+                    batch = batch[:batch.index(None)]
+                if batch:
+                    self.write(batch)
+            except Exception:
+                sys.__stderr__.write('Failed to write messages\n' + traceback.format_exc())
+            finally:
+                for i in range(count):
+                    queue.task_done()
+
+    def flush(self):
+        """Blocks until the queued messages are written"""
+        self.queue.join()
+
+    def write(self, messages):
+        sink = self.sink if self.sink is not None else sys.stdout
+        sink.write(''.join([x.format() for x in messages]))
+        sink.flush()
+        pipe = self.pipe
+        if pipe:
+            if hasattr(pipe, 'receive'):
+                pipe.receive(messages)
+            else:
+                for x in messages:
+                    x.send(pipe)
 
     def enqueue(self, message):
-        self.queue.append(message)
+        self.queue.put(message)
 
     @staticmethod
     def get(fixe_level=3, loudness=3):
@@ -186,7 +252,7 @@ class AutoFix:
             s = traceback.format_exception(exc_type, exc_value, exc_tb, 3)
         self.enqueue(self.Error(''.join(s)))
         if shutdown:
-            self.thread.join(5)
+            self.quit()
             sys.exit(-1)
 
     # def should_fix(self, bug):
@@ -244,3 +310,13 @@ class AutoFix:
 
     def set_loudness(self, level_str):
         self.loudness = self.get_level(level_str)
+
+
+def _reset_in_child():
+    """The output thread doesn't survive forking, so the child starts its own"""
+    AutoFix._AutoFix__AUTO_FIXER = None
+
+
+atexit.register(AutoFix.quit)
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_in_child)
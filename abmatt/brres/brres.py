@@ -3,14 +3,16 @@
 #   Brres Class
 # --------------------------------------------------------
 import os
+import weakref
 
 from abmatt.autofix import AutoFix, Bug
-from abmatt.brres.lib.binfile import BinFile
+from abmatt.brres.lib.binfile import BinFile, unmap_data
 from abmatt.brres.lib.matching import MATCHING
 from abmatt.brres.lib.node import Clipable, Packable
 from abmatt.brres.lib.packing.pack_brres import PackBrres
 from abmatt.brres.lib.unpacking.unpack_brres import UnpackBrres
 from abmatt.brres.mdl0 import Mdl0
+from abmatt.brres.subfile import get_payload_size
 from abmatt.brres.tex0 import Tex0
 from abmatt.image_converter import ImgConverter
 
@@ -21,8 +23,12 @@ class Brres(Clipable, Packable):
     MAGIC = 'bres'
     OVERWRITE = False
     DESTINATION = None
-    OPEN_FILES = []  # reference to active files
+    OPEN_FILES = weakref.WeakValueDictionary()  # id to open file, released once unreferenced
+    FILES_BY_PATH = weakref.WeakValueDictionary()  # absolute path to open file
+    TEXTURES_BY_NAME = {}  # texture name to weak {id of open file: tex0}
     REMOVE_UNUSED_TEXTURES = False
+    MEMORY_MAP = False  # memory map files when reading, subfile data is then kept as views into the file
+    LAZY_LOAD = False   # unpack subfiles the first time they are used
 
     def __init__(self, name, parent=None, readFile=True):
         """
@@ -44,7 +50,8 @@ class Brres(Clipable, Packable):
         self.scn0 = []
         self.shp0 = []
         self.clr0 = []
-        binfile = BinFile(name) if readFile else None
+        binfile = BinFile(name, use_mmap=self.MEMORY_MAP) if readFile else None
+        self.mapped_file = name if binfile is not None and binfile.is_mapped else None
         super(Brres, self).__init__(name, parent, binfile)
         self.add_open_file(self)
         if binfile:
@@ -55,20 +62,53 @@ class Brres(Clipable, Packable):
 
     @staticmethod
     def add_open_file(file):
-        Brres.OPEN_FILES.append(file)
+        Brres.OPEN_FILES[id(file)] = file
+        Brres.FILES_BY_PATH.setdefault(os.path.abspath(file.name), file)
+
+    @staticmethod
+    def remove_open_file(file):
+        Brres.OPEN_FILES.pop(id(file), None)
+        Brres.remove_file_path(file, file.name)
+        for x in file.textures:
+            Brres.remove_texture_name(file, x, x.name)
+
+    @staticmethod
+    def remove_file_path(file, name):
+        path = os.path.abspath(name)
+        if Brres.FILES_BY_PATH.get(path) is file:
+            del Brres.FILES_BY_PATH[path]
+            for x in Brres.OPEN_FILES.values():  # another open file with the same path
+                if x is not file and os.path.abspath(x.name) == path:
+                    Brres.FILES_BY_PATH[path] = x
+                    break
+
+    @staticmethod
+    def add_texture_name(file, tex0):
+        textures = Brres.TEXTURES_BY_NAME.get(tex0.name)
+        if textures is None:
+            textures = Brres.TEXTURES_BY_NAME[tex0.name] = weakref.WeakValueDictionary()
+        textures[id(file)] = tex0
+
+    @staticmethod
+    def remove_texture_name(file, tex0, name):
+        textures = Brres.TEXTURES_BY_NAME.get(name)
+        if textures is not None and textures.get(id(file)) is tex0:
+            del textures[id(file)]
+            if not textures:
+                del Brres.TEXTURES_BY_NAME[name]
 
     @staticmethod
     def close_files():
-        for x in Brres.OPEN_FILES:
+        for x in list(Brres.OPEN_FILES.values()):
             x.close()
-        Brres.OPEN_FILES = []
+        Brres.OPEN_FILES.clear()
 
     @staticmethod
     def get_brres(filename, create_if_not_exists=False):
         filename = os.path.abspath(filename)
-        for x in Brres.OPEN_FILES:
-            if filename == x.name:
-                return x
+        x = Brres.FILES_BY_PATH.get(filename)
+        if x is not None:
+            return x
         if os.path.exists(filename):
             return Brres(filename, readFile=True)
         elif create_if_not_exists:
@@ -89,6 +129,15 @@ class Brres(Clipable, Packable):
         else:
             raise ValueError('Unknown key "{}"'.format(key))
 
+    def rename(self, name):
+        old_name = self.name
+        if super().rename(name):
+            if id(self) in self.OPEN_FILES:
+                self.remove_file_path(self, old_name)
+                self.FILES_BY_PATH.setdefault(os.path.abspath(name), self)
+            return True
+        return False
+
     def import_model(self, file_path):
         from abmatt.converters.convert_dae import DaeConverter2
         converter = DaeConverter2(self, file_path)
@@ -147,10 +196,8 @@ class Brres(Clipable, Packable):
 
     # -------------------------- SAVE/ CLOSE --------------------------------------------
     def close(self, try_save=True):
-        try:
-            Brres.OPEN_FILES.remove(self)
-        except ValueError:
-            pass
+        self.remove_open_file(self)
+        MATCHING.clear_indexes()  # releases the groups of this file
         if try_save and self.is_modified or self.DESTINATION and self.DESTINATION != self.name:
             return self.save(self.DESTINATION, self.OVERWRITE)
 
@@ -166,6 +213,8 @@ class Brres(Clipable, Packable):
                 self.check()
             f = BinFile(filename, mode="w")
             self.pack(f)
+            if self.mapped_file is not None and os.path.abspath(filename) == self.mapped_file:
+                self.unmap()
             if f.commitWrite():
                 AutoFix.get().info("Wrote file '{}'".format(filename), 2)
                 self.rename(filename)
@@ -174,6 +223,27 @@ class Brres(Clipable, Packable):
                 return True
         return False
 
+    def get_size_estimate(self):
+        """Estimates the memory used by the sum of the sub file payload sizes"""
+        size = 0
+        for x in self.models + self.textures + self.chr0 + self.scn0 + self.shp0 + self.clr0:
+            size += get_payload_size(x)
+        return size
+
+    def unmap(self):
+        """Copies subfile data out of the memory mapped file so that it can be overwritten"""
+        for x in self.textures + self.chr0:
+            x.data = unmap_data(x.data)
+        for mdl in self.models:
+            for x in mdl.objects + mdl.colors:
+                x.data = unmap_data(x.data)
+            for x in mdl.vertices + mdl.normals + mdl.uvs:
+                x.data = x.data.copy()
+        for x in self.models + self.textures + self.chr0 + self.scn0 + self.shp0 + self.clr0:
+            if x.is_loaded() and x.section is not None:
+                x.section.data = unmap_data(x.section.data)
+        self.mapped_file = None
+
     def get_trace(self):
         if self.parent:
             return self.parent.name + "->" + self.name
@@ -246,13 +316,12 @@ class Brres(Clipable, Packable):
 
     # -------------------------------- Textures -----------------------------
     def findTexture(self, name):
-        """Attempts to find the texture by name"""
-        if not self.OPEN_FILES:
-            return None
-        for x in self.OPEN_FILES:
-            if x is not self:
-                tex = x.getTexture(name, False)
-                if tex is not None:
+        """Attempts to find the texture by name in the other open files"""
+        textures = self.TEXTURES_BY_NAME.get(name)
+        if textures:
+            key = id(self)
+            for file_id, tex in textures.items():
+                if file_id != key:
                     return tex
 
     def add_tex0(self, tex0, replace=True, mark_modified=True):
@@ -268,6 +337,8 @@ class Brres(Clipable, Packable):
         self.textures.append(tex0)
         self.texture_map[tex0.name] = tex0
         tex0.parent = self      # this may be redundant
+        if id(self) in self.OPEN_FILES:
+            self.add_texture_name(self, tex0)
         if mark_modified:
             self.mark_modified()
         return True
@@ -283,16 +354,23 @@ class Brres(Clipable, Packable):
         tex0 = ImgConverter().encode(image_path, self)
         if tex0:
             if name:
-                tex0.name = name
+                self.rename_texture(tex0, name)
         return tex0
 
     def import_textures(self, paths, tex0_format=None, num_mips=-1, check=False):
-        return ImgConverter().batch_encode(paths, tex0_format, num_mips, check)
+        return ImgConverter().batch_encode(paths, self, tex0_format, num_mips, check)
 
     def rename_texture(self, tex0, name):
+        old_name = tex0.name
         if tex0.rename(name):
-            self.texture_map[tex0.name] = None
+            if self.texture_map.get(old_name) is tex0:
+                del self.texture_map[old_name]
             self.texture_map[tex0.name] = tex0
+            self.remove_texture_name(self, tex0, old_name)
+            if id(self) in self.OPEN_FILES:
+                self.add_texture_name(self, tex0)
+            return True
+        return False
 
     def get_texture_map(self):
         return self.texture_map
@@ -315,6 +393,7 @@ class Brres(Clipable, Packable):
         try:
             tex = self.texture_map.pop(name)
             self.textures.remove(tex)
+            self.remove_texture_name(self, tex, name)
             self.mark_modified()
         except KeyError:
             AutoFix.get().warn('No texture {} in {}'.format(name, self.name))
@@ -323,6 +402,7 @@ class Brres(Clipable, Packable):
         tex = self.textures.pop(i)
         if tex:
             self.texture_map.pop(tex.name)
+            self.remove_texture_name(self, tex, tex.name)
             self.mark_modified()
 
     def getUsedTextures(self):
@@ -348,7 +428,10 @@ class Brres(Clipable, Packable):
     # -------------------------------------------------------------------------
 
     def unpack(self, binfile):
-        UnpackBrres(self, binfile)
+        UnpackBrres(self, binfile, self.LAZY_LOAD)
+        if id(self) in self.OPEN_FILES:
+            for x in self.textures:
+                self.add_texture_name(self, x)
 
     def pack(self, binfile):
         PackBrres(self, binfile)
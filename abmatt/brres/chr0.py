@@ -1,6 +1,5 @@
 """CHR0 Subfile"""
-from copy import copy
-
+from abmatt.brres.lib.binfile import unmap_data
 from abmatt.brres.lib.packing.pack_chr0 import PackChr0
 from abmatt.brres.lib.unpacking.unpack_chr0 import UnpackChr0
 from abmatt.brres.subfile import SubFile, set_anim_str, get_anim_str
@@ -30,7 +29,8 @@ class Chr0(SubFile):
             self.offset = offset  # since we don't parse data... store name offsetg
 
     def set_str(self, key, value):
-        return set_anim_str(self, key, value)
+        if set_anim_str(self, key, value):
+            self.mark_modified()
 
     def get_str(self, key):
         return get_anim_str(self, key)
@@ -38,7 +38,8 @@ class Chr0(SubFile):
     def paste(self, item):
         self.framecount = item.framecount
         self.loop = item.loop
-        self.data = copy(item.data)
+        self.data = unmap_data(item.data)
+        self.mark_modified()
 
     def unpack(self, binfile):
         UnpackChr0(self, binfile)
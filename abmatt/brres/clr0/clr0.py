@@ -26,9 +26,11 @@ class Clr0(SubFile):
         self.animations = deepcopy(item.animations)
         self.loop = item.loop
         self.framecount = item.framecount
+        self.mark_modified()
 
     def set_str(self, key, value):
-        return set_anim_str(self, key, value)
+        if set_anim_str(self, key, value):
+            self.mark_modified()
 
     def get_str(self, key):
         return get_anim_str(self, key)
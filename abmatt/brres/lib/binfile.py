@@ -1,5 +1,6 @@
 #!/usr/bin/python
 """ binary file read/writing operations """
+import mmap
 import struct
 from struct import *
 
@@ -19,12 +20,13 @@ class BinFile:
     """ BinFile class: for packing and unpacking binfileary files"""
     STRIDE_MAP = {'f':4, 'I':4, 'i':4, 'H':2, 'h':2, 'B':2, 'b':2}
 
-    def __init__(self, filename, mode='r', bom='>'):
+    def __init__(self, filename, mode='r', bom='>', use_mmap=False):
         """
         filename:   name of file to read/write
         bom:    byte order mark (>|<) Big endian or little endian
         mode:   (r|w)
         len:    initial length of file (write only)
+        use_mmap:   memory maps the file (read only), readRemaining then returns memoryviews into the map
         """
         self.beginOffset = self.offset = 0
         self.filename = filename
@@ -32,6 +34,7 @@ class BinFile:
         self.references = {}  # used for forward references in relation to start
         self.bom = bom  # byte order mark > | <
         self.nameRefMap = {}  # for packing name references
+        self.name_refs = []  # name pointers read, used to pack unmodified sections again
         self.names_packed = False
         self.lenMap = {}  # used for tracking length of files
         self.c_length = None  # for tracking current length
@@ -42,9 +45,17 @@ class BinFile:
         # end debugging
 
         self.isWriteMode = (mode == 'w')
+        self.is_mapped = False
         if not self.isWriteMode:
             with open(filename, "rb") as file:
-                self.file = file.read()
+                if use_mmap:
+                    try:
+                        self.file = memoryview(mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ))
+                        self.is_mapped = True
+                    except ValueError:  # empty file, can't be mapped
+                        self.file = file.read()
+                else:
+                    self.file = file.read()
         else:
             self.file = bytearray()
         self.start()
@@ -325,7 +336,7 @@ class BinFile:
         return unpack_from(self.bom + fmt, self.file, offset)
 
     def readRemaining(self, filelen=None):
-        """ Reads and returns remaining data as bytes """
+        """ Reads and returns remaining data as bytes (a memoryview when mapped) """
         if not filelen:
             filelen = self.lenMap[self.beginOffset]
         end = self.beginOffset + filelen
@@ -359,6 +370,20 @@ class BinFile:
         self.offset = len(self.file)
         return length
 
+    def write_section(self, section):
+        """ Writes an unmodified section, relocating its name references """
+        offset = self.offset
+        self.writeRemaining(section.data)
+        name_map = self.nameRefMap
+        for start, ptr, name in section.name_refs:
+            name = name.encode('Ascii')
+            ref = (offset + start, offset + ptr)
+            if name not in name_map:
+                name_map[name] = [ref]
+            else:
+                name_map[name].append(ref)
+        return offset
+
     def writeMatrix(self, matrix, fmt='f'):
         width = len(matrix[0])
         fmt = str(width) + fmt
@@ -368,25 +393,43 @@ class BinFile:
     # Names
     def unpack_name(self, advance=True):
         """ Unpacks a single name from a pointer """
+        ptr_offset = self.offset
         [ptr] = self.read("I", 4 * advance)
         if not ptr:
             return None
         offset = self.beginOffset + ptr
         name = self.nameRefMap.get(offset)
-        if name:
-            return name
-        try:
-            [name_lens] = self.readOffset("I", offset - 4)
-        except struct.error:
-            raise UnpackingError(self, 'Incorrect name offset')
-        if name_lens > 256:
-            # For debugging
-            # data = self.readOffset('64s', offset - 4)
-            # print(data)
-            raise UnpackingError(self, "Incorrect name offset")
-        else:
+        if not name:
+            try:
+                [name_lens] = self.readOffset("I", offset - 4)
+            except struct.error:
+                raise UnpackingError(self, 'Incorrect name offset')
+            if name_lens > 256:
+                # For debugging
+                # data = self.readOffset('64s', offset - 4)
+                # print(data)
+                raise UnpackingError(self, "Incorrect name offset")
             self.nameRefMap[offset] = name = self.readOffset(str(name_lens) + "s", offset)[0].decode()
-            return name
+        self.name_refs.append((self.beginOffset, ptr_offset, name))
+        return name
+
+    def skip_name(self):
+        """ Skips over a name pointer that isn't needed, still tracking it for unmodified sections """
+        try:
+            self.unpack_name()
+        except UnpackingError:
+            self.name_refs.append((self.beginOffset, self.offset, None))
+            self.advance(4)
+
+    def get_section(self, offset, length, first_name_ref=0):
+        """ Gets the section at offset so that it can be packed again as is,
+            taking the name pointers read since first_name_ref
+        """
+        end = offset + length
+        name_refs = [(start - offset, ptr - offset, name) for start, ptr, name in self.name_refs[first_name_ref:]
+                     if offset <= ptr < end]
+        del self.name_refs[first_name_ref:]
+        return Section(memoryview(self.file)[offset:end], offset, name_refs)
 
     def storeNameRef(self, name, is_encoded=False):
         """ Stores a name reference offset to be filled when packing names
@@ -434,6 +477,32 @@ class BinFile:
             self.file = bytearray(self.file)
 
 
+class Section:
+    """ An unpacked span of a file, along with the name pointers in it (relative to the span start) """
+
+    def __init__(self, data, offset, name_refs):
+        self.data = data
+        self.offset = offset
+        self.name_refs = name_refs
+
+    def __deepcopy__(self, memodict={}):
+        return Section(unmap_data(self.data), self.offset, self.name_refs)
+
+    def is_relocatable(self):
+        """ False if there are name pointers that could not be followed """
+        for x in self.name_refs:
+            if x[2] is None:
+                return False
+        return True
+
+
+def unmap_data(data):
+    """ Copies memoryview data out of a memory mapped file, other data is returned as is """
+    if type(data) == memoryview:
+        return bytes(data)
+    return data
+
+
 class FolderEntry:
     """ A single entry in folder """
 
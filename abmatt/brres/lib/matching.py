@@ -1,6 +1,9 @@
 """ Matching and miscellaneous functions, and clipable interface """
 
 import re
+from bisect import bisect_left
+from collections import OrderedDict
+from functools import lru_cache
 
 BOOLABLE = ["False", "True"]
 
@@ -126,6 +129,101 @@ def parseValStr(value):
 
 """ Matching class """
 
+REGEX_SPECIAL = '.^$*+?{}[]\\|()'
+
+
+@lru_cache(maxsize=256)
+def compile_pattern(pattern, ignore_case):
+    """Compiles the pattern, returning (regex, literal prefix required by a match) or None if invalid"""
+    try:
+        regex = re.compile(pattern, re.IGNORECASE if ignore_case else 0)
+    except re.error:
+        return None
+    if '|' in pattern:
+        return regex, ''
+    for i, c in enumerate(pattern):
+        if c in REGEX_SPECIAL:
+            if i and c in '*?{':  # the preceding character is optional
+                i -= 1
+            return regex, pattern[:i]
+    return regex, pattern
+
+
+class NameIndex:
+    """Name lookups for a group, results are in group order"""
+
+    def __init__(self, group):
+        self.group = group
+        self.items = list(group)  # to detect changes to the group
+        self.positions = {id(x): i for i, x in enumerate(self.items)}
+        self.build()
+
+    def build(self):
+        self.names = [x.name for x in self.items]
+        self.folded_names = [x.lower() for x in self.names]
+        self.exact = self.map_positions(self.names)
+        self.folded = self.map_positions(self.folded_names)
+        self.prefixes = sorted(zip(self.names, range(len(self.names))))
+        self.folded_prefixes = sorted(zip(self.folded_names, range(len(self.names))))
+        self.is_ascii = all(x.isascii() for x in self.names)
+        self.stale = False
+
+    @staticmethod
+    def map_positions(names):
+        positions = {}
+        for i, x in enumerate(names):
+            positions.setdefault(x, []).append(i)
+        return positions
+
+    def is_valid(self, group):
+        # list comparison checks identity before equality
+        return group is self.group and len(group) == len(self.items) and group == self.items
+
+    def get_items(self, positions):
+        group = self.group
+        return [group[i] for i in positions]
+
+    def find(self, name, ignore_case):
+        if ignore_case:
+            return self.folded.get(name.lower(), [])
+        return self.exact.get(name, [])
+
+    def find_partial(self, name, ignore_case):
+        if ignore_case:
+            name = name.lower()
+            return [i for i, x in enumerate(self.folded_names) if name in x]
+        return [i for i, x in enumerate(self.names) if name in x]
+
+    def find_prefix(self, prefix, ignore_case):
+        """Positions of the names starting with prefix"""
+        if ignore_case:
+            prefix = prefix.lower()
+            prefixes = self.folded_prefixes
+        else:
+            prefixes = self.prefixes
+        positions = []
+        for i in range(bisect_left(prefixes, (prefix,)), len(prefixes)):
+            name, position = prefixes[i]
+            if not name.startswith(prefix):
+                break
+            positions.append(position)
+        positions.sort()
+        return positions
+
+    def find_regex(self, pattern, ignore_case, partial):
+        compiled = compile_pattern(pattern, ignore_case)
+        if compiled is None:
+            return []
+        regex, prefix = compiled
+        names = self.names
+        if partial:
+            search = regex.search
+            return [i for i, x in enumerate(names) if search(x)]
+        match = regex.match
+        if prefix and (not ignore_case or self.is_ascii and prefix.isascii()):
+            return [i for i in self.find_prefix(prefix, ignore_case) if match(names[i])]
+        return [i for i, x in enumerate(names) if match(x)]
+
 
 class Matching:
     PARTIAL_ON_NONE_FOUND = 2
@@ -134,11 +232,14 @@ class Matching:
     REGEX_ON_NONE_FOUND = 2
     REGEX_ENABLED = 1
     REGEX_DISABLED = 0
+    INDEX_MIN_SIZE = 16  # smaller groups are scanned
+    MAX_INDEXES = 64
 
     def __init__(self, case_sensitive=True, partial_matching=2, regex_enable=2):
         self.case_sensitive = case_sensitive
         self.partial_matching = partial_matching
         self.regex_enable = regex_enable
+        self.indexes = OrderedDict()  # id of group to NameIndex, least recently used first
         self.update()
 
     def update(self):
@@ -149,6 +250,8 @@ class Matching:
             else:
                 self.direct_group_function = self.match_group_partial_sensitive
                 self.regex_group_function = self.regex_group_partial_sensitive
+            # (partial, ignore case) of the indexed equivalents
+            self.direct_mode = self.regex_mode = (True, self.case_sensitive)
         else:
             if self.case_sensitive:
                 self.direct_group_function = self.match_group_full_sensitive
@@ -156,6 +259,8 @@ class Matching:
             else:
                 self.direct_group_function = self.match_group_full_insensitive
                 self.regex_group_function = self.regex_group_full_sensitive
+            self.direct_mode = (False, not self.case_sensitive)
+            self.regex_mode = (False, False)
 
     def set_case_sensitive(self, val):
         try:
@@ -258,11 +363,55 @@ class Matching:
         except re.error:
             pass
 
+    # ------------------------------------- INDEXING ----------------------------
+    def get_index(self, group):
+        """Gets the name index of the group, None if it is not indexed"""
+        if type(group) is not list or len(group) < self.INDEX_MIN_SIZE:
+            return None
+        key = id(group)
+        index = self.indexes.get(key)
+        if index is None or not index.is_valid(group):
+            index = self.indexes[key] = NameIndex(group)
+            if len(self.indexes) > self.MAX_INDEXES:
+                self.indexes.popitem(last=False)
+        elif index.stale:
+            index.build()
+        self.indexes.move_to_end(key)
+        return index
+
+    def on_rename_update(self, node, old_name):
+        key = id(node)
+        for x in self.indexes.values():
+            if key in x.positions:
+                x.stale = True
+
+    def clear_indexes(self):
+        self.indexes.clear()
+
+    def find_indexed(self, name, index):
+        positions = []
+        partial, ignore_case = self.direct_mode
+        if partial:
+            positions.extend(index.find_partial(name, ignore_case))
+        else:
+            positions.extend(index.find(name, ignore_case))
+        if self.regex_enable == self.REGEX_ENABLED or not positions and self.regex_enable:
+            partial, ignore_case = self.regex_mode
+            positions.extend(index.find_regex(name, ignore_case, partial))
+            if not positions and self.partial_matching == self.PARTIAL_ON_NONE_FOUND:
+                positions = index.find_regex(name, not self.case_sensitive, True)
+        elif not positions and self.partial_matching == self.PARTIAL_ON_NONE_FOUND:
+            positions = index.find_partial(name, not self.case_sensitive)
+        return index.get_items(positions)
+
     # finds a name in group, group instances must have .name
     def findAll(self, name, group):
         """ Finds all names matching in a group, either by direct matching or regex if direct fails."""
         if not name or name == "*" or not group:
             return group
+        index = self.get_index(group)
+        if index is not None:
+            return self.find_indexed(name, index)
         items = []
         # direct matching
         self.direct_group_function(name, group, items)
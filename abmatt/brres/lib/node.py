@@ -2,6 +2,7 @@ import os
 from copy import deepcopy
 
 from abmatt.autofix import AutoFix
+from abmatt.brres.lib.matching import MATCHING
 
 
 def get_item_by_index(group, index):
@@ -88,6 +89,7 @@ class Clipable(Node):
 
     # ------------------------------------- OBSERVERS ----------------------------
     def notify_rename(self, old_name):
+        MATCHING.on_rename_update(self, old_name)
         if self.observers:
             for x in self.observers:
                 x.on_rename_update(self, old_name)
@@ -1,5 +1,6 @@
 from abmatt.brres.lib.binfile import Folder
 from abmatt.brres.lib.packing.interface import Packer
+from abmatt.brres.lib.packing.pack_subfile import pack_section
 
 
 class PackBrres(Packer):
@@ -83,6 +84,15 @@ class PackBrres(Packer):
                 # print('Length of folder {} is {}'.format(x.name, len(x)))
         return count
 
+    @staticmethod
+    def get_unmodified_section(subfile):
+        """ gets the original section of the subfile if it can be packed as is """
+        if subfile.is_modified:
+            return None
+        section = getattr(subfile, 'section', None)  # animation collections don't have sections
+        if section is not None and section.is_relocatable():
+            return section
+
     def pack(self, brres, binfile):
         """ packs the brres """
         sub_files = self.pre_packing(brres)
@@ -101,8 +111,16 @@ class PackBrres(Packer):
             assert len(file_group)
             index_group = folders[folder_index]
             for file in file_group:
-                index_group.createEntryRefI()  # create the dataptr
-                file.pack(binfile)
+                section = self.get_unmodified_section(file)
+                if section is not None:
+                    # keep the same alignment within the file as the original
+                    binfile.advance((section.offset - binfile.offset) % 0x20)
+                    index_group.createEntryRefI()  # create the dataptr
+                    pack_section(file, binfile)
+                else:
+                    index_group.createEntryRefI()  # create the dataptr
+                    file.pack(binfile)
+                    file.section = None
             folder_index += 1
         binfile.packNames()
         binfile.end()
@@ -15,5 +15,7 @@ class PackChr0(PackSubfile):
         for x in chr0.animations:  # hackish way of overwriting the string offsets
             binfile.offset = binfile.beginOffset + x.offset
             f.createEntryRefI()
+            binfile.start()  # name offset is relative to the entry
             binfile.storeNameRef(x.name)
+            binfile.end()
         binfile.end()
\ No newline at end of file
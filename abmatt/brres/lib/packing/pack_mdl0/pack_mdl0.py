@@ -181,19 +181,19 @@ class PackMdl0(PackSubfile):
     def build_shaders(self, materials):
         shaders = self.shaders
         shader_mats = self.shader_mats
+        shader_indices = {}  # shader state key to index
         for x in materials:
             shader = x.shader
-            found = False
-            for i in range(len(shaders)):
-                if shader == shaders[i]:
-                    shader_mats[i].append(x)
-                    # This is to have the shader load the
-                    # maximum number of layers necessary
-                    if len(x.layers) > len(shaders[i].parent.layers):
-                        shaders[i] = shader
-                    found = True
-                    break
-            if not found:
+            key = shader.get_state_key()
+            i = shader_indices.get(key)
+            if i is not None:
+                shader_mats[i].append(x)
+                # This is to have the shader load the
+                # maximum number of layers necessary
+                if len(x.layers) > len(shaders[i].parent.layers):
+                    shaders[i] = shader
+            else:
+                shader_indices[key] = len(shaders)
                 shader_mats.append([x])
                 shaders.append(shader)
         return shaders
@@ -10,10 +10,7 @@ class PackPoint(Packer):
         point = self.node
         binfile.align()
         binfile.createRef()
-        fmt = '{}{}'.format(point.point_width, point.format_str)
-        data = point.data
-        for x in data:
-            binfile.write(fmt, *x)
+        binfile.writeRemaining(point.data.astype(point.dtype, copy=False).tobytes())
         binfile.alignAndEnd()
 
     def pack(self, point, binfile):
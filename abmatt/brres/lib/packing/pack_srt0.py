@@ -1,3 +1,5 @@
+import numpy as np
+
 from abmatt.brres.lib.binfile import Folder
 from abmatt.brres.lib.packing.interface import Packer
 from abmatt.brres.lib.packing.pack_subfile import PackSubfile
@@ -104,9 +106,9 @@ class PackSrt0Material(Packer):
         super().__init__(node, binfile)
 
     def pack_key_frame_list(self, binfile, anim, framescale):
-        binfile.write("2Hf", len(anim.entries), 0, framescale)
-        for x in anim.entries:
-            binfile.write("3f", x.index, x.value, x.delta)
+        binfile.write("2Hf", len(anim), 0, framescale)
+        data = np.stack((anim.frames, anim.values, anim.deltas), 1)
+        binfile.writeRemaining(data.astype(binfile.bom + 'f4').tobytes())
 
     def consolidate(self, binfile, frame_lists_offsets):
         """consolidates and packs the frame lists based on the animations that have key frames"""
@@ -10,6 +10,14 @@ def pack_default(subfile, binfile):
     binfile.end()
 
 
+def pack_section(subfile, binfile):
+    """ packs the unmodified sub file as it was unpacked, updating the outer offset """
+    binfile.start()
+    binfile.write_section(subfile.section)
+    binfile.writeOffset('i', binfile.beginOffset + 12, binfile.getOuterOffset())
+    binfile.end()
+
+
 class PackSubfile(Packer):
     def pack(self, subfile, binfile):
         """ packs sub file into binfile, subclass must use binfile.end() """
@@ -10,10 +10,14 @@ from abmatt.brres.pat0.pat0 import Pat0Collection, Pat0
 from abmatt.brres.scn0.scn0 import Scn0
 from abmatt.brres.shp0.shp0 import Shp0
 from abmatt.brres.srt0.srt0 import SRTCollection, Srt0
+from abmatt.brres.subfile import LazySubFile, on_load
 from abmatt.brres.tex0 import Tex0
 
 
 class UnpackBrres(Unpacker):
+    def __init__(self, node, binfile, lazy=False):
+        self.lazy = lazy
+        super(UnpackBrres, self).__init__(node, binfile)
 
     @staticmethod
     def create_model_animation_map(animations, model_names):
@@ -43,7 +47,7 @@ class UnpackBrres(Unpacker):
             if not mdl:
                 AutoFix.get().info('No model found matching srt0 animation {} in {}'.format(key, brres.name), 3)
             else:
-                mdl.set_srt0(collection)
+                on_load(mdl, lambda x, collection=collection: x.set_srt0(collection))
         return anim_collections
 
     def generate_pat0_collections(self, pat0_anims):
@@ -59,7 +63,7 @@ class UnpackBrres(Unpacker):
             if not mdl:
                 AutoFix.get().info('No model found matching pat0 animation {} in {}'.format(key, brres.name), 3)
             else:
-                mdl.set_pat0(collection)
+                on_load(mdl, lambda x, collection=collection: x.set_pat0(collection))
         return anim_collections
 
     def post_unpacking(self, brres):
@@ -91,28 +95,31 @@ class UnpackBrres(Unpacker):
         binfile.end()
         self.post_unpacking(brres)
 
-    def unpack_subfiles(self, klass):
+    def unpack_subfiles(self, klass, lazy=False):
         subfolder = Folder(self.binfile, self.folder_name)
         subfolder.unpack(self.binfile)
+        if lazy:
+            return [LazySubFile(klass, subfolder.recallEntryI(), self.node, self.binfile) for i in range(len(subfolder))]
         return [klass(subfolder.recallEntryI(), self.node, self.binfile) for i in range(len(subfolder))]
 
     def unpack_folder(self, folder_name):
+        # srt0 and pat0 are always unpacked, their material animations are collected by model
         self.folder_name = folder_name
         if folder_name == "3DModels(NW4R)":
-            self.node.models = self.unpack_subfiles(Mdl0)
+            self.node.models = self.unpack_subfiles(Mdl0, self.lazy)
         elif folder_name == "Textures(NW4R)":
-            self.node.textures = self.unpack_subfiles(Tex0)
+            self.node.textures = self.unpack_subfiles(Tex0, self.lazy)
         elif folder_name == "AnmTexPat(NW4R)":
             self.node.pat0 = self.unpack_subfiles(Pat0)
         elif folder_name == "AnmTexSrt(NW4R)":
             self.node.srt0 = self.unpack_subfiles(Srt0)
         elif folder_name == "AnmChr(NW4R)":
-            self.node.chr0 = self.unpack_subfiles(Chr0)
+            self.node.chr0 = self.unpack_subfiles(Chr0, self.lazy)
         elif folder_name == "AnmScn(NW4R)":
-            self.node.scn0 = self.unpack_subfiles(Scn0)
+            self.node.scn0 = self.unpack_subfiles(Scn0, self.lazy)
         elif folder_name == "AnmShp(NW4R)":
-            self.node.shp0 = self.unpack_subfiles(Shp0)
+            self.node.shp0 = self.unpack_subfiles(Shp0, self.lazy)
         elif folder_name == "AnmClr(NW4R)":
-            self.node.clr0 = self.unpack_subfiles(Clr0)
+            self.node.clr0 = self.unpack_subfiles(Clr0, self.lazy)
         else:
             raise UnpackingError(self.binfile, 'Unkown folder {}'.format(folder_name))
\ No newline at end of file
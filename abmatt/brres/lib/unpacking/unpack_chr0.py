@@ -5,7 +5,8 @@ from abmatt.brres.lib.unpacking.unpack_subfile import UnpackSubfile
 class UnpackChr0(UnpackSubfile):
     def unpack(self, chr0, binfile):
         super().unpack(chr0, binfile)
-        _, chr0.framecount, num_entries, chr0.loop, chr0.scaling_rule = binfile.read('I2H2I', 16)
+        binfile.skip_name()  # original path
+        chr0.framecount, num_entries, chr0.loop, chr0.scaling_rule = binfile.read('2H2I', 12)
         binfile.recall()  # section 0
         f = Folder(binfile)
         f.unpack(binfile)
@@ -13,5 +14,6 @@ class UnpackChr0(UnpackSubfile):
         # printCollectionHex(self.data)
         while len(f):
             name = f.recallEntryI()
+            binfile.name_refs.append((binfile.offset, binfile.offset, name))  # node name, left in data
             chr0.animations.append(chr0.ModelAnim(name, binfile.offset - binfile.beginOffset))
         binfile.end()
@@ -28,7 +28,7 @@ class UnpackClr0(UnpackSubfile):
             binfile.start()
             # data = binfile.read('256B', 0)
             # printCollectionHex(data)
-            binfile.advance(4)  # ignore name
+            binfile.skip_name()
             [flags] = binfile.read('I', 4)  # flags: series of exists/isconstant
             enabled, is_constant = self.unpack_flags(anim, flags)
             for i in range(len(enabled)):
@@ -43,7 +43,8 @@ class UnpackClr0(UnpackSubfile):
 
     def unpack(self, clr0, binfile):
         super().unpack(clr0, binfile)
-        _, clr0.framecount, num_entries, clr0.loop = binfile.read('i2Hi', 12)
+        binfile.skip_name()  # original path
+        clr0.framecount, num_entries, clr0.loop = binfile.read('2Hi', 8)
         binfile.recall()  # section 0
         folder = Folder(binfile)
         folder.unpack(binfile)
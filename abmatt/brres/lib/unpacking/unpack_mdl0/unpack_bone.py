@@ -45,7 +45,8 @@ class UnpackBone(Unpacker):
     def unpack(self, bone, binfile):
         self.offset = binfile.start()
         binfile.readLen()
-        binfile.advance(8)
+        binfile.advance(4)
+        binfile.skip_name()
         bone.index, bone.weight_id, flags, bone.billboard = binfile.read('4I', 20)
         self.__parse_flags(bone, flags)
         bone.scale = binfile.read('3f', 12)
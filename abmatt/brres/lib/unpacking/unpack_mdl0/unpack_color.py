@@ -12,7 +12,7 @@ class UnpackColor(Unpacker):
         binfile.readLen()
         binfile.advance(4)
         binfile.store()
-        binfile.advance(4)
+        binfile.skip_name()
         color.index, color.has_alpha, color.format, color.stride, color.flags, color.count = binfile.read('3I2BH', 16)
         binfile.recall()
         color.data = binfile.readRemaining()
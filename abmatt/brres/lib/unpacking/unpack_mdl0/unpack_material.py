@@ -16,7 +16,9 @@ class UnpackLayer(Unpacker):
     def unpack(self, layer, binfile):
         """ unpacks layer information """
         # assumes material already unpacked name
-        binfile.advance(12)
+        binfile.advance(4)
+        binfile.skip_name()  # palette
+        binfile.advance(4)
         texDataID, palleteDataID, layer.uwrap, layer.vwrap, \
         layer.minfilter, layer.magfilter, layer.lod_bias, layer.max_anisotrophy, \
         layer.clamp_bias, layer.texel_interpolate, pad = binfile.read("6IfI2BH", 0x24)
@@ -133,7 +135,8 @@ class UnpackMaterial(Unpacker):
         self.offset = binfile.start()
         # print('Material {} offset {}'.format(self.name, offset))
         binfile.readLen()
-        binfile.advance(8)
+        binfile.advance(4)
+        binfile.skip_name()
         material.index, xluFlags, ntexgens, nlights, \
         material.shaderStages, material.indirectStages, \
         material.cullmode, material.compareBeforeTexture, \
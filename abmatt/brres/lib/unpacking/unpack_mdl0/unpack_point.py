@@ -1,3 +1,5 @@
+import numpy as np
+
 from abmatt.brres.lib.unpacking.interface import Unpacker
 from abmatt.brres.mdl0 import point
 from abmatt.brres.mdl0.normal import Normal
@@ -18,7 +20,7 @@ class UnpackPoint(Unpacker):
         l = binfile.readLen()
         binfile.advance(4)
         binfile.store()
-        binfile.advance(4)
+        binfile.skip_name()
         pt.index, pt.comp_count, pt.format, pt.divisor, pt.stride, pt.count = binfile.read('3I2BH', 16)
         if not self.is_valid_comp_count(pt.comp_count):
             pt.comp_count = pt.default_comp_count
@@ -38,11 +40,16 @@ class UnpackPoint(Unpacker):
 
     def unpack_data(self, point, binfile):
         binfile.recall()
-        fmt = '{}{}'.format(point.point_width, point.format_str)
+        dtype = point.dtype
+        width = point.point_width
+        count = point.count
         stride = point.stride
-        data = []
-        for i in range(point.count):
-            data.append(binfile.read(fmt, stride))
+        if stride == width * dtype.itemsize:
+            data = np.frombuffer(binfile.file, dtype, count * width, binfile.offset).reshape(count, width)
+        else:   # padded, drop the extra bytes
+            data = np.frombuffer(binfile.file, np.uint8, count * stride, binfile.offset).reshape(count, stride)
+            data = data[:, :width * dtype.itemsize].copy().view(dtype)
+        binfile.advance(count * stride)
         binfile.alignAndEnd()
         point.data = data
 
@@ -24,7 +24,7 @@ class UnpackPolygon(Unpacker):
         vt_size, vt_actual, vt_offset = binfile.read('3I', 12)
         vt_offset += offset
         xf_arry_flags, polygon.flags = binfile.read('2I', 8)
-        binfile.advance(4)
+        binfile.skip_name()
         polygon.index, polygon.facepoint_count, polygon.face_count, \
         self.vertex_group_index, self.normal_group_index = binfile.read('3I2h', 16)
         self.color_group_indices = binfile.read('2h', 4)
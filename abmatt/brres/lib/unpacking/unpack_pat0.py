@@ -27,7 +27,7 @@ class UnpackPat0Animation(Unpacker):
             frames.append(pat0.Frame(frame_id, tex_id, plt_id))
 
     def unpack_flags(self, pat0, binfile):
-        binfile.advance(4)  # already have name
+        binfile.skip_name()  # already have name
         [flags] = binfile.read('I', 4)
         pat0.enabled = flags & 1
         pat0.fixedTexture = flags >> 1 & 1
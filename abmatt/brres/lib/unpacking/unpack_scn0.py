@@ -72,6 +72,10 @@ class UnpackScn0(UnpackSubfile):
             return [unpacker(klass(), self.binfile) for i in range(section_count)]
         return []
 
+    def __init__(self, node, binfile):
+        super().__init__(node, binfile)
+        node.section = None  # not all name offsets are followed, so always pack
+
     def unpack(self, scn0, binfile):
         super().unpack(scn0, binfile)
         _, scn0.framecount, scn0.speclightcount, scn0.loop = binfile.read('i2Hi', 12)
@@ -22,7 +22,7 @@ class UnpackShp0(UnpackSubfile):
         def unpack(self, anim, binfile):
             binfile.start()
             [anim.flags] = binfile.read('I', 4)
-            binfile.advance(4)  # name
+            binfile.skip_name()
             anim.name_id, num_entries, anim.fixed_flags, indices_offset = binfile.read('2H2i', 12)
             anim.indices = binfile.read('{}H'.format(num_entries), num_entries * 2)
             binfile.offset = indices_offset + binfile.beginOffset - 4 * num_entries
@@ -36,7 +36,8 @@ class UnpackShp0(UnpackSubfile):
     def unpack(self, shp0, binfile):
         # print('{} Warning: Shp0 not supported, unable to edit'.format(self.parent.name))
         super().unpack(shp0, binfile)
-        orig_path, shp0.framecount, num_anim, shp0.loop = binfile.read('I2HI', 12)
+        binfile.skip_name()  # original path
+        shp0.framecount, num_anim, shp0.loop = binfile.read('2HI', 8)
         binfile.recall(1)  # Section 1 string list
         binfile.start()
         for i in range(num_anim):
@@ -1,5 +1,7 @@
 from copy import deepcopy
 
+import numpy as np
+
 from abmatt.brres.lib.binfile import Folder, UnpackingError
 from abmatt.brres.lib.unpacking.interface import Unpacker
 from abmatt.brres.lib.unpacking.unpack_subfile import UnpackSubfile
@@ -10,17 +12,13 @@ class UnpackSrt0Tex(Unpacker):
     def unpack_key_frame_list(self, anim, binfile):
         offset = binfile.offset
         binfile.offset = binfile.read('I', 0)[0] + offset
-        anim.entries = []
         # header
         size, uk, fs = binfile.read("2Hf", 8)
         # print('FrameScale: {} i v d'.format(fs))
-        # str = ''
         if size <= 0:
             raise UnpackingError(binfile, 'SRT0 Key frame list has no entries!')
-        for i in range(size):
-            index, value, delta = binfile.read("3f", 12)
-            # str += '({},{},{}), '.format(index, value, delta)
-            anim.entries.append(anim.SRTKeyFrame(value, index, delta))
+        data = np.frombuffer(binfile.file, binfile.bom + 'f4', size * 3, binfile.offset).reshape((size, 3))
+        anim.set_key_frames(data[:, 0], data[:, 1], data[:, 2])     # index, value, delta
         binfile.offset = offset + 4
         return anim
 
@@ -13,13 +13,21 @@ def unpack_default(subfile, binfile):
 
 
 class UnpackSubfile(Unpacker):
+    def __init__(self, node, binfile):
+        offset = binfile.offset
+        first_name_ref = len(binfile.name_refs)
+        self.length = 0
+        super().__init__(node, binfile)
+        # keep the original bytes so that the subfile can be packed as is if unmodified
+        node.section = binfile.get_section(offset, self.length, first_name_ref)
+
     def unpack(self, subfile, binfile):
         """ unpacks the sub file, subclass must use binfile.end() """
         offset = binfile.start()
         magic = binfile.readMagic()
         if magic != subfile.MAGIC:
             raise UnpackingError(binfile, 'Magic {} does not match expected {}'.format(magic, subfile.MAGIC))
-        binfile.readLen()
+        self.length = binfile.readLen()
         subfile.version, outerOffset = binfile.read("Ii", 8)
         try:
             subfile.numSections = subfile._getNumSections()
@@ -1,3 +1,5 @@
+import numpy as np
+
 from abmatt.brres.lib.node import Node
 
 
@@ -21,6 +23,7 @@ class Bone(Node):
         self.visible = True
         self.has_geometry = has_geometry
         self.has_billboard_parent = False
+        self.matrix_cache = {}  # matrices as arrays, cleared when the matrices are set
         super().__init__(name, parent, binfile)
 
 
@@ -38,6 +41,46 @@ class Bone(Node):
         self.transform_matrix = [[y for y in x] for x in self.identity_matrix]
         self.inverse_matrix = [[y for y in x] for x in self.identity_matrix]
 
+    @property
+    def transform_matrix(self):
+        return self._transform_matrix
+
+    @transform_matrix.setter
+    def transform_matrix(self, matrix):
+        self._transform_matrix = matrix
+        self.clear_matrix_cache()
+
+    @property
+    def inverse_matrix(self):
+        return self._inverse_matrix
+
+    @inverse_matrix.setter
+    def inverse_matrix(self, matrix):
+        self._inverse_matrix = matrix
+        self.clear_matrix_cache()
+
+    def clear_matrix_cache(self):
+        """Clears the cached matrices of the bone and of its children, whose world positions depend on it"""
+        self.matrix_cache = {}
+        bone = getattr(self, 'child', None)  # not linked yet when unpacking
+        while bone:
+            bone.clear_matrix_cache()
+            bone = bone.next
+
+    def get_transform_array(self):
+        """Gets the 4x4 transform matrix array, which is cached so should not be modified"""
+        matrix = self.matrix_cache.get('transform')
+        if matrix is None:
+            matrix = self.matrix_cache['transform'] = np.array(self.get_transform_matrix(), float)
+        return matrix
+
+    def get_inv_transform_array(self):
+        """Gets the 4x4 inverse transform matrix array, which is cached so should not be modified"""
+        matrix = self.matrix_cache.get('inverse')
+        if matrix is None:
+            matrix = self.matrix_cache['inverse'] = np.array(self.get_inv_transform_matrix(), float)
+        return matrix
+
     def get_bone_parent(self):
         return self.b_parent
 
@@ -57,6 +100,7 @@ class Bone(Node):
         for i in range(3):
             self.transform_matrix[i][2] = trans[i]
             self.inverse_matrix[i][2] = trans[i] * -1
+        self.clear_matrix_cache()
 
     def get_children(self):
         if not self.child:
@@ -284,6 +284,7 @@ class Mdl0(SubFile):
             parent_index = 0
         self.NodeTree.add_entry(self.boneMatrixCount, parent_index)
         self.boneMatrixCount += 1
+        self.mark_modified()
         return b
 
     def add_definition(self, material, polygon, bone=None, priority=0):
@@ -292,6 +293,7 @@ class Mdl0(SubFile):
         polygon.visible_bone = bone
         polygon.draw_priority = priority
         self.rebuild_head = True
+        self.mark_modified()
 
     # ---------------------------------- SRT0 ------------------------------------------
     def set_srt0(self, srt0_collection):
@@ -521,6 +523,7 @@ class Mdl0(SubFile):
             for x in to_remove:
                 group.remove(x)
             self.rebuild_indexes(group)
+            self.mark_modified()
 
     def check(self, expected_name=None):
         """
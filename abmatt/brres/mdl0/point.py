@@ -1,3 +1,5 @@
+import numpy as np
+
 from abmatt.autofix import AutoFix
 from abmatt.brres.lib.node import Node
 
@@ -7,6 +9,7 @@ FMT_UINT16 = 2
 FMT_INT16 = 3
 FMT_FLOAT = 4
 FMT_STR = 'BbHhf'
+FMT_DTYPE = ('>u1', '>i1', '>u2', '>i2', '>f4')  # big endian numpy types
 
 
 class Point(Node):
@@ -27,17 +30,21 @@ class Point(Node):
     def format_str(self):
         return FMT_STR[self.format]
 
+    @property
+    def dtype(self):
+        return np.dtype(FMT_DTYPE[self.format])
+
     def __str__(self):
         return self.name + ' component_count:' + str(self.comp_count) + ' divisor:' + str(self.divisor) + \
                ' format:' + str(self.format) + ' stride:' + str(self.stride) + ' count:' + str(self.count)
 
     def begin(self):
-        self.data = []
         self.comp_count = self.default_comp_count
         self.format = 4
         self.divisor = 0
         self.stride = 0
         self.count = 0
+        self.data = np.zeros((0, self.point_width), self.dtype)  # count x point_width
 
     def get_format(self):
         return self.format
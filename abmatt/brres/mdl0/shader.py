@@ -24,6 +24,7 @@ class Shader(Clipable):
         # self.material = parent  # material
         self.indTexMaps = [7] * 4
         self.indTexCoords = [7] * 4
+        self.state_key = None  # cached by get_state_key, cleared when modified
         super(Shader, self).__init__(name, parent, binfile)
 
     def begin(self):
@@ -34,9 +35,20 @@ class Shader(Clipable):
         :type item: Shader
         :return: True if equal
         """
-        return self.stages == item.stages and \
-               self.swap_table == item.swap_table and \
-               self.indTexCoords == item.indTexCoords and self.indTexMaps == item.indTexMaps
+        return self.get_state_key() == item.get_state_key()
+
+    def get_state_key(self):
+        """Gets a hashable key of the stages, swap table and indirect settings, equal shaders have equal keys"""
+        key = self.state_key
+        if key is None:
+            key = self.state_key = (tuple(x.get_state_key() for x in self.stages),
+                                    tuple((x.bpmem, x.data, x.enabled) for x in self.swap_table),
+                                    tuple(self.indTexCoords), tuple(self.indTexMaps))
+        return key
+
+    def mark_modified(self, notify_observers=True):
+        self.state_key = None
+        super().mark_modified(notify_observers)
 
     def get_colors_used(self):
         colors = set()
@@ -268,6 +268,19 @@ class Stage(Clipable):
         self.ind_use_prev = False
         self.ind_unmodify_lod = False
 
+    def get_state_key(self):
+        return (self.enabled, self.map_id, self.coord_id, self.texture_swap_sel, self.raster_color,
+                self.raster_swap_sel, self.constant, self.sel_a, self.sel_b, self.sel_c, self.sel_d, self.bias,
+                self.oper, self.clamp, self.scale, self.dest, self.constant_a, self.sel_a_a, self.sel_b_a,
+                self.sel_c_a, self.sel_d_a, self.bias_a, self.oper_a, self.clamp_a, self.scale_a, self.dest_a,
+                self.ind_stage, self.ind_format, self.ind_alpha, self.ind_bias, self.ind_matrix, self.ind_s_wrap,
+                self.ind_t_wrap, self.ind_use_prev, self.ind_unmodify_lod)
+
+    def mark_modified(self, notify_observers=True):
+        if self.parent is not None:
+            self.parent.state_key = None  # the shader key, the parent isn't marked if this is already modified
+        super().mark_modified(notify_observers)
+
     def __eq__(self, stage):
         """Determines if stages are equal"""
         return self.enabled == stage.enabled and \
@@ -63,7 +63,8 @@ class Scn0(SubFile):
             return self.loop
 
     def set_str(self, key, value):
-        return set_anim_str(self, key, value)
+        if set_anim_str(self, key, value):
+            self.mark_modified()
 
     def get_str(self, key):
         return get_anim_str(self, key)
@@ -77,6 +78,7 @@ class Scn0(SubFile):
         self.lights = deepcopy(item.lights)
         self.fogs = deepcopy(item.fogs)
         self.cameras = deepcopy(item.cameras)
+        self.mark_modified()
 
     def unpack(self, binfile):
         UnpackScn0(self, binfile)
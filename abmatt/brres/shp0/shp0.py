@@ -28,7 +28,8 @@ class Shp0(SubFile):
             return self.loop
 
     def set_str(self, key, value):
-        return set_anim_str(self, key, value)
+        if set_anim_str(self, key, value):
+            self.mark_modified()
 
     def get_str(self, key):
         return get_anim_str(self, key)
@@ -38,6 +39,7 @@ class Shp0(SubFile):
         self.loop = item.loop
         self.animations = deepcopy(item.animations)
         self.strings = deepcopy(item.strings)
+        self.mark_modified()
 
     def unpack(self, binfile):
         UnpackShp0(self, binfile)
@@ -1,5 +1,7 @@
 from copy import deepcopy, copy
 
+import numpy as np
+
 from abmatt.autofix import Bug, AutoFix
 from abmatt.brres.lib.matching import validFloat, splitKeyVal, validInt, validBool, MATCHING
 from abmatt.brres.lib.node import Clipable
@@ -9,6 +11,7 @@ class SRTKeyFrameList:
     """ Representing an srt non-fixed animation list
         could be scale/rotation/translation
         Always has 1 entry at index 0
+        The key frames are stored as sorted arrays of frame indices, values and deltas
     """
 
     class SRTKeyFrame:
@@ -27,10 +30,10 @@ class SRTKeyFrameList:
 
     def __init__(self, frameCount, start_value=0):
         self.framecount = frameCount
-        self.entries = [self.SRTKeyFrame(start_value)]
+        self.setFixed(start_value)
 
     def __len__(self):
-        return len(self.entries)
+        return len(self.frames)
 
     def __getitem__(self, key):
         key = validFloat(key, 0, self.framecount + .0001)
@@ -49,74 +52,105 @@ class SRTKeyFrameList:
             self.setKeyFrame(value, key, delta)
 
     def __eq__(self, other):
-        return self.entries == other.entries
-        # my_entries = self.entries
-        # other_entries = other.entries
-        # if len(my_entries) != len(other_entries):
-        #     return False
-        # for i in range(len(my_entries)):
-        #     e = my_entries[i]
-        #     o = other_entries[i]
-        #     if e.index != o.index or e.value != o.value or e.delta != o.delta:
-        #         return False
-        # return True
+        return np.array_equal(self.frames, other.frames) and np.array_equal(self.values, other.values) \
+               and np.array_equal(self.deltas, other.deltas)
 
     def __str__(self):
-        val = '('
-        for x in self.entries:
-            val += str(x) + ', '
-        return val[:-2] + ')'
+        return '(' + ', '.join(str(x) for x in self.entries) + ')'
+
+    @property
+    def entries(self):
+        """ The key frames as a list of SRTKeyFrame """
+        return [self.SRTKeyFrame(v, i, d) for i, v, d in zip(self.frames.tolist(), self.values.tolist(),
+                                                              self.deltas.tolist())]
+
+    def set_key_frames(self, frames, values, deltas):
+        """ Sets all the key frames, frames must be sorted """
+        self.frames = np.array(frames, float)
+        self.values = np.array(values, float)
+        self.deltas = np.array(deltas, float)
 
     def isDefault(self, is_scale):
-        if len(self.entries) > 1:
+        if len(self.frames) > 1:
             return False
-        elif len(self.entries) < 1:
+        elif len(self.frames) < 1:
             return True
-        return self.entries[0].value == 1 if is_scale else self.entries[0].value == 0
+        return self.values[0] == 1 if is_scale else self.values[0] == 0
 
     def isFixed(self):
-        return len(self.entries) == 1  # what about delta?
+        return len(self.frames) == 1  # what about delta?
 
     def setFixed(self, value):
-        self.entries = [self.SRTKeyFrame(value)]
+        self.set_key_frames([0], [value], [0])
+
+    def __find(self, index):
+        """ Gets the position of the key frame with index, or -1 """
+        i = np.searchsorted(self.frames, index)
+        if i < len(self.frames) and self.frames[i] == index:
+            return i
+        return -1
 
     def getFrame(self, i):
         """ Gets frame with index i """
-        for x in self.entries:
-            if x.index == i:
-                return x
-        return None
+        i = self.__find(i)
+        if i >= 0:
+            return self.SRTKeyFrame(self.values[i], self.frames[i], self.deltas[i])
 
     def getValue(self, index=0):
         """ Gets the value of key frame with frame index"""
-        for x in self.entries:
-            if x.index == index:
-                return x.value
+        i = self.__find(index)
+        if i >= 0:
+            return float(self.values[i])
+
+    def get_values(self, frames=None):
+        """ Evaluates the animation at each of the frames (default every frame) using hermite interpolation,
+            frames outside the key frames are clamped
+        """
+        if frames is None:
+            frames = np.arange(self.framecount)
+        frames = np.asarray(frames, float)
+        key_frames = self.frames
+        values = self.values
+        if len(key_frames) < 2:
+            return np.full(frames.shape, values[0])
+        i = np.clip(np.searchsorted(key_frames, frames, side='right') - 1, 0, len(key_frames) - 2)
+        start = key_frames[i]
+        span = key_frames[i + 1] - start
+        t = np.divide(frames - start, span, out=np.ones(frames.shape), where=span > 0)
+        t = np.clip(t, 0, 1)
+        t2 = t * t
+        t3 = t2 * t
+        return (2 * t3 - 3 * t2 + 1) * values[i] + (t3 - 2 * t2 + t) * span * self.deltas[i] \
+            + (3 * t2 - 2 * t3) * values[i + 1] + (t3 - t2) * span * self.deltas[i + 1]
 
     def calcDelta(self, id1, val1, id2, val2):
         if id2 == id1:  # divide by 0
-            return self.entries[0].delta
+            return self.deltas[0]
         return (val2 - val1) / (id2 - id1)
 
     def updateEntry(self, entry_index):
         """Calculates the deltas due to a changed entry"""
-        entry = self.entries[entry_index]
-        if len(self.entries) < 2:  # one or 0
-            entry.delta = 0
+        frames = self.frames
+        values = self.values
+        count = len(frames)
+        entry_index %= count
+        if count < 2:  # one
+            self.deltas[entry_index] = 0
         else:
-            try:
-                next = self.entries[entry_index + 1]
-                next_id = next.index
-            except IndexError:
-                next = self.entries[0]
-                next_id = next.index + self.framecount
-            prev = self.entries[entry_index - 1]
-            if entry_index == 0:
-                prev_id = prev.index - self.framecount
+            next_index = entry_index + 1
+            if next_index < count:
+                next_id = frames[next_index]
             else:
-                prev_id = prev.index
-            entry.delta = self.calcDelta(entry.index, entry.value, next_id, next.value)
-            prev.delta = self.calcDelta(prev_id, prev.value, entry.index, entry.value)
+                next_index = 0
+                next_id = frames[0] + self.framecount
+            prev_index = entry_index - 1
+            prev_id = frames[prev_index]
+            if entry_index == 0:
+                prev_id -= self.framecount
+            index = frames[entry_index]
+            value = values[entry_index]
+            self.deltas[entry_index] = self.calcDelta(index, value, next_id, values[next_index])
+            self.deltas[prev_index] = self.calcDelta(prev_id, values[prev_index], index, value)
 
     # ------------------------------------------------ Key Frames ---------------------------------------------
     def setKeyFrame(self, value, index=0, delta=None):
@@ -125,62 +159,48 @@ class SRTKeyFrameList:
         """
         if not 0 <= index <= self.framecount:
             raise ValueError("Frame Index {} out of range.".format(index))
-        entries = self.entries
-        entry_index = -1
-        cntry = None
-        for i in range(len(entries)):
-            cntry = entries[i]
-            if index < cntry.index:  # insert
-                cntry = self.SRTKeyFrame(value, index)
-                entries.insert(i, cntry)
-                entry_index = i
-                break
-            elif index == cntry.index:  # replace
-                cntry.value = value
-                new_entry = cntry
-                self.updateEntry(i)
-                entry_index = i
-                break
-        if entry_index < 0:  # append it
-            cntry = self.SRTKeyFrame(value, index)
-            entries.append(cntry)
-            self.updateEntry(entry_index)
-        if delta is None:
-            self.updateEntry(entry_index)
-        else:
-            cntry.delta = delta
+        i = self.__find(index)
+        if i >= 0:  # replace
+            self.values[i] = value
+        else:  # insert
+            i = np.searchsorted(self.frames, index)
+            self.frames = np.insert(self.frames, i, index)
+            self.values = np.insert(self.values, i, value)
+            self.deltas = np.insert(self.deltas, i, 0)
+        self.updateEntry(i)
+        if delta is not None:
+            self.deltas[i] = delta
 
     def removeKeyFrame(self, index):
         """ Removes key frame from list, updating delta """
-        if index == 0:
+        i = self.__find(index)
+        if i <= 0:
             return
-        entries = self.entries
-        for i in range(1, len(entries)):
-            if entries[i].index == index:
-                prev = entries[i - 1]
-                if i == len(entries) - 1:  # last entry?
-                    next_entry = entries[0]
-                    next_id = self.framecount
-                else:
-                    next_entry = entries[i + 1]
-                    next_id = next_entry.index
-                prev.value = self.calcDelta(prev.index, prev.value, next_id, next_entry.value)
-                entries.pop(i)
-                break
+        if i == len(self.frames) - 1:  # last entry?
+            next_index = 0
+            next_id = self.framecount
+        else:
+            next_index = i + 1
+            next_id = self.frames[next_index]
+        prev = i - 1
+        self.deltas[prev] = self.calcDelta(self.frames[prev], self.values[prev], next_id, self.values[next_index])
+        self.frames = np.delete(self.frames, i)
+        self.values = np.delete(self.values, i)
+        self.deltas = np.delete(self.deltas, i)
 
     def clearFrames(self, is_scale):
         """ Clears all frames, resetting to one default """
-        start_val = 1 if is_scale else 0
-        self.entries = [self.SRTKeyFrame(start_val)]
+        self.setFixed(1 if is_scale else 0)
 
     def setFrameCount(self, frameCount):
         """ Sets frame count, removing extra frames """
-        e = self.entries
         self.framecount = frameCount
-        for i in range(len(e)):
-            if e[i].index > frameCount:
-                self.entries = e[:i]  # possibly fix ending delta todo?
-                return i
+        i = np.searchsorted(self.frames, frameCount, side='right')
+        if i < len(self.frames):
+            self.frames = self.frames[:i]  # possibly fix ending delta todo?
+            self.values = self.values[:i]
+            self.deltas = self.deltas[:i]
+            return i
         return 0
 
 
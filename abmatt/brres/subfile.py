@@ -5,6 +5,7 @@
 # Most Brres Subfiles
 # --------------------------------------------------------
 import os
+from struct import unpack_from
 
 from abmatt.autofix import Bug, AutoFix
 from abmatt.brres.lib.binfile import BinFile
@@ -13,12 +14,18 @@ from abmatt.brres.lib.node import Clipable, Packable
 
 
 def set_anim_str(animation, key, value):
+    """ sets the animation key, returns True if changed """
     if key == 'framecount':  # framecount
         val = validInt(value, 1)
-        animation.framecount = val
+        if animation.framecount != val:
+            animation.framecount = val
+            return True
     elif key == 'loop':  # loop
         val = validBool(value)
-        animation.loop = val
+        if animation.loop != val:
+            animation.loop = val
+            return True
+    return False
 
 
 def get_anim_str(animation, key):
@@ -54,6 +61,7 @@ class SubFile(Clipable, Packable):
 
     def __init__(self, name, parent, binfile):
         """ initialize with parent of this file """
+        self.section = None  # original data, packed as is while unmodified
         super(SubFile, self).__init__(name, parent, binfile)
         self.version = self.EXPECTED_VERSION
         if binfile:
@@ -62,6 +70,9 @@ class SubFile(Clipable, Packable):
     def _getNumSections(self):
         return self.VERSION_SECTIONCOUNT[self.version]
 
+    def is_loaded(self):
+        return True
+
     def check(self):
         if self.version != self.EXPECTED_VERSION:
             b = Bug(2, 3, '{} {} unusual version {}'.format(self.MAGIC, self.name, self.version),
@@ -69,7 +80,7 @@ class SubFile(Clipable, Packable):
             if self.FORCE_VERSION:
                 self.version = self.EXPECTED_VERSION
                 b.resolve()
-                self.parent.is_modified = True
+                self.mark_modified(False)
 
     def save(self, dest, overwrite):
         if dest is None:
@@ -84,3 +95,86 @@ class SubFile(Clipable, Packable):
         self.pack(bin)
         bin.commitWrite()
         return dest
+
+
+class LazySubFile:
+    """
+    Stands in for a sub file that hasn't been unpacked yet.
+    The first time an attribute is accessed, the sub file is unpacked in place,
+    so that references to the proxy become references to the actual sub file.
+    """
+
+    def __init__(self, klass, name, parent, binfile):
+        self._klass = klass
+        self._binfile = binfile
+        self._offset = binfile.offset
+        self._post_load = []
+        self.name = name
+        self.parent = parent
+        self.is_modified = False
+
+    def __getattr__(self, item):
+        # only called for attributes the proxy doesn't have
+        if '_klass' not in self.__dict__:
+            raise AttributeError(item)
+        self._load()
+        return getattr(self, item)
+
+    def __str__(self):
+        self._load()
+        return str(self)
+
+    def __getitem__(self, item):
+        self._load()
+        return self[item]
+
+    def is_loaded(self):
+        return False
+
+    def get_payload_size(self):
+        binfile = self._binfile
+        return unpack_from(binfile.bom + 'I', binfile.file, self._offset + 4)[0]
+
+    def mark_unmodified(self):
+        self.is_modified = False
+
+    def on_load(self, callback):
+        """Calls callback with the sub file once it is unpacked"""
+        self._post_load.append(callback)
+
+    def _load(self):
+        klass = self._klass
+        binfile = self._binfile
+        post_load = self._post_load
+        del self._klass, self._binfile, self._post_load
+        offset = binfile.offset  # in case we are in the middle of unpacking something else
+        binfile.offset = self._offset
+        del self._offset
+        self.__class__ = klass
+        klass.__init__(self, self.name, self.parent, binfile)
+        binfile.offset = offset
+        for x in post_load:
+            x(self)
+
+
+def get_payload_size(subfile):
+    """Gets the packed size of the sub file, estimated from its data if it wasn't unpacked"""
+    if type(subfile) == LazySubFile:
+        return subfile.get_payload_size()
+    if subfile.section is not None:
+        return len(subfile.section.data)
+    size = 0
+    for x in [subfile] + getattr(subfile, 'objects', []) + getattr(subfile, 'vertices', []) + \
+            getattr(subfile, 'normals', []) + getattr(subfile, 'uvs', []) + getattr(subfile, 'colors', []):
+        data = getattr(x, 'data', None)
+        if data is not None:
+            size += data.nbytes if hasattr(data, 'nbytes') else len(data)
+    return size
+
+
+def on_load(subfile, callback):
+    """Calls callback with the sub file once it is unpacked, immediately if it already is"""
+    if type(subfile) == LazySubFile:
+        subfile.on_load(callback)
+    else:
+        callback(subfile)
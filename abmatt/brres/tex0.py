@@ -2,6 +2,7 @@
 from math import log
 
 from abmatt.autofix import Bug, AutoFix
+from abmatt.brres.lib.binfile import unmap_data
 from abmatt.brres.lib.matching import parseValStr, validInt
 from abmatt.brres.lib.packing.pack_tex0 import PackTex0
 from abmatt.brres.lib.unpacking.unpack_tex0 import UnpackTex0
@@ -58,7 +59,7 @@ class Tex0(SubFile):
         elif key == 'mipmapcount':
             return self.set_mipmap_count(validInt(value, 0, 20))
         elif key == 'name':
-            return self.parent.rename_texture(value)
+            return self.parent.rename_texture(self, value)
 
     def set_format(self, fmt):
         if fmt != self.format:
@@ -105,7 +106,7 @@ class Tex0(SubFile):
         self.format = item.format
         self.num_images = item.num_images
         self.num_mips = item.num_mips
-        self.data = item.data
+        self.data = unmap_data(item.data)
         self.mark_modified()
 
     def should_resize_pow_two(self):
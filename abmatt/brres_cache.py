@@ -0,0 +1,103 @@
+"""Least recently used cache of open brres files"""
+from collections import OrderedDict
+
+from abmatt.autofix import AutoFix
+from abmatt.brres import Brres
+
+
+class BrresCache:
+    """Maps file names to open brres files, closing the least recently used files
+    once their estimated size exceeds max_size bytes or there are more than max_files.
+    Modified files are saved when evicted, unmodified files are dropped and reopened on the next access.
+    """
+
+    def __init__(self, max_size, max_files=None):
+        self.max_size = max_size
+        self.max_files = max_files
+        self.files = OrderedDict()  # least recently used first
+        self.evicted = set()  # names of evicted files, for counting reloads
+        self.hits = self.misses = self.reloads = self.evictions = 0
+
+    def __len__(self):
+        return len(self.files)
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __contains__(self, filename):
+        return filename in self.files
+
+    def __getitem__(self, filename):
+        return self.files[filename]
+
+    def __setitem__(self, filename, brres):
+        self.files[filename] = brres
+        self.files.move_to_end(filename)
+
+    def values(self):
+        return self.files.values()
+
+    def items(self):
+        return self.files.items()
+
+    def pop(self, filename):
+        return self.files.pop(filename)
+
+    def touch(self, files):
+        """Marks the open files as most recently used"""
+        for x in files:
+            if x.name in self.files:
+                self.files.move_to_end(x.name)
+                self.hits += 1
+
+    def get(self, filename):
+        """Gets the open file, opening it on a miss, evictions are left to the caller"""
+        brres = self.files.get(filename)
+        if brres is not None:
+            self.files.move_to_end(filename)
+            self.hits += 1
+            return brres
+        self.misses += 1
+        if filename in self.evicted:
+            self.evicted.remove(filename)
+            self.reloads += 1
+        brres = self.files[filename] = Brres.get_brres(filename, True)
+        return brres
+
+    def get_size(self):
+        return sum(x.get_size_estimate() for x in self.files.values())
+
+    def is_full(self, size):
+        return size > self.max_size or self.max_files is not None and len(self.files) > self.max_files
+
+    def evict(self, exclude=()):
+        """Closes least recently used files until within the limits, except those in exclude.
+        Returns the closed files
+        """
+        sizes = OrderedDict((name, x.get_size_estimate()) for name, x in self.files.items())
+        size = sum(sizes.values())
+        closed = []
+        for name in sizes:
+            if not self.is_full(size):
+                break
+            brres = self.files[name]
+            if brres in exclude:
+                continue
+            if brres.is_modified and not brres.save():
+                AutoFix.get().warn('Keeping {} open, unable to save changes'.format(name))
+                continue
+            brres.close(try_save=False)
+            del self.files[name]
+            self.evicted.add(name)
+            self.evictions += 1
+            size -= sizes[name]
+            closed.append(brres)
+        return closed
+
+    def clear(self):
+        self.files.clear()
+        self.evicted.clear()
+
+    def get_stats(self):
+        return {'files': len(self.files), 'size': self.get_size(), 'hits': self.hits, 'misses': self.misses,
+                'reloads': self.reloads, 'evictions': self.evictions}
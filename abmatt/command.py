@@ -7,6 +7,7 @@ from cmd import Cmd
 
 from abmatt.autofix import AutoFix
 from abmatt.brres import Brres
+from abmatt.brres_cache import BrresCache
 from abmatt.brres.lib.binfile import UnpackingError, PackingError
 from abmatt.brres.lib.matching import validInt, MATCHING
 from abmatt.brres.mdl0.material.layer import Layer
@@ -85,7 +86,9 @@ class Command:
     DESTINATION = None
     OVERWRITE = False
     ACTIVE_FILES = []  # currently being used in selection
-    OPEN_FILES = {}  # currently open
+    MAX_FILES_OPEN = 6
+    MAX_BRRES_MEMORY = 0x20000000  # estimated bytes of open files
+    OPEN_FILES = BrresCache(MAX_BRRES_MEMORY, MAX_FILES_OPEN)  # file names to currently open files
     FILES_MARKED = set()  # files marked as modified
     MODELS = []
     MATERIALS = []
@@ -94,7 +97,6 @@ class Command:
     APP_DIR = None
     CLIPBOARD = None
     CLIPTYPE = None
-    MAX_FILES_OPEN = 6
     DEBUG = False
 
     @staticmethod
@@ -103,9 +105,13 @@ class Command:
         if max_brres_files:
             try:
                 i = int(max_brres_files)
-                Command.MAX_FILES_OPEN = i
+                Command.MAX_FILES_OPEN = Command.OPEN_FILES.max_files = i
             except ValueError:
                 pass
+        try:
+            Command.MAX_BRRES_MEMORY = Command.OPEN_FILES.max_size = validInt(config['max_brres_memory'], 1) * 0x100000
+        except (TypeError, ValueError):
+            pass
 
     TYPE_SETTING_MAP = {
         "material": Material.SETTINGS,
@@ -373,6 +379,7 @@ class Command:
         # check in opened files
         files = MATCHING.findAll(filename, Command.OPEN_FILES.values())
         if files:
+            Command.OPEN_FILES.touch(files)
             Command.ACTIVE_FILES = files
         else:
             # try to find file path
@@ -391,76 +398,46 @@ class Command:
         return Command.ACTIVE_FILES
 
     @staticmethod
-    def closeFiles(file_names):
-        opened = Command.OPEN_FILES
-        marked = Command.FILES_MARKED
-        for x in file_names:
-            file = opened.pop(x)
-            file.close()
-            marked.remove(file)
+    def close_all(try_save=True):
+        """Closes all open files and clears the selection"""
+        for file in Command.OPEN_FILES.values():
+            file.close(try_save)
+        AutoFix.get().log('Brres cache {}'.format(Command.OPEN_FILES.get_stats()))
+        Command.OPEN_FILES.clear()
+        Command.FILES_MARKED = set()
+        Command.ACTIVE_FILES = []
+        Command.MODELS = []
+        Command.MATERIALS = []
+        Command.SELECTED = []
+        Command.SELECT_TYPE = None
 
     @staticmethod
-    def auto_close(amount, exclude=[]):
-        can_close = []  # modified but can close
-        to_close = []  # going to close if needs closing
-        excluded = []
-        opened = Command.OPEN_FILES
-        # first pass, mark non-modified files for closing, and appending active
-        for x in opened:
-            if x not in exclude:
-                if not opened[x].is_modified:
-                    to_close.append(x)
-                    amount -= 1
-                else:
-                    can_close.append(x)
-            else:
-                excluded.append(opened[x])
-        if amount:
-            for x in can_close:
-                to_close.append(x)
-                amount -= 1
-                if not amount:
-                    break
-        Command.closeFiles(to_close)
-        return excluded
+    def evict_files():
+        """Closes the least recently used files outside the active files when over the limits"""
+        for x in Command.OPEN_FILES.evict(Command.ACTIVE_FILES):
+            Command.FILES_MARKED.discard(x)
 
     @staticmethod
     def openFiles(filenames):
         opened = Command.OPEN_FILES
-        max = Command.MAX_FILES_OPEN  # max that can remain open
-        if max - len(filenames) < 0:
+        if opened.max_files is not None and len(filenames) > opened.max_files:
             raise MaxFileLimit()
-        to_open = [f for f in filenames if f not in opened]
-        total = len(to_open) + len(opened)
-        if total > max:
-            active = Command.auto_close(total - max, to_open)
-            for x in active:
-                to_open.remove(x.name)
-        else:
-            active = []
-        # open any that aren't opened
-        for f in to_open:
-            # try:
-            brres = Brres.get_brres(f, True)
-            opened[f] = brres
-            active.append(brres)
-        # except UnpackingError as e:
-        #     AutoFix.get().error(e)
+        active = [opened.get(os.path.abspath(f)) for f in filenames]
+        Command.ACTIVE_FILES = active
+        Command.evict_files()
         return active
 
     @staticmethod
     def create_or_open(filename):
-        amount = len(Command.OPEN_FILES) - Command.MAX_FILES_OPEN
-        if amount > 0:
-            Command.auto_close(amount, [filename])
         if os.path.exists(filename):
             files = Command.updateFile(filename)
             b = files[0] if len(files) else None
         else:
             b = Brres(filename, readFile=False)
-            Command.OPEN_FILES[filename] = b
+            Command.OPEN_FILES[b.name] = b
             Command.ACTIVE_FILES = [b]
             Command.MODELS = []
+            Command.evict_files()
         return b
 
     @staticmethod
@@ -1,6 +1,6 @@
 import numpy as np
 
-from abmatt.converters.influence import Influence, Weight, InfluenceCollection, Joint
+from abmatt.converters.influence import Influence, Weight, InfluenceCollection, get_world_positions
 from abmatt.converters.matrix import combine_matrices
 
 
@@ -20,7 +20,7 @@ class Controller:
     def __order_bones(self, bone_map):
         bones = self.bones
         controller_matrices = self.inv_bind_matrix.reshape((-1, 4, 4))
-        bone_matrices = [Joint.get_world_position(bone_map[bone]) for bone in bones]
+        bone_matrices = get_world_positions([bone_map[bone] for bone in bones])
         new_bone_map = []
         for i in range(len(controller_matrices)):
             test_matrix = controller_matrices[i]
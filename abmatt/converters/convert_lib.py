@@ -14,6 +14,9 @@ from abmatt.converters.influence import decode_mdl0_influences
 from abmatt.converters.matrix import matrix_to_srt
 from abmatt.image_converter import EncodeError, NoImgConverterError, ImgConverter
 
+FLOAT_DIGITS = 6
+MAX_FIXED = 2.0 ** 43  # scaled floats beyond this aren't exact enough to format in fixed point
+
 
 class Converter:
     NoNormals = 0x1
@@ -24,7 +27,10 @@ class Converter:
     class ConvertError(Exception):
         pass
 
-    def __init__(self, brres, mdl_file, flags=0, encode=True, mdl0=None):
+    def __init__(self, brres, mdl_file, flags=0, encode=True, mdl0=None, base_dir=None):
+        """
+        :param base_dir: directory that relative paths are resolved against, defaults to the model file directory
+        """
         if not brres:
             # filename = Brres.getExpectedBrresFileName(mdl_file)
             d, f = os.path.split(mdl_file)
@@ -32,7 +38,8 @@ class Converter:
             brres = Brres.get_brres(filename, True)
         self.brres = brres
         self.texture_library = brres.get_texture_map()
-        self.mdl_file = mdl_file
+        self.mdl_file = os.path.abspath(mdl_file)
+        self.base_dir = os.path.abspath(base_dir) if base_dir else os.path.dirname(self.mdl_file)
         self.mdl0 = mdl0
         self.flags = flags
         self.image_library = set()
@@ -46,34 +53,25 @@ class Converter:
             mdl0 = self.mdl0
             if mdl0 is None:
                 self.mdl0 = mdl0 = self.brres.models[0]
-        self.cwd = os.getcwd()
-        dir, name = os.path.split(self.mdl_file)
-        if dir:
-            os.chdir(dir)
-        base_name, ext = os.path.splitext(name)
-        self.image_dir = base_name + '_maps'
+        base_name = os.path.splitext(os.path.basename(self.mdl_file))[0]
+        self.image_dir = base_name + '_maps'  # relative to the base dir
         self.influences = decode_mdl0_influences(mdl0)
         self.tex0_map = {}
         return base_name, mdl0
 
     def _end_saving(self, writer):
         self._create_image_library(self.tex0_map.values())
-        os.chdir(self.cwd)
         writer.write(self.mdl_file)
         AutoFix.get().info('\t...finished in {} seconds.'.format(round(time.time() - self.start, 2)))
 
     def _start_loading(self, model_name):
         AutoFix.get().info('Converting {}... '.format(self.mdl_file))
         self.start = time.time()
-        self.cwd = os.getcwd()
-        self.mdl_file = os.path.abspath(self.mdl_file)
         self.material_library = MaterialLibrary.get().materials
         brres_dir, brres_name = os.path.split(self.brres.name)
         base_name = os.path.splitext(brres_name)[0]
         self.is_map = True if 'map' in base_name else False
-        dir, name = os.path.split(self.mdl_file)
-        if dir:
-            os.chdir(dir)  # change to the dir to help find relative paths
+        name = os.path.basename(self.mdl_file)
         return self._init_mdl0(brres_name, os.path.splitext(name)[0], model_name)
 
     def _end_loading(self):
@@ -82,7 +80,6 @@ class Converter:
         self.brres.add_mdl0(mdl0)
         if self.is_map:
             mdl0.add_map_bones()
-        os.chdir(self.cwd)
         AutoFix.get().info('\t... finished in {} secs'.format(round(time.time() - self.start, 2)))
         return mdl0
 
@@ -152,9 +149,15 @@ class Converter:
         if not converter:
             AutoFix.get().error('No image converter found!')
             return False
-        converter.batch_decode(tex0s, self.image_dir)
+        converter.batch_decode(tex0s, self.get_path(self.image_dir))
         return True
 
+    def get_path(self, path):
+        """Resolves the path relative to the base directory"""
+        if path.startswith('file://'):
+            path = path[len('file://'):]
+        return os.path.join(self.base_dir, path)
+
     @staticmethod
     def __normalize_image_path_map(image_path_map):
         normalized = {}
@@ -176,7 +179,7 @@ class Converter:
                     normalized = True
                 if path is None:
                     continue
-            image_paths[map] = path
+            image_paths[map] = self.get_path(path)
         try:
             return self._try_import_textures(self.brres, image_paths)
         except NoImgConverterError as e:
@@ -211,3 +214,60 @@ class Converter:
 
 def float_to_str(fl):
     return ('%f' % fl).rstrip('0').rstrip('.')
+
+
+def floats_to_str(floats, sep=' ', row_sep=None):
+    """Formats all the floats like float_to_str joined by the single character sep,
+    rows of a 2d array are separated by row_sep if given
+    """
+    floats = np.asarray(floats, float)
+    row_size = floats.shape[-1] if row_sep and floats.ndim > 1 else 0
+    floats = floats.ravel()
+    count = len(floats)
+    if not count:
+        return ''
+    magnitude = np.abs(floats) * 10.0 ** FLOAT_DIGITS
+    if not (magnitude < MAX_FIXED).all():  # also catches nan
+        strs = [('%f' % x).rstrip('0').rstrip('.') for x in floats.tolist()]
+        if row_size:
+            return row_sep.join([sep.join(strs[i:i + row_size]) for i in range(0, count, row_size)])
+        return sep.join(strs)
+    fixed = np.round(magnitude).astype(np.int64)
+    # rounding ties could be off from the scaling error, so those are rounded exactly
+    for i in np.flatnonzero(np.abs(magnitude - np.floor(magnitude) - 0.5) <= magnitude * 2.0 ** -50):
+        fixed[i] = int(('%f' % abs(floats[i])).replace('.', ''))
+    num_digits = max(len(str(fixed.max())), FLOAT_DIGITS + 1)
+    # columns: separator, sign, digits with the point after the integer part
+    width = num_digits + 3
+    point = width - 1 - FLOAT_DIGITS
+    chars = np.zeros((count, width), np.uint8)
+    chars[:, point] = ord('.')
+    digit_counts = np.ones(count, np.int8)
+    zeros = np.zeros(count, np.int8)
+    trailing = np.ones(count, bool)
+    for i in range(num_digits):
+        fixed, digit = np.divmod(fixed, 10)
+        column = width - 1 - i - (i >= FLOAT_DIGITS)
+        chars[:, column] = digit + ord('0')
+        if i < FLOAT_DIGITS:
+            trailing &= digit == 0
+            zeros += trailing
+        digit_counts += fixed > 0
+    # characters from the first shown to the last non zero fraction digit are kept
+    integer_digits = np.maximum(digit_counts - FLOAT_DIGITS, 1)
+    start = point - integer_digits
+    end = np.where(zeros == FLOAT_DIGITS, point, width - zeros)
+    negative = np.signbit(floats)
+    chars[negative, start[negative] - 1] = ord('-')
+    start -= negative
+    columns = np.arange(width, dtype=np.int8)
+    keep = (columns >= start[:, None]) & (columns < end[:, None])
+    chars[:, 0] = ord(sep)
+    if row_size:
+        chars[::row_size, 0] = ord(row_sep)
+    keep[:, 0] = True
+    return chars[keep].tobytes()[1:].decode()
+
+
+def ints_to_str(ints, sep=' '):
+    return sep.join(map(str, np.asarray(ints).ravel().tolist()))
@@ -77,7 +77,6 @@ class ObjConverter(Converter):
     @staticmethod
     def __decode_geometry(geometry, material_name):
         geo = ObjGeometry(geometry.name)
-        geo.vertices = geometry.apply_linked_bone_bindings()
         geo.material_name = material_name
         geo.vertices = geometry.vertices
         geo.normals = geometry.normals
@@ -5,7 +5,7 @@ from lxml import etree
 
 from abmatt.converters.colors import ColorCollection
 from abmatt.converters.controller import Controller
-from abmatt.converters.convert_lib import float_to_str
+from abmatt.converters.convert_lib import float_to_str, floats_to_str, ints_to_str
 from abmatt.converters.geometry import Geometry
 from abmatt.converters.material import Material
 from abmatt.converters.matrix import scale_matrix, rotate_matrix, translate_matrix
@@ -26,6 +26,13 @@ def XMLNode(tag, text=None, id=None, name=None, parent=None):
     return ele
 
 
+def parse_array(text, dtype=float):
+    """Parses whitespace separated numbers to a 1-d array"""
+    if not text:
+        return np.zeros(0, dtype)
+    return np.fromstring(text, dtype, sep=' ')
+
+
 def first(element, item):
     for x in element.iter(item):
         return x
@@ -63,21 +70,13 @@ class Dae:
         self.y_up = True
         self.unit_meter = 1
         self.elements_by_id = {}
+        self.decoded_sources = {}  # source ids to decoded arrays
         if filename:
-            with open(filename) as f:
-                self.xml = self.__read_xml(f)
-            self.__init_elements_by_id(self.xml.getroot())
+            self.xml = self.__read_xml(filename)
         else:
             self.xml = self.__initialize_xml()
         self.__initialize_libraries(initial_scene_name)
 
-    def __init_elements_by_id(self, element):
-        id = element.get('id')
-        if id is not None:
-            self.elements_by_id[id] = element
-        for x in element:
-            self.__init_elements_by_id(x)
-
     def write(self, filename):
         self.xml.write(filename, pretty_print=True, xml_declaration=True, encoding='utf-8')
 
@@ -130,19 +129,18 @@ class Dae:
                 target = self.__get_bound_material(child)
                 node.geometries.append(self.decode_geometry(self.get_referenced_element(child, 'url'), target))
             elif child.tag == 'matrix':
-                node.matrix = np.array([float(x) for x in child.text.split()]).reshape((4, 4))
+                node.matrix = parse_array(child.text).reshape((4, 4))
             elif child.tag == 'extra':
                 node.extra = child
             elif child.tag == 'node':
                 node.nodes.append(self.decode_node(child))
             elif child.tag == 'scale':
-                node.scale([float(x) for x in child.text.split()])
+                node.scale(parse_array(child.text))
             elif child.tag == 'rotate':
-                rotation = [float(x) for x in child.text.split()]
-                angle = rotation.pop(-1)
-                node.rotate([x * angle for x in rotation])
+                rotation = parse_array(child.text)
+                node.rotate(rotation[:-1] * rotation[-1])
             elif child.tag == 'translate':
-                node.translate([float(x) for x in child.text.split()])
+                node.translate(parse_array(child.text))
         return node
 
     def add_node(self, node, parent=None):
@@ -155,7 +153,7 @@ class Dae:
                 xml_node.attrib[key] = att[key]
         xml_node.attrib['sid'] = node.name
         if node.matrix is not None:
-            matrix_xml = XMLNode('matrix', ' '.join([float_to_str(x) for x in node.matrix.flatten()]), parent=xml_node)
+            matrix_xml = XMLNode('matrix', floats_to_str(node.matrix), parent=xml_node)
             matrix_xml.attrib['sid'] = 'matrix'
         if node.extra is not None:
             xml_node.append(node.extra)
@@ -179,20 +177,17 @@ class Dae:
         if ref.tag != 'geometry':  # fix for badly formed xml
             ref = self.search_library_by_id(self.geometries, skin.attrib['source'][1:])
         geometry = self.decode_geometry(ref, bind_material)
-        bind_shape_matrix = np.array([float(x) for x in first(skin, 'bind_shape_matrix').text.split()],
-                                     dtype=float).reshape((4, 4))
+        bind_shape_matrix = parse_array(first(skin, 'bind_shape_matrix').text).reshape((4, 4))
         joints = first(skin, 'joints')
         for input in joints:
             semantic = input.attrib['semantic']
             if semantic == 'INV_BIND_MATRIX':
                 matrices = self.get_referenced_element(input, 'source')
                 data_type, float_arr = self.trace_technique_common(matrices)
-                inv_bind_matrices = np.array([float(x) for x in float_arr.text.split()], float)
-                inv_bind_matrices.reshape((-1, 4, 4))
+                inv_bind_matrices = self.__decode_array(float_arr)
         vertex_weights = first(skin, 'vertex_weights')
-        vertex_weight_count = [int(x) for x in first(vertex_weights, 'vcount').text.split()]
-        vertex_weight_indices = np.array([int(x) for x in first(vertex_weights, 'v').text.split()], int)
-        vertex_weight_indices = vertex_weight_indices.reshape((-1, 2))
+        vertex_weight_count = parse_array(first(vertex_weights, 'vcount').text, int)
+        vertex_weight_indices = parse_array(first(vertex_weights, 'v').text, int).reshape((-1, 2))
         input_count = 0
         for input in vertex_weights.iter('input'):
             offset = int(input.attrib['offset'])
@@ -206,7 +201,7 @@ class Dae:
             elif semantic == 'WEIGHT':
                 weight_xml = self.get_referenced_element(input, 'source')
                 data_type, weight_xml_data = self.trace_technique_common(weight_xml)
-                weights = np.array([float(x) for x in weight_xml_data.text.split()], float)
+                weights = self.__decode_array(weight_xml_data)
             else:
                 raise ValueError('Unknown Semantic {} in controller {}'.format(semantic, name))
             input_count += 1
@@ -219,9 +214,7 @@ class Dae:
         xml_controller = XMLNode('controller', id=controller_id, parent=self.controllers)
         xml_skin = XMLNode('skin', parent=xml_controller)
         xml_skin.attrib['source'] = '#' + get_id(self.add_geometry(controller.geometry))
-        bind_shape_matrix = XMLNode('bind_shape_matrix', ' '.join([float_to_str(x) for \
-                                                                   x in controller.bind_shape_matrix.flatten()]),
-                                    parent=xml_skin)
+        bind_shape_matrix = XMLNode('bind_shape_matrix', floats_to_str(controller.bind_shape_matrix), parent=xml_skin)
         joint_source_id = controller_id + '-joints'
         joint_source = XMLNode('source', id=joint_source_id, parent=xml_skin)
         name_array_id = joint_source_id + '-array'
@@ -232,8 +225,7 @@ class Dae:
         matrices_source_id = controller_id + '-matrices'
         matrices_source = XMLNode('source', id=matrices_source_id, parent=xml_skin)
         matrices_array_id = matrices_source_id + '-array'
-        inv_bind_matrix = controller.inv_bind_matrix.flatten()
-        float_array = XMLNode('float_array', ' '.join([float_to_str(x) for x in inv_bind_matrix]), id=matrices_array_id,
+        float_array = XMLNode('float_array', floats_to_str(controller.inv_bind_matrix), id=matrices_array_id,
                               parent=matrices_source)
         float_array.attrib['count'] = str(16 * bone_len)
         self.__create_technique_common(matrices_array_id, bone_len, 'float4x4', matrices_source, 16)
@@ -241,7 +233,7 @@ class Dae:
         weight_source = XMLNode('source',
                                 id=weight_source_id, parent=xml_skin)
         float_array_id = weight_source_id + '-array'
-        float_array = XMLNode('float_array', ' '.join([float_to_str(x) for x in controller.weights.flatten()]),
+        float_array = XMLNode('float_array', floats_to_str(controller.weights),
                               id=float_array_id, parent=weight_source)
         weight_count = len(controller.weights)
         float_array.attrib['count'] = str(weight_count)  # todo, vertex count or total weight?
@@ -253,9 +245,8 @@ class Dae:
         vertex_weights.attrib['count'] = str(len(controller.vertex_weight_counts))
         self.__create_input_node('JOINT', joint_source_id, 0, vertex_weights)
         self.__create_input_node('WEIGHT', weight_source_id, 1, vertex_weights)
-        vcount = XMLNode('vcount', ' '.join([str(x) for x in controller.vertex_weight_counts]), parent=vertex_weights)
-        vw_data = XMLNode('v', ' '.join([str(x) for x in controller.vertex_weight_indices.flatten()]),
-                          parent=vertex_weights)
+        vcount = XMLNode('vcount', ints_to_str(controller.vertex_weight_counts), parent=vertex_weights)
+        vw_data = XMLNode('v', ints_to_str(controller.vertex_weight_indices), parent=vertex_weights)
         return xml_controller
 
     def decode_geometry(self, xml_geometry, material_name=None):
@@ -266,14 +257,13 @@ class Dae:
         inputs = []
         stride = 0
         uniqueOffsets = []
-        indices = []
         for input in tri_node.iter('input'):
             offset = int(input.attrib['offset'])
             if offset not in uniqueOffsets:   # duplicate
                 uniqueOffsets.append(offset)
             inputs.append(input)
-        for x in tri_node.iter('p'):
-            indices.extend([int(index) for index in x.text.split()])
+        indices = [parse_array(x.text, int) for x in tri_node.iter('p')]
+        indices = np.concatenate(indices) if len(indices) > 1 else indices[0]
         vertices = normals = colors = None
         texcoords = []
         data_inputs = []
@@ -294,7 +284,7 @@ class Dae:
                 data_types.append(input.attrib['semantic'])
                 offsets.append(offset)
                 stride += 1
-        triangles = np.array(indices, np.uint16).reshape((-1, 3, len(uniqueOffsets)))
+        triangles = indices.astype(np.uint32).reshape((-1, 3, len(uniqueOffsets)))  # split later if past 16 bits
         count = tri_node.attrib.get('count')
         if count is not None and int(count) != triangles.shape[0]:
             raise ValueError('Failed to parse {} triangles of unexpected shape, expected {} and got {}'.format(material_name, count, triangles.shape[0]))
@@ -362,7 +352,7 @@ class Dae:
             tris.append(texcoord.face_indices)
             offset += 1
         data = np.stack(tris, -1).flatten()
-        tri_data = XMLNode('p', ' '.join([str(x) for x in data]), parent=triangles)
+        tri_data = XMLNode('p', ints_to_str(data), parent=triangles)
         vert_node = XMLNode('vertices', id=name + '-VERTEX', parent=mesh)
         input_node = self.__create_input_node('POSITION', name + '-POSITION')
         vert_node.append(input_node)
@@ -454,16 +444,21 @@ class Dae:
                 except (ValueError, AttributeError):
                     pass
 
-    @staticmethod
-    def __read_xml(file):
-        parser = etree.XMLParser(remove_blank_text=True)
-        tree = etree.parse(file, parser)
-        root = tree.getroot()
-        for elem in root.getiterator():
-            i = elem.tag.find('}')
+    def __read_xml(self, filename):
+        """Builds the tree in one pass, removing namespaces and indexing elements with ids"""
+        elements_by_id = self.elements_by_id
+        context = etree.iterparse(filename, events=('end',), remove_blank_text=True)
+        for event, elem in context:
+            tag = elem.tag
+            if type(tag) != str:  # comment or processing instruction
+                continue
+            i = tag.find('}')
             if i >= 0:
-                elem.tag = elem.tag[i + 1:]
-        return tree
+                elem.tag = tag[i + 1:]
+            id = elem.get('id')
+            if id is not None:
+                elements_by_id[id] = elem
+        return etree.ElementTree(context.root)
 
     def __initialize_libraries(self, initial_name):
         libraries = ('images', 'materials', 'effects',
@@ -515,7 +510,7 @@ class Dae:
     @staticmethod
     def __get_default_shader_color(name, iterable=(0.0, 0.0, 0.0, 1.0)):
         shader_color = XMLNode(name)
-        text = ' '.join([float_to_str(x) for x in iterable])
+        text = floats_to_str(iterable)
         color = XMLNode('color', text)
         color.attrib['sid'] = name
         shader_color.append(color)
@@ -531,10 +526,7 @@ class Dae:
     @staticmethod
     def __create_source(name, data_collection, params):
         source = XMLNode('source', id=name)
-        text = ''
-        for x in data_collection:
-            text += ' '.join([float_to_str(y) for y in x.flatten()]) + ' '
-        source_array = XMLNode('float_array', text, id=name + '-array', parent=source)
+        source_array = XMLNode('float_array', floats_to_str(data_collection), id=name + '-array', parent=source)
         technique_common = XMLNode('technique_common', parent=source)
         accessor = XMLNode('accessor', parent=technique_common)
         accessor.attrib['source'] = '#' + name + '-array'
@@ -565,7 +557,7 @@ class Dae:
         accessor = first(first(source, 'technique_common'), 'accessor')
         stride = accessor.attrib['stride']
         float_array = self.get_referenced_element(accessor, 'source')
-        points = np.array([float(x) for x in float_array.text.split()])
+        points = self.__decode_array(float_array)
         if stride:
             points = points.reshape((-1, int(stride)))
         offset = int(input.attrib['offset'])
@@ -576,8 +568,18 @@ class Dae:
         else:
             raise ValueError('Unknown collada input {}'.format(decoded_type))
 
+    def __decode_array(self, array):
+        """Decodes the float array, arrays with ids are only parsed once and copied on use"""
+        id = array.get('id')
+        data = self.decoded_sources.get(id) if id is not None else None
+        if data is None:
+            data = parse_array(array.text)
+            if id is not None:
+                self.decoded_sources[id] = data
+        return np.copy(data)
+
     def __decode_source(self, source):
-        data = np.array([float(x) for x in first(source, 'float_array').text.split()], dtype=float)
+        data = self.__decode_array(first(source, 'float_array'))
         accessor = first(first(source, 'technique_common'), 'accessor')
         stride = accessor.attrib.get('stride')
         if stride:
@@ -10,13 +10,16 @@ from abmatt.brres.mdl0.texcoord import TexCoord
 from abmatt.brres.mdl0.vertex import Vertex
 from abmatt.converters.colors import ColorCollection
 from abmatt.converters.convert_lib import Converter
-from abmatt.converters.influence import InfluenceCollection
+from abmatt.converters.influence import InfluenceCollection, apply_influences
 from abmatt.converters.matrix import get_rotation_matrix, apply_matrix
 from abmatt.converters.points import PointCollection
-from abmatt.converters.triangle import TriangleSet
+from abmatt.converters.triangle import TriangleStripper, get_index_dtype
 
 
 class Geometry:
+    STRIPPER = TriangleStripper     # TriangleSet is the slower object based fallback
+    MAX_POINTS = 0xffff     # larger geometries are split into multiple polygons to be indexed in 16 bits
+
     def __init__(self, name, material_name, vertices, texcoords=None, normals=None, colors=None, triangles=None,
                  influences=None, linked_bone=None):
         self.name = name
@@ -61,7 +64,7 @@ class Geometry:
         points[:, [1, 2]] = points[:, [2, 1]]
 
     def apply_linked_bone_bindings(self):
-        self.influences.apply_world_position(self.vertices)
+        self.vertices.points = self.influences.apply_world_position(self.vertices)
 
     def apply_matrix(self, matrix):
         if matrix is not None and not np.allclose(matrix, np.identity(4)):
@@ -75,7 +78,68 @@ class Geometry:
         self.index += 1
         return j
 
+    def split(self, max_points=None):
+        """Spatially partitions the triangles so that each geometry indexes at most max_points of each point type
+        :returns: list of geometries, [self] if no split is needed
+        """
+        if max_points is None:
+            max_points = self.MAX_POINTS
+        tris = self.__construct_tris()
+        if self.__fits(tris, max_points):
+            return [self]
+        centroids = self.vertices.points[tris[:, :, 0]].mean(axis=1)
+        chunks = []
+        stack = [np.arange(len(tris))]
+        while stack:
+            indices = stack.pop()
+            if self.__fits(tris[indices], max_points):
+                chunks.append(np.sort(indices))     # keep the original order for stripping
+            else:   # split at the median of the longest axis
+                points = centroids[indices]
+                axis = np.argmax(points.max(axis=0) - points.min(axis=0))
+                indices = indices[np.argsort(points[:, axis], kind='stable')]
+                half = len(indices) // 2
+                stack.append(indices[half:])
+                stack.append(indices[:half])
+        return [self.__get_chunk('{}_{}'.format(self.name, i), tris[chunks[i]]) for i in range(len(chunks))]
+
+    @staticmethod
+    def __fits(tris, max_points):
+        for i in range(tris.shape[-1]):
+            if len(np.unique(tris[:, :, i])) > max_points:
+                return False
+        return True
+
+    def __get_chunk(self, name, tris):
+        columns = iter(range(tris.shape[-1]))
+        vertices, used = self.__get_chunk_points(self.vertices, tris[:, :, next(columns)])
+        normals = colors = influences = None
+        if self.normals:
+            normals = self.__get_chunk_points(self.normals, tris[:, :, next(columns)])[0]
+        if self.colors:
+            face_indices = tris[:, :, next(columns)]
+            used_colors, face_indices = np.unique(face_indices, return_inverse=True)
+            colors = ColorCollection(self.colors.rgba_colors[used_colors], face_indices.reshape((-1, 3)),
+                                     self.colors.encode_format)
+        texcoords = [self.__get_chunk_points(x, tris[:, :, next(columns)])[0] for x in self.texcoords]
+        if self.influences is not None:
+            influences = self.influences
+            if influences.is_mixed():
+                influences = InfluenceCollection({i: influences[used[i]] for i in range(len(used))})
+        return Geometry(name, self.material_name, vertices, texcoords, normals, colors,
+                        influences=influences, linked_bone=self.linked_bone)
+
+    @staticmethod
+    def __get_chunk_points(points, face_indices):
+        used, face_indices = np.unique(face_indices, return_inverse=True)
+        return PointCollection(points.points[used], face_indices.reshape((-1, 3))), used
+
     def encode(self, mdl, bone=None):
+        """:returns: the encoded polygon, or the list of polygons if split"""
+        geometries = self.split()
+        if len(geometries) > 1:
+            AutoFix.get().info('Splitting {} into {} polygons'.format(self.name, len(geometries)))
+            return [x.encode(mdl, bone) for x in geometries]
         if not bone:
             bone = self.get_linked_bone()
             if not bone:
@@ -147,7 +211,7 @@ class Geometry:
 
     def __encode_tris(self, tris, is_weighted=False):
         tris[:, [0, 1]] = tris[:, [1, 0]]
-        triset = TriangleSet(tris, is_weighted)
+        triset = self.STRIPPER(tris, is_weighted)
         if not triset:
             return None, 0, 0
         data, face_count, facepoint_count = triset.get_tri_strips(self.fmt_str)
@@ -171,20 +235,20 @@ class Geometry:
         points = vertices.points
         if polygon.has_weighted_matrix():
             AutoFix.get().warn(f'Polygon weighting is experimental, {polygon.name} will likely be incorrect.')
-            for i in range(len(vertices)):
-                influence = self.influences[i]
-                points[i] = influence.apply_to(points[i], decode=False)
+            influences = self.influences
+            points[:] = apply_influences([influences[i] for i in range(len(vertices))], points, decode=False)
             vertex_format, vertex_divisor, remapper = vertices.encode_data(vert, True)
             if remapper is not None:
                 new_inf_map = {}
                 old_inf_map = self.influences.influences
                 for i in old_inf_map:
-                    new_inf_map[remapper[i]] = old_inf_map[i]
+                    j = remapper[i]
+                    if j >= 0:  # skip unused points
+                        new_inf_map[int(j)] = old_inf_map[i]
                 self.influences.influences = new_inf_map
         else:
             rotation_matrix = get_rotation_matrix(np.array(linked_bone.get_transform_matrix(), dtype=float))
-            for i in range(len(points)):
-                points[i] = np.dot(rotation_matrix, points[i])
+            points[:] = np.dot(points, rotation_matrix.T)
             inv_matrix = np.array(linked_bone.get_inv_transform_matrix(), dtype=float)
             vertices.points = apply_matrix(inv_matrix, vertices.points)
             vertices.encode_data(vert, False)
@@ -261,79 +325,38 @@ def get_index_format(item):
         return 'B'
 
 
-def decode_tri_strip(decoder, decoder_byte_len, data, start_offset, num_facepoints, face_point_indices):
-    face_points = []
-    flip = False
-    for i in range(num_facepoints):
-        face_points.append(unpack_from(decoder, data, start_offset))
-        start_offset += decoder_byte_len
-        if i >= 2:
-            if flip:
-                face_point_indices.append((face_points[i - 1], face_points[i - 2], face_points[i]))
-            else:
-                face_point_indices.append(face_points[i - 2:i + 1])
-        flip = not flip
-    return start_offset
-
-
-def decode_tris(decoder, decoder_byte_len, data, start_offset, num_facepoints, face_point_indices):
-    assert num_facepoints % 3 == 0
-    for i in range(int(num_facepoints / 3)):
-        tri = []
-        for j in range(3):
-            tri.append(unpack_from(decoder, data, start_offset))
-            start_offset += decoder_byte_len
-        face_point_indices.append(tri)
-    return start_offset
-
-
 def decode_geometry_group(geometry):
-    arr = np.array(geometry.data, np.float)
+    arr = geometry.data.astype(np.float)
     if geometry.divisor:
         arr = arr / (2 ** geometry.divisor)
     return arr
 
 
-def get_stride(decoder_string):
-    stride = 0
-    for x in decoder_string:
-        if x == 'H':
-            stride += 2
-        elif x == 'B':
-            stride += 1
-        elif x != '>':
-            raise ValueError('Unknown decoder format {}'.format(x))
-    return stride
-
-
-def decode_indices(polygon, fmt_str):
-    """Given a polygon and decoder string, decode the facepoint indices
-        :return (face_point_indices, weight_groups)
-        weight_groups is a map of the face_point index to a list of weight indices (matrices loaded)
+def scan_draw_cmds(polygon, stride):
+    """Scans the polygon display list for draw commands and weight groups
+        :return (draw_cmds, weight_groups)
+        draw_cmds is a list of (cmd, face point data offset, num_facepoints),
+        weight_groups is a map of the draw index to a list of weight indices (matrices loaded)
     """
-    # now decode the indices
-    face_point_indices = []
-    stride = get_stride(fmt_str)
     data = polygon.data
-    total_face_points = i = 0
+    draw_cmds = []
     weight_groups = {}
     new_weight_group = True
+    total_face_points = i = 0
     face_point_count = polygon.facepoint_count
     while total_face_points < face_point_count:
-        [cmd] = unpack_from('>B', data, i)
+        cmd = data[i]
         i += 1
         if cmd in (0x98, 0x90):
             [num_facepoints] = unpack_from('>H', data, i)
             i += 2
-            if cmd == 0x98:
-                i = decode_tri_strip(fmt_str, stride, data, i, num_facepoints, face_point_indices)
-            elif cmd == 0x90:
-                i = decode_tris(fmt_str, stride, data, i, num_facepoints, face_point_indices)
+            draw_cmds.append((cmd, i, num_facepoints))
+            i += num_facepoints * stride
             total_face_points += num_facepoints
             new_weight_group = True
         elif cmd in (0x20, 0x28, 0x30):  # load matrix
             if new_weight_group:
-                weight_groups[len(face_point_indices)] = weights = []
+                weight_groups[len(draw_cmds)] = weights = []
                 new_weight_group = False
             bone_index, len_and_xf_address = unpack_from('>2H', data, i)
             xf_address = 0xfff & len_and_xf_address
@@ -353,7 +376,39 @@ def decode_indices(polygon, fmt_str):
                 raise Converter.ConvertError('Texture matrices not supported')
         else:
             raise ValueError('Unsupported draw cmd {}'.format(cmd))
-    return face_point_indices, weight_groups
+    return draw_cmds, weight_groups
+
+
+def decode_indices(polygon, fmt_str):
+    """Given a polygon and decoder string, decode the facepoint indices
+        :return (face_point_indices, weight_groups)
+        face_point_indices is an array of triangles (triangle, face point, index),
+        weight_groups is a map of the face_point index to a list of weight indices (matrices loaded)
+    """
+    dtype = get_index_dtype(fmt_str)
+    stride = dtype.itemsize
+    draw_cmds, draw_weight_groups = scan_draw_cmds(polygon, stride)
+    if not draw_cmds:
+        return np.zeros((0, 3, len(dtype.names)), np.uint), {}
+    cmds, offsets, counts = np.array(draw_cmds, np.int64).T
+    # gather the face points of all draw commands
+    point_starts = np.cumsum(counts) - counts
+    point_offsets = np.repeat(offsets - point_starts * stride, counts) + np.arange(counts.sum()) * stride
+    data = np.frombuffer(polygon.data, np.uint8)
+    face_points = data[point_offsets[:, None] + np.arange(stride)].view(dtype)[:, 0]
+    face_points = np.stack([face_points[x] for x in dtype.names], -1).astype(np.uint)
+    # expand to triangles, strips flip the winding of every other triangle
+    is_strip = cmds == 0x98
+    tri_counts = np.where(is_strip, np.maximum(counts - 2, 0), counts // 3)
+    tri_starts = np.cumsum(tri_counts) - tri_counts
+    k = np.arange(tri_counts.sum()) - np.repeat(tri_starts, tri_counts)
+    tri_is_strip = np.repeat(is_strip, tri_counts)
+    first = np.repeat(point_starts, tri_counts) + np.where(tri_is_strip, k, k * 3)
+    tris = np.stack((first, first + 1, first + 2), -1)
+    flip = tri_is_strip & (k % 2 == 1)
+    tris[flip, 0], tris[flip, 1] = first[flip] + 1, first[flip]
+    weight_groups = {int(tri_starts[i]): draw_weight_groups[i] for i in draw_weight_groups}
+    return face_points[tris], weight_groups
 
 
 def decode_pos_mtx_indices(all_influences, weight_groups, vertices, pos_mtx_indices):
@@ -365,6 +420,8 @@ def decode_pos_mtx_indices(all_influences, weight_groups, vertices, pos_mtx_indi
     :return: InfluenceCollection
     """
     influences = {}     # map vertex indices to influences used by this geometry
+    applied_indices = []    # vertex indices with their influence in applied_influences
+    applied_influences = []
     vert_indices = vertices.face_indices
     points = vertices.points
     # Order the indices of each group so we can slice up the indices
@@ -387,11 +444,14 @@ def decode_pos_mtx_indices(all_influences, weight_groups, vertices, pos_mtx_indi
             vertex_index = vertex_indices[i]
             if vertex_index not in influences:
                 influences[vertex_index] = influence = all_influences[weight_indices[i]]
-                points[vertex_index] = influence.apply_to(points[vertex_index], decode=True)
+                applied_indices.append(vertex_index)
+                applied_influences.append(influence)
             elif influences[vertex_index].influence_id != weight_indices[i]:
                 AutoFix.get().warn(f'vertex {vertex_index} has multiple different influences!')
                 influences[vertex_index] = all_influences[weight_indices[i]]
 
+    if applied_indices:
+        points[applied_indices] = apply_influences(applied_influences, points[applied_indices], decode=True)
     assert len(influences) == len(points)
     return InfluenceCollection(influences)
 
@@ -415,7 +475,6 @@ def decode_polygon(polygon, influences):
         texcoords.append(polygon.get_uv_group(i))
 
     face_point_indices, weights = decode_indices(polygon, polygon.encode_str)
-    face_point_indices = np.array(face_point_indices, dtype=np.uint)
     face_point_indices[:, [0, 1]] = face_point_indices[:, [1, 0]]
     # decoded_verts =
     g_verts = PointCollection(decode_geometry_group(vertices), face_point_indices[:, :, vertex_index])
@@ -428,8 +487,7 @@ def decode_polygon(polygon, influences):
         rotation_matrix = get_rotation_matrix(np.array(linked_bone.get_inv_transform_matrix(), dtype=float))
         decoded_verts = influence.apply_to_all(g_verts.points, decode=True)
         if not np.allclose(rotation_matrix, np.identity(3)):
-            for i in range(len(decoded_verts)):
-                decoded_verts[i] = np.dot(rotation_matrix, decoded_verts[i])
+            decoded_verts[:] = np.dot(decoded_verts, rotation_matrix.T)
         influence_collection = InfluenceCollection({0: influence})
     if tex_matrix_index > 0:
         for x in polygon.has_tex_matrix:
@@ -1,6 +1,6 @@
 import numpy as np
 
-from abmatt.converters.matrix import apply_matrix, apply_matrix_single
+from abmatt.converters.matrix import apply_matrix, apply_matrix_single, apply_matrices, IDENTITY
 
 
 class Joint:
@@ -20,11 +20,74 @@ class Joint:
 
     @staticmethod
     def get_world_position(bone):
-        matrix = bone.get_inv_transform_matrix()
-        parent = bone.get_bone_parent()
-        if parent is not None:
-            return np.dot(matrix, Joint.get_world_position(parent))
-        return matrix
+        if not hasattr(bone, 'matrix_cache'):
+            matrix = bone.get_inv_transform_matrix()
+            parent = bone.get_bone_parent()
+            if parent is not None:
+                return np.dot(matrix, Joint.get_world_position(parent))
+            return matrix
+        return get_world_positions([bone])[0]
+
+
+def get_world_positions(bones):
+    """
+    Gets the world position matrices of mdl0 bones, which are cached on the bones until their matrices are set.
+    Uncached matrices are computed going down the bone tree from the nearest cached parent,
+    so each bone's matrix is computed once from its parent's.
+    The matrices are shared and should not be modified.
+    """
+    positions = []
+    for bone in bones:
+        matrix = bone.matrix_cache.get('world')
+        if matrix is None:
+            chain = []
+            parent = bone
+            while parent is not None and 'world' not in parent.matrix_cache:
+                chain.append(parent)
+                parent = parent.get_bone_parent()
+            if parent is not None:
+                matrix = parent.matrix_cache['world']
+            for x in reversed(chain):
+                inv_matrix = x.get_inv_transform_array()
+                matrix = inv_matrix if matrix is None else np.dot(inv_matrix, matrix)
+                x.matrix_cache['world'] = matrix
+        positions.append(matrix)
+    return positions
+
+
+def get_matrix_palette(influences, get_matrix):
+    """
+    Gets the distinct matrices of a list of influences
+    :param influences: list of influences
+    :param get_matrix: function of an influence to its matrix
+    :return: array of matrices, array of the matrix index for each influence
+    """
+    palette = {}  # id of influence to matrix index
+    matrices = []
+    indices = np.empty(len(influences), int)
+    for i, influence in enumerate(influences):
+        j = palette.get(id(influence))
+        if j is None:
+            j = palette[id(influence)] = len(matrices)
+            matrices.append(get_matrix(influence))
+        indices[i] = j
+    return np.array(matrices, float), indices
+
+
+def apply_influences(influences, points, decode=True):
+    """Applies each influence to the point at the same index, mixed influences are ignored
+    :param influences: list of influences
+    :param points: n x 3 array
+    :return: the transformed points
+    """
+    if not len(influences):
+        return points
+    if decode:
+        get_matrix = lambda x: IDENTITY if x.is_mixed() else x.get_matrix()
+    else:
+        get_matrix = lambda x: IDENTITY if x.is_mixed() else x.get_inv_matrix()
+    matrices, indices = get_matrix_palette(influences, get_matrix)
+    return apply_matrices(matrices, indices, points)
 
 
 class Influence:
@@ -67,7 +130,7 @@ class Influence:
             for bone in self.bone_weights:
                 weight = self.bone_weights[bone]
                 if matrix is None:
-                    matrix = np.array(weight.bone.get_transform_matrix())
+                    matrix = np.array(weight.bone.get_transform_array())
                 else:
                     raise NotImplementedError()
             self.matrix = matrix
@@ -96,12 +159,12 @@ class Influence:
         vertices = apply_matrix(matrix, vertices)
         return vertices
 
-    def __get_world_position_matrix(self):
+    def get_world_position_matrix(self):
         if self.world_matrix is None:
             matrix = None
             for bone in self.bone_weights:
                 bone_weight = self.bone_weights[bone]
-                bw_matrix = Joint.get_world_position(bone_weight.bone) * bone_weight.weight
+                bw_matrix = np.asarray(Joint.get_world_position(bone_weight.bone)) * bone_weight.weight
                 if matrix is None:
                     matrix = bw_matrix
                 else:
@@ -110,10 +173,10 @@ class Influence:
         return self.world_matrix
 
     def apply_world_position(self, vertex):
-        return apply_matrix_single(self.__get_world_position_matrix(), vertex)
+        return apply_matrix_single(self.get_world_position_matrix(), vertex)
 
     def apply_world_position_all(self, vertices):
-        return apply_matrix(self.__get_world_position_matrix(), vertices)
+        return apply_matrix(self.get_world_position_matrix(), vertices)
 
     def is_mixed(self):
         return len(self.bone_weights) > 1
@@ -182,89 +245,94 @@ class InfluenceCollection:
             return weight.bone
 
     def apply_world_position(self, vertices):
-        if len(self.influences) < len(vertices):
-            influence = self.influences[0]
-            influence.apply_world_position_all(vertices)
-        else:
-            for i in range(len(vertices)):
-                influence = self.influences[i]
-                influence.apply_world_position(vertices[i])
+        """Gets the vertex points transformed by the world position of their influences"""
+        points = vertices.points
+        if not len(points):
+            return points
+        if len(self.influences) < len(points):
+            return self.influences[0].apply_world_position_all(points)
+        influences = [self.influences[i] for i in range(len(points))]
+        matrices, indices = get_matrix_palette(influences, Influence.get_world_position_matrix)
+        return apply_matrices(matrices, indices, points)
 
     def get_weighted_tri_groups(self, tri_face_points):
         """
-        Get the WeightedTriGroups corresponding to the tri_face_points
+        Get the WeightedTriGroups corresponding to the tri_face_points.
+        Triangles are clustered by their set of influences, then the sets are packed into groups,
+        largest first, each into the group needing the fewest new influences
         """
         influences = self.influences
-        tris = [WeightedTri(x, [influences[x[i][0]] for i in range(3)]) for x in tri_face_points]
-        # construct the groups
-        groups = [WeightedTriGroup()]
-        for x in tris:
-            added = False
+        vertex_indices, inverse = np.unique(tri_face_points[:, :, 0], return_inverse=True)
+        influence_ids = np.array([influences[x].influence_id for x in vertex_indices])
+        tri_influence_ids = influence_ids[inverse].reshape((-1, 3))
+        # cluster the triangles by influence set
+        rows, row_inverse = np.unique(np.sort(tri_influence_ids, axis=1), axis=0, return_inverse=True)
+        clusters = {}
+        for i in range(len(rows)):
+            key = frozenset(rows[i].tolist())
+            cluster = clusters.get(key)
+            if cluster is None:
+                clusters[key] = [i]
+            else:
+                cluster.append(i)
+        # pack the sets
+        groups = []
+        for key in sorted(clusters, key=lambda x: -len(x)):
+            best = None
+            best_count = WeightedTriGroup.MAX_INFLUENCES
             for group in groups:
-                if group.try_adding(x):
-                    added = True
-                    break
-            if not added:
-                group = WeightedTriGroup([x])
-                groups.append(group)
+                count = len(key - group.influences)
+                if count < best_count and group.can_add(key):
+                    best = group
+                    best_count = count
+                    if not count:
+                        break
+            if best is None:
+                best = WeightedTriGroup()
+                groups.append(best)
+            best.add(key, clusters[key])
+        for group in groups:
+            tri_indices = np.flatnonzero(np.isin(row_inverse.ravel(), group.rows))  # in the original order
+            group.set_triangles(tri_face_points[tri_indices], tri_influence_ids[tri_indices])
         return groups
 
 
-
-
-class WeightedTri:
-    def __init__(self, tripoints, influences):
-        # self.vertices = [x[0] for x in tripoints]
-        self.tripoints = tripoints
-        self.influences = influences
-
-
 class WeightedTriGroup:
     """Represents a set of weighted triangles with a maximum of 10 influences"""
     MAX_INFLUENCES = 10     # can only have 10 matrices max
 
-    def __init__(self, triangles=None):
-        self.triangles = []
+    def __init__(self):
         self.influences = set()
-        self.matrices = None
-        if triangles is not None:
-            for x in triangles:
-                self.try_adding(x)
+        self.rows = []      # clustered influence rows in the group
+        self.face_points = self.influence_ids = None
+
+    def can_add(self, influences):
+        """Determines if the influences fit in the group"""
+        return len(self.influences | influences) <= self.MAX_INFLUENCES
 
-    def try_adding(self, triangle):
+    def add(self, influences, rows):
+        self.influences |= influences
+        self.rows.extend(rows)
+
+    def set_triangles(self, face_points, influence_ids):
         """
-        Tries to add the weighted triangle to the group by determining if the corresponding influences
-        will be too much to hold in the group
-        :param triangle: weighted triangle
-        :return: True on success
+        :param face_points: np array of the triangle face points, shape (n, 3, face point width)
+        :param influence_ids: np array of the influence id of each face point, shape (n, 3)
         """
-        need_adding = {inf.influence_id for inf in triangle.influences if inf.influence_id not in self.influences}
-        if len(need_adding) + len(self.influences) > self.MAX_INFLUENCES:
-            return False
-        for x in need_adding:
-            self.influences.add(x)
-        self.triangles.append(triangle)
-        return True
+        self.face_points = face_points
+        self.influence_ids = influence_ids
 
     def get_influence_indices(self):
         """
         Gets the influence indices (matrices) and the facepoint indexer for the triangles
         :return: influence indices,  np array shape (n, 3, 2)
         """
-        matrices = []
-        remapper = {}
-        for inf in self.influences:
-            remapper[inf] = len(matrices) * 3
-            matrices.append(inf)
-
-        # now construct facepoints
-        facepoint_indexer = []
-        for triangle in self.triangles:
-            tri = []
-            for i in range(3):  # each tri point
-                tri.append((remapper[triangle.influences[i].influence_id], *triangle.tripoints[i]))
-            facepoint_indexer.append(tri)
-        return matrices, np.array(facepoint_indexer, np.uint)
+        matrices = sorted(self.influences)
+        remapper = np.zeros(matrices[-1] + 1, int)
+        remapper[matrices] = np.arange(len(matrices)) * 3
+        matrix_indices = remapper[self.influence_ids].reshape(self.influence_ids.shape + (1,))
+        return matrices, np.concatenate((matrix_indices, self.face_points), axis=2).astype(np.uint)
+
 
 def decode_mdl0_influences(mdl0):
     influences = {}
@@ -14,12 +14,20 @@ def rotation_matrix_to_transform(matrix):
 
 
 def apply_matrix(matrix, points):
+    matrix = np.asarray(matrix, float)
     if np.allclose(matrix, IDENTITY):
         return points
-    matrix = matrix[:3]
-    # add a 1 after each point (for transformation)
-    new_col = np.full((len(points), 1), 1, dtype=float)
-    return np.array([matrix.dot(x) for x in np.append(points, new_col, 1)])
+    return np.dot(points, matrix[:3, :3].T) + matrix[:3, 3]
+
+
+def apply_matrices(matrices, indices, points):
+    """Transforms each point by its own matrix
+    :param matrices: array of 4x4 matrices (last row is ignored)
+    :param indices: index of the matrix for each point
+    :param points: n x 3 array
+    """
+    matrices = matrices[indices]
+    return np.einsum('nij,nj->ni', matrices[:, :3, :3], points) + matrices[:, :3, 3]
 
 
 def srt_to_matrix(scale=(1, 1, 1), rotation=(0, 0, 0), translation=(0, 0, 0)):
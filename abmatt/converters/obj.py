@@ -4,7 +4,7 @@ import re
 import numpy as np
 
 from abmatt.autofix import AutoFix
-from abmatt.converters.convert_lib import float_to_str
+from abmatt.converters.convert_lib import float_to_str, floats_to_str
 from abmatt.converters.points import PointCollection
 
 
@@ -63,7 +63,7 @@ class ObjMaterial:
 class ObjGeometry():
     def __init__(self, name):
         self.name = name
-        self.triangles = []
+        self.triangles = []     # face records until normalized
         self.texcoords = self.normals = self.vertices = None
         self.material_name = None
         self.has_normals = self.has_texcoords = False
@@ -72,6 +72,16 @@ class ObjGeometry():
     def add_tri(self, tri):
         self.triangles.append(tri)
 
+    def parse_triangles(self):
+        """Parses the face records to an array of (triangle, face point, index)"""
+        width = 1 + self.has_normals + self.has_texcoords
+        text = ' '.join(self.triangles).replace('//', ' ').replace('/', ' ')
+        triangles = np.fromstring(text, int, sep=' ') if self.triangles else np.zeros(0, int)
+        if len(triangles) != len(self.triangles) * 3 * width:
+            AutoFix.get().warn('Please triangulate your model before importing it!'.format(self.name))
+            raise ValueError('Normalize triangles failed')
+        return triangles.reshape((-1, 3, width))
+
     @staticmethod
     def normalize_indices_group(indices, data):
         minimum = indices.min()
@@ -86,13 +96,7 @@ class ObjGeometry():
         return PointCollection(ret, indices - minimum)
 
     def normalize(self, vertices, normals, tex_coords):
-        width = 1 + self.has_normals + self.has_texcoords
-        try:
-            triangles = np.array(self.triangles).reshape((-1, 3, width))
-        except ValueError as e:
-            AutoFix.get().warn('Please triangulate your model before importing it!'.format(self.name))
-            raise ValueError('Normalize triangles failed')
-        triangles = triangles - 1
+        triangles = self.parse_triangles() - 1
         self.triangles = triangles
         self.vertices = self.normalize_indices_group(triangles[:, :, 0], vertices)
         self.normals = self.normalize_indices_group(triangles[:, :, -1], normals) if self.has_normals else None
@@ -100,6 +104,8 @@ class ObjGeometry():
 
 
 class Obj():
+    CHUNK_SIZE = 0x10000     # rows formatted at a time when saving
+
     class ObjParseException(BaseException):
         pass
 
@@ -146,83 +152,94 @@ class Obj():
             f.write(s)
 
     def save_obj(self):
-        s = '# Wavefront OBJ exported with ABMATT v0.9.3\n\nmtllib ' + self.mtllib + '\n\n'
-        vertex_index = 1
-        normal_index = 1
-        normal_offset = -1
-        texcoord_index = 1
-        smooth = False
-        for geometry in self.geometries:
-            s += '#\n# object ' + geometry.name + '\n#\n\n'
-            vertex_count = len(geometry.vertices)
-            for vert in geometry.vertices:
-                s += 'v ' + ' '.join(float_to_str(x) for x in vert) + '\n'
-            s += '# {} vertices\n\n'.format(vertex_count)
-            if geometry.normals:
-                normal_count = len(geometry.normals)
-                for normal in geometry.normals:
-                    s += 'vn ' + ' '.join(float_to_str(x) for x in normal) + '\n'
-                s += '# {} normals\n\n'.format(normal_count)
-            else:
-                normal_count = 0
-            if geometry.texcoords:
-                texcoord_count = len(geometry.texcoords)
-                for texcoord in geometry.texcoords:
-                    s += 'vt ' + ' '.join(float_to_str(x) for x in texcoord) + '\n'
-                s += '# {} texture coordinates\n\n'.format(texcoord_count)
-                texcoord_offset = 1
-            else:
-                texcoord_offset = -1
-            # now adjust the tri indices
-            tris = np.copy(geometry.triangles)
-            tris[:, :, 0] = tris[:, :, 0] + vertex_index
-            if texcoord_offset > 0:
-                tris[:, :, texcoord_offset] = tris[:, :, texcoord_offset] + texcoord_index
-            if normal_count:
-                tris[:, :, normal_offset] = tris[:, :, normal_offset] + normal_index
-            # start the group of indices
-            s += 'o {}\ng {}\n'.format(geometry.name, geometry.name)
-            s += 'usemtl {}\n'.format(geometry.material_name)
-            if geometry.smooth != smooth:
-                s += 's off\n' if not geometry.smooth else 's\n'
-                smooth = geometry.smooth
-            joiner = '/' if geometry.texcoords else '//'
-            for tri in tris:
-                s += 'f ' + ' '.join([joiner.join([str(x) for x in fp]) for fp in tri]) + '\n'
-            s += '# {} triangles\n\n'.format(len(tris))
-            # now increase the indices
-            vertex_index += vertex_count
-            normal_index += normal_count
-            if geometry.texcoords:
-                texcoord_index += texcoord_count
-        with open(self.filename, 'w') as f:
-            f.write(s)
+        with open(self.filename, 'w', buffering=0x100000) as f:
+            f.write('# Wavefront OBJ exported with ABMATT v0.9.3\n\nmtllib ' + self.mtllib + '\n\n')
+            vertex_index = 1
+            normal_index = 1
+            normal_offset = -1
+            texcoord_index = 1
+            smooth = False
+            for geometry in self.geometries:
+                f.write('#\n# object ' + geometry.name + '\n#\n\n')
+                vertex_count = len(geometry.vertices)
+                self.write_points(f, 'v', geometry.vertices.points)
+                f.write('# {} vertices\n\n'.format(vertex_count))
+                if geometry.normals:
+                    normal_count = len(geometry.normals)
+                    self.write_points(f, 'vn', geometry.normals.points)
+                    f.write('# {} normals\n\n'.format(normal_count))
+                else:
+                    normal_count = 0
+                if geometry.texcoords:
+                    texcoord_count = len(geometry.texcoords)
+                    self.write_points(f, 'vt', geometry.texcoords.points)
+                    f.write('# {} texture coordinates\n\n'.format(texcoord_count))
+                    texcoord_offset = 1
+                else:
+                    texcoord_offset = -1
+                # now adjust the tri indices
+                tris = np.array(geometry.triangles, int)
+                tris[:, :, 0] += vertex_index
+                if texcoord_offset > 0:
+                    tris[:, :, texcoord_offset] += texcoord_index
+                if normal_count:
+                    tris[:, :, normal_offset] += normal_index
+                # start the group of indices
+                f.write('o {}\ng {}\n'.format(geometry.name, geometry.name))
+                f.write('usemtl {}\n'.format(geometry.material_name))
+                if geometry.smooth != smooth:
+                    f.write('s off\n' if not geometry.smooth else 's\n')
+                    smooth = geometry.smooth
+                joiner = '/' if geometry.texcoords else '//'
+                face = 'f ' + ' '.join([joiner.join(['%d'] * tris.shape[-1])] * 3) + '\n'
+                for i in range(0, len(tris), self.CHUNK_SIZE):
+                    chunk = tris[i:i + self.CHUNK_SIZE]
+                    f.write(face * len(chunk) % tuple(chunk.ravel().tolist()))
+                f.write('# {} triangles\n\n'.format(len(tris)))
+                # now increase the indices
+                vertex_index += vertex_count
+                normal_index += normal_count
+                if geometry.texcoords:
+                    texcoord_index += texcoord_count
+
+    @staticmethod
+    def write_points(f, record, points):
+        prefix = record + ' '
+        for i in range(0, len(points), Obj.CHUNK_SIZE):
+            text = floats_to_str(points[i:i + Obj.CHUNK_SIZE], ' ', '\n')
+            f.write(prefix + text.replace('\n', '\n' + prefix) + '\n')
+
+    @staticmethod
+    def parse_points(records, width):
+        """Parses the point records to an array of shape (n, width), dropping extra components"""
+        if not records:
+            return np.zeros((0, width))
+        fields = set(map(len, map(str.split, records)))
+        if len(fields) == 1:  # same number of components in every record
+            field_count = fields.pop()
+            if field_count >= width:
+                data = np.fromstring(' '.join(records), float, sep=' ')
+                if len(data) == len(records) * field_count:
+                    return data.reshape((-1, field_count))[:, :width]
+        # varying number of components
+        return np.array([[float(x) for x in record.split()[:width]] for record in records])
+
+    def parse_face(self, record, geometry):
+        if self.start_new_geo:
+            first_word = record.split(None, 1)[0]
+            slash_one = first_word.find('/')
+            if slash_one >= 0:
+                if first_word[slash_one + 1] != '/':
+                    geometry.has_texcoords = True
+                slash_two = first_word.find('/', slash_one + 1)
+                if slash_two > 0:
+                    geometry.has_normals = True
+            self.start_new_geo = False
+        geometry.add_tri(record)
 
     def parse_words(self, words, geometry):
         start = words.pop(0)
-        if start == 'v':
-            self.vertices.append([float(x) for x in words])
-        elif start == 'vt':
-            self.texcoords.append([float(x) for x in words[:2]])
-        elif start == 'vn':
-            self.normals.append([float(x) for x in words])
-        elif start == 'f':
-            tri = []
-            if self.start_new_geo:
-                first_word = words[0]
-                slash_one = first_word.find('/')
-                if slash_one >= 0:
-                    if first_word[slash_one + 1] != '/':
-                        geometry.has_texcoords = True
-                    slash_two = first_word.find('/', slash_one + 1)
-                    if slash_two > 0:
-                        geometry.has_normals = True
-                self.start_new_geo = False
-            for x in words:
-                t = x.split('/')
-                tri.append([int(y) for y in t])
-            geometry.add_tri(tri)
-        elif start == 'o' or start == 'g':
+        if start == 'o' or start == 'g':
             return words[0]
         elif start == 'usemtl':
             geometry.material_name = words[0]
@@ -284,23 +301,34 @@ class Obj():
                     self.materials[new_mat] = material
 
     def parse_file(self, filename):
+        """Sorts the records by type, parsing the numeric records in bulk"""
         geometry = None
         self.start_new_geo = False
+        points = {'v': [], 'vt': [], 'vn': []}
         with open(filename) as f:
-            data = f.readlines()
-            for line in data:
-                if len(line) < 2 or line[0] == '#':
+            for line in f:
+                words = line.split(None, 1)
+                if not words or words[0][0] == '#':
                     continue
-                words = re.split('\s+', line.rstrip('\n').strip())
-                new_geo = self.parse_words(words, geometry)
-                if new_geo:
-                    if not geometry or geometry.name != new_geo:
-                        geometry = ObjGeometry(new_geo)
-                        self.geometries.append(geometry)
-                        self.start_new_geo = True
+                start = words[0]
+                records = points.get(start)
+                if records is not None:
+                    records.append(words[1])
+                elif start == 'f':
+                    self.parse_face(words[1], geometry)
+                else:
+                    new_geo = self.parse_words(line.split(), geometry)
+                    if new_geo:
+                        if not geometry or geometry.name != new_geo:
+                            geometry = ObjGeometry(new_geo)
+                            self.geometries.append(geometry)
+                            self.start_new_geo = True
+        self.vertices = self.parse_points(points['v'], 3)
+        self.texcoords = self.parse_points(points['vt'], 2)
+        self.normals = self.parse_points(points['vn'], 3)
         if self.mtllib:
             try:
-                self.parse_mat_lib(self.mtllib)
+                self.parse_mat_lib(os.path.join(os.path.dirname(filename), self.mtllib))
             except FileNotFoundError as e:
                 AutoFix.get().error(str(e))
 
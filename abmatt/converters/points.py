@@ -104,7 +104,6 @@ class PointCollection:
         point_width = len(points[0])
         mdl0_points.comp_count = mdl0_points.comp_count_from_width(point_width)
         mdl0_points.divisor = divisor
-        data = mdl0_points.data
         if form == 'h':
             mdl0_points.format = point.FMT_INT16
             dtype = np.int16
@@ -136,8 +135,7 @@ class PointCollection:
         mdl0_points.count = len(points)
         if mdl0_points.count > 0xffff:
             raise Converter.ConvertError(f'{mdl0_points.name} has too many points! ({mdl0_points.count})')
-        for x in points:
-            data.append(x)
+        mdl0_points.data = points.astype(mdl0_points.dtype)
         self.points = points
         if get_index_remapper:
             return form, divisor, index_remapper
@@ -153,40 +151,29 @@ class PointCollection:
 
 
 def remap_face_points(face_indices, index_remapper):
-    face_height = len(face_indices)
-    face_width = len(face_indices[0])
-    for i in range(face_height):
-        x = face_indices[i]
-        for j in range(face_width):
-            x[j] = index_remapper[x[j]]
-    return face_indices
+    """Maps each face index through the index remapper array"""
+    return index_remapper[face_indices]
 
 
 def consolidate_data(points, face_indices):
-    # First pass to detect missing points
-    indices_set = {x for x in face_indices.flatten()}
-    point_index_map = {}  # maps points to index
-    index_remapper = {}  # map original indexes to new
-    new_index = 0
-    new_points = []
+    """Removes unused and duplicate points, in order of first occurrence
+    :returns: points, face_indices, index_remapper (ndarray mapping original indices, or None if no gain)
+    """
     point_len = len(points)
+    # First pass to detect missing points
+    used = np.zeros(point_len, bool)
+    used[face_indices.reshape(-1)] = True
+    used_indices = np.flatnonzero(used)
     # Next consolidate and map point indices
-    for original_index in range(point_len):
-        if original_index not in indices_set:  # the point isn't used!
-            continue
-        x = points[original_index]
-        y = tuple(x)
-        point_index = point_index_map.get(y)
-        if not point_index:  # add
-            point_index_map[y] = new_index
-            index_remapper[original_index] = new_index
-            new_points.append(y)
-            new_index += 1
-        else:
-            index_remapper[original_index] = point_index
-    if len(new_points) >= point_len:  # No gain
+    unique_points, first, inverse = np.unique(points[used_indices], axis=0, return_index=True, return_inverse=True)
+    if len(unique_points) >= point_len:  # No gain
         return points, face_indices, None
-    points = np.array(new_points, points.dtype)
+    order = np.argsort(first)
+    new_index = np.empty(len(order), int)
+    new_index[order] = np.arange(len(order))
+    index_remapper = np.full(point_len, -1, int)
+    index_remapper[used_indices] = new_index[inverse.reshape(-1)]
+    points = unique_points[order]
     # Finally, update the face indices
     face_indices = remap_face_points(face_indices, index_remapper)
-    return points, face_indices, index_remapper
\ No newline at end of file
+    return points, face_indices, index_remapper
@@ -1,6 +1,8 @@
 from collections import deque
 from struct import pack
 
+import numpy as np
+
 
 def encode_triangle_strip(triangle_indices, fmt_str, byte_array):
     byte_array.extend(pack('>BH', 0x98, len(triangle_indices)))
@@ -18,7 +20,161 @@ def encode_triangles(triangle_indices, fmt_str, byte_array):
     return face_point_len
 
 
+def get_index_dtype(fmt_str):
+    """ Gets the numpy structured type of a face point from the format string """
+    fields = []
+    for x in fmt_str:
+        if x == 'H':
+            fields.append(('f{}'.format(len(fields)), '>u2'))
+        elif x == 'B':
+            fields.append(('f{}'.format(len(fields)), 'u1'))
+        elif x != '>':
+            raise ValueError('Unknown format {}'.format(x))
+    return np.dtype(fields)
+
+
+def encode_face_points(face_points, fmt_str):
+    """ Encodes the array of face points (face point, index) to bytes """
+    dtype = get_index_dtype(fmt_str)
+    encoded = np.empty(len(face_points), dtype)
+    for i in range(len(dtype.names)):
+        encoded[dtype.names[i]] = face_points[:, i]
+    return encoded.tobytes()
+
+
+class TriangleStripper:
+    """
+    Generates triangle strips using integer adjacency arrays.
+    Triangles are greedily strung together starting with the least connected,
+    the same as TriangleSet but without an object per triangle and edge.
+    """
+
+    def __init__(self, np_tris, is_weighted=False):
+        """
+        :param np_tris: array of triangles (triangle, face point, index)
+        """
+        self.is_weighted = is_weighted
+        np_tris = np.asarray(np_tris)
+        width = np_tris.shape[-1] if np_tris.ndim == 3 else 0
+        # each unique face point becomes a vertex
+        self.face_points, verts = np.unique(np_tris.reshape((-1, width)), axis=0, return_inverse=True)
+        verts = verts.reshape((-1, 3))
+        is_tri = (verts[:, 0] != verts[:, 1]) & (verts[:, 1] != verts[:, 2]) & (verts[:, 2] != verts[:, 0])
+        self.verts = verts = verts[is_tri]
+        # edges of each triangle, edge i is from vertex i to i + 1
+        tri_count = len(verts)
+        a = verts.flatten()
+        b = verts[:, [1, 2, 0]].flatten()
+        edge_keys = np.stack((np.minimum(a, b), np.maximum(a, b)), -1)
+        if tri_count:
+            _, edge_ids = np.unique(edge_keys, axis=0, return_inverse=True)
+            edge_ids = edge_ids.reshape(-1)
+        else:
+            edge_ids = np.zeros(0, np.int64)
+        self.edges = edge_ids.reshape((-1, 3))
+        # the triangles of each edge, in triangle order
+        order = np.argsort(edge_ids, kind='stable')
+        self.edge_tris = order // 3
+        edge_count = np.bincount(edge_ids, minlength=edge_ids.max() + 1 if tri_count else 0)
+        self.edge_starts = np.concatenate(([0], np.cumsum(edge_count)))
+        self.edge_count = edge_count
+
+    def __bool__(self):
+        return bool(len(self.verts))
+
+    def __len__(self):
+        return len(self.verts)
+
+    def get_tri_strips(self, fmt_str):
+        verts = self.verts.tolist()
+        edges = self.edges.tolist()
+        edge_tris = self.edge_tris.tolist()
+        edge_starts = self.edge_starts.tolist()
+        unused_count = self.edge_count.tolist()    # unused triangles of each edge
+        used = [False] * len(verts)
+        # start with the least connected triangles
+        connections = self.edge_count[self.edges].sum(axis=1) - 3
+        queue = np.argsort(connections, kind='stable').tolist()
+        connections = connections.tolist()
+
+        def use(tri):
+            used[tri] = True
+            for e in edges[tri]:
+                unused_count[e] -= 1
+
+        def get_adjacent(edge, tri):
+            for i in range(edge_starts[edge], edge_starts[edge + 1]):
+                x = edge_tris[i]
+                if x != tri and not used[x]:
+                    return x
+
+        def get_edge(tri, v0, v1):
+            tri_verts = verts[tri]
+            i0 = tri_verts.index(v0)
+            i1 = tri_verts.index(v1)
+            return edges[tri][i0 if i1 - i0 in (1, -2) else i1]
+
+        strips = []
+        disconnected = []
+        for tri in queue:
+            if used[tri]:
+                continue
+            if not connections[tri]:
+                disconnected.append(tri)
+                continue
+            tri_edges = edges[tri]
+            for i in range(3):
+                edge = tri_edges[i]
+                if unused_count[edge] > 1:
+                    break
+            else:
+                disconnected.append(tri)
+                continue
+            use(tri)
+            tri_verts = verts[tri]
+            adjacent = get_adjacent(edge, tri)
+            use(adjacent)
+            adj_verts = verts[adjacent]
+            right_vert = adj_verts[edges[adjacent].index(edge) - 1]
+            strip = [tri_verts[i - 1], tri_verts[i], tri_verts[(i + 1) % 3], right_vert]
+            # extend to the right
+            current = adjacent
+            edge = get_edge(current, strip[-2], strip[-1])
+            while unused_count[edge]:
+                current = get_adjacent(edge, current)
+                use(current)
+                vert = verts[current][edges[current].index(edge) - 1]
+                strip.append(vert)
+                edge = get_edge(current, strip[-2], vert)
+            strips.append(strip)
+        return self.encode(strips, disconnected, fmt_str)
+
+    def encode(self, strips, disconnected, fmt_str):
+        """ Encodes the strips and triangle list, returns (data, face_count, face_point_count) """
+        data = bytearray()
+        face_points = self.face_points
+        face_point_count = 0
+        stride = get_index_dtype(fmt_str).itemsize
+        strip_lens = [len(x) for x in strips]
+        if strips:
+            encoded = encode_face_points(face_points[np.concatenate(strips)], fmt_str)
+            offset = 0
+            for length in strip_lens:
+                data.extend(pack('>BH', 0x98, length))
+                end = offset + length * stride
+                data.extend(encoded[offset:end])
+                offset = end
+            face_point_count += sum(strip_lens)
+        if disconnected:
+            tri_verts = self.verts[disconnected].flatten()
+            data.extend(pack('>BH', 0x90, len(tri_verts)))
+            data.extend(encode_face_points(face_points[tri_verts], fmt_str))
+            face_point_count += len(tri_verts)
+        return data, len(self.verts), face_point_count
+
+
 class TriangleSet:
+    """ Object based triangle stripper, slower than TriangleStripper """
     triangles_in_strips_count = 0
 
     def __init__(self, np_tris, is_weighted=False):
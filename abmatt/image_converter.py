@@ -2,7 +2,11 @@ import os
 import shutil
 import subprocess
 import uuid
+from concurrent.futures import ProcessPoolExecutor
 
+import numpy as np
+
+from abmatt import tex_codec
 from abmatt.autofix import AutoFix, Bug
 from abmatt.brres.lib.binfile import BinFile
 from abmatt.brres.tex0 import Tex0
@@ -41,6 +45,8 @@ class NoImgConverterError(Exception):
 class ImgConverterI:
     IMG_FORMAT = 'cmpr'
     RESAMPLE = 3
+    JOBS = 1  # worker processes used for batch encoding
+    CACHE = None  # TextureCache of encoded images
     OVERWRITE_IMAGES = False
     TMP_DIR = None
 
@@ -80,6 +86,46 @@ class ImgConverterI:
         # os.chdir(parent_dir)
         shutil.rmtree(tmp_dir, ignore_errors=True)
 
+    @staticmethod
+    def find_file(filename):
+        if filename.startswith('file://'):
+            filename = filename.replace('file://', '')
+        if not os.path.exists(filename):
+            raise EncodeError('No such file {}'.format(filename))
+        return filename
+
+    @staticmethod
+    def get_checked_dimensions(width, height):
+        """Gets the dimensions scaled to a power of 2 within the maximum image size"""
+        if width > Tex0.MAX_IMG_SIZE or height > Tex0.MAX_IMG_SIZE:
+            return Tex0.get_scaled_size(width, height)
+        elif not Tex0.is_power_of_two(width) or not Tex0.is_power_of_two(height):
+            return Tex0.nearest_power_of_two(width), Tex0.nearest_power_of_two(height)
+        return width, height
+
+    @staticmethod
+    def _get_resize_bug(image_name, width, height, new_width, new_height):
+        if width > Tex0.MAX_IMG_SIZE or height > Tex0.MAX_IMG_SIZE:
+            return Bug(2, 2, f'Texture {image_name} too large ({width}x{height}).',
+                       f'Resize to {new_width}x{new_height}.')
+        return Bug(2, 2, f'Texture {image_name} not a power of 2 ({width}x{height})',
+                   f'Resize to {new_width}x{new_height}')
+
+    def _get_decode_dest(self, tex0, dest_file, overwrite):
+        """Gets the png destination for decoding, or None if it already exists"""
+        if overwrite is None:
+            overwrite = self.OVERWRITE_IMAGES
+        if not dest_file:
+            dest_file = tex0.name + '.png'
+        elif os.path.isdir(dest_file):
+            dest_file = os.path.join(dest_file, tex0.name + '.png')
+        elif os.path.splitext(os.path.basename(dest_file))[1].lower() != '.png':
+            dest_file += '.png'
+        if not overwrite and os.path.exists(dest_file):
+            AutoFix.get().warn('File {} already exists!'.format(dest_file))
+            return None
+        return dest_file
+
     def encode(self, img_file, tex_format, num_mips=-1, check=False):
         raise NotImplementedError()
 
@@ -119,13 +165,61 @@ class ImgConverterI:
         return self.converter is not None
 
 
+def encode_image(images, fmt, num_mips=-1):
+    """Encodes the RGBA image (or list of image and mipmaps), generating missing mipmaps
+    :returns: (num_mips, data)
+    """
+    if type(images) != list:
+        if num_mips < 0:
+            num_mips = tex_codec.get_auto_mip_count(images.shape[1], images.shape[0])
+        images = [images]
+    else:
+        num_mips = len(images) - 1
+    data = bytearray()
+    for i in range(num_mips + 1):
+        if i == len(images):
+            images.append(tex_codec.downsample(images[-1]))
+        data.extend(tex_codec.encode(images[i], fmt))
+    return num_mips, bytes(data)
+
+
+def encode_image_file(img_file, fmt, num_mips=-1, check=False):
+    """Loads, resizes and encodes the image file, run by the batch encoding workers
+    :returns: (width, height, num_mips, data, original size if resized otherwise None)
+    """
+    from PIL import Image
+    with Image.open(img_file) as im:
+        im = im.convert('RGBA')
+    original_size = None
+    if check:
+        new_size = ImgConverterI.get_checked_dimensions(*im.size)
+        if new_size != im.size:
+            original_size = im.size
+            im = im.resize(new_size, ImgConverterI.RESAMPLE)
+    try:
+        num_mips, data = encode_image(np.asarray(im), fmt, num_mips)
+    except ValueError as e:
+        raise EncodeError(str(e))
+    return im.size[0], im.size[1], num_mips, data, original_size
+
+
+def init_encode_worker(max_img_size, resample):
+    """Applies the configuration to a batch encoding worker process"""
+    Tex0.MAX_IMG_SIZE = max_img_size
+    ImgConverterI.RESAMPLE = resample
+
+
 class ImgConverter:
     INSTANCE = None  # singleton instance
+    USE_WIMGT = False  # use the external wimgt program instead of the in-process codec
 
     def __init__(self, tmp_dir=None, converter=None):
         if not self.INSTANCE:
             if not converter:
-                converter = self.Wimgt(tmp_dir)
+                if self.USE_WIMGT and which('wimgt'):
+                    converter = self.Wimgt(tmp_dir)
+                else:
+                    converter = self.Native(tmp_dir)
             self.INSTANCE = converter
         elif converter:
             self.INSTANCE.converter = converter
@@ -155,14 +249,6 @@ class ImgConverter:
                 if d and os.path.exists(d):
                     shutil.rmtree(d, ignore_errors=True)
 
-        @staticmethod
-        def find_file(filename):
-            if filename.startswith('file://'):
-                filename = filename.replace('file://', '')
-            if not os.path.exists(filename):
-                raise EncodeError('No such file {}'.format(filename))
-            return filename
-
         @staticmethod
         def convert_png(img_file, remove_old=False):
             dir, fname = os.path.split(img_file)
@@ -181,18 +267,9 @@ class ImgConverter:
             from PIL import Image
             with Image.open(image_file) as im:
                 width, height = im.size
-                if width > Tex0.MAX_IMG_SIZE or height > Tex0.MAX_IMG_SIZE:
-                    new_width, new_height = Tex0.get_scaled_size(width, height)
-                    b = Bug(2, 2, f'Texture {image_file} too large ({width}x{height}).',
-                            f'Resize to {new_width}x{new_height}.')
-                    im = im.resize((new_width, new_height), self.RESAMPLE)
-                    im.save(image_file)
-                    b.resolve()
-                elif not Tex0.is_power_of_two(width) or not Tex0.is_power_of_two(height):
-                    new_width = Tex0.nearest_power_of_two(width)
-                    new_height = Tex0.nearest_power_of_two(height)
-                    b = Bug(2, 2, f'Texture {image_file} not a power of 2 ({width}x{height})',
-                            f'Resize to {new_width}x{new_height}')
+                new_width, new_height = self.get_checked_dimensions(width, height)
+                if (width, height) != (new_width, new_height):
+                    b = self._get_resize_bug(image_file, width, height, new_width, new_height)
                     im = im.resize((new_width, new_height), self.RESAMPLE)
                     im.save(image_file)
                     b.resolve()
@@ -272,16 +349,8 @@ class ImgConverter:
             return tex0s
 
         def decode(self, tex0, dest_file, overwrite=None, num_mips=0):
-            if overwrite is None:
-                overwrite = self.OVERWRITE_IMAGES
-            if not dest_file:
-                dest_file = tex0.name + '.png'
-            elif os.path.isdir(dest_file):
-                dest_file = os.path.join(dest_file, tex0.name + '.png')
-            elif os.path.splitext(os.path.basename(dest_file))[1].lower() != '.png':
-                dest_file += '.png'
-            if not overwrite and os.path.exists(dest_file):
-                AutoFix.get().warn('File {} already exists!'.format(dest_file))
+            dest_file = self._get_decode_dest(tex0, dest_file, overwrite)
+            if dest_file is None:
                 return None
             tmp = self.get_temp_dest()
             f = BinFile(tmp, 'w')
@@ -372,6 +441,181 @@ class ImgConverter:
             os.remove(tmp)
             return tex0
 
+    class Native(ImgConverterI):
+        """In-process converter using the numpy texture codec, no external program required"""
+
+        def __init__(self, tmp_dir=None):
+            if tmp_dir:
+                self.set_tmp_dir(tmp_dir)
+            super(ImgConverter.Native, self).__init__('native')
+
+        @staticmethod
+        def get_format(tex_format):
+            tex_format = tex_format.upper()
+            for key, value in Tex0.FORMATS.items():
+                if value == tex_format:
+                    return key
+            raise EncodeError('Unknown texture format {}'.format(tex_format))
+
+        @staticmethod
+        def encode_tex0(tex0, images, fmt, num_mips=-1):
+            """Encodes the RGBA image (or list of image and mipmaps) to the tex0"""
+            try:
+                num_mips, data = encode_image(images, fmt, num_mips)
+            except ValueError as e:
+                raise EncodeError('Failed to encode {}, {}'.format(tex0.name, e))
+            height, width = images[0].shape[:2] if type(images) == list else images.shape[:2]
+            return ImgConverter.Native._set_tex0_data(tex0, width, height, fmt, num_mips, data)
+
+        @staticmethod
+        def _set_tex0_data(tex0, width, height, fmt, num_mips, data):
+            tex0.width = width
+            tex0.height = height
+            tex0.format = fmt
+            tex0.num_mips = num_mips
+            tex0.num_images = num_mips + 1
+            tex0.data = data
+            return tex0
+
+        @staticmethod
+        def decode_tex0(tex0, num_mips=0):
+            """Decodes the tex0 to a list of RGBA images, num_mips -1 decodes all mipmaps"""
+            tex_mips = int(tex0.num_mips)
+            if num_mips < 0 or num_mips > tex_mips:
+                num_mips = tex_mips
+            try:
+                return tex_codec.decode_mips(tex0.data, tex0.format, tex0.width, tex0.height, num_mips)
+            except ValueError as e:
+                raise DecodeError('Failed to decode {}, {}'.format(tex0.name, e))
+
+        def _get_encode_name(self, img_file, brres, overwrite):
+            """Gets the tex0 name of the image, or None if it shouldn't be encoded"""
+            name = os.path.splitext(os.path.basename(img_file))[0]
+            if not overwrite and brres is not None and name in brres.get_texture_map():
+                AutoFix.get().warn(f'Tex0 {name} already exists!')
+                return None
+            return name
+
+        def _create_tex0(self, name, img_file, brres, fmt, encoded):
+            width, height, num_mips, data, original_size = encoded
+            if original_size is not None:
+                self._get_resize_bug(img_file, *original_size, width, height).resolve()
+            t = self._set_tex0_data(Tex0(name, brres), width, height, fmt, num_mips, data)
+            if brres is not None:
+                brres.add_tex0(t)
+            return t
+
+        def encode(self, img_file, brres, tex_format=None, num_mips=-1, check=False, overwrite=None):
+            if overwrite is None:
+                overwrite = self.OVERWRITE_IMAGES
+            img_file = self.find_file(img_file)
+            name = self._get_encode_name(img_file, brres, overwrite)
+            if name is None:
+                return None
+            fmt = self.get_format(tex_format if tex_format else self.IMG_FORMAT)
+            key = self._get_cache_key(img_file, fmt, num_mips, check)
+            encoded = self.CACHE.get(key) if key else None
+            if encoded is None:
+                encoded = encode_image_file(img_file, fmt, num_mips, check)
+                if key:
+                    self.CACHE.put(key, encoded)
+            return self._create_tex0(name, img_file, brres, fmt, encoded)
+
+        def batch_encode(self, files, brres, tex_format=None, num_mips=-1, check=False, overwrite=None):
+            """Encodes the images across JOBS worker processes, returns the tex0s in order of files"""
+            if overwrite is None:
+                overwrite = self.OVERWRITE_IMAGES
+            fmt = self.get_format(tex_format if tex_format else self.IMG_FORMAT)
+            paths = []
+            names = []
+            for x in files:
+                try:
+                    path = self.find_file(x)
+                except EncodeError as e:
+                    AutoFix.get().warn(str(e))
+                    continue
+                name = self._get_encode_name(path, brres, overwrite)
+                if name is not None:
+                    paths.append(path)
+                    names.append(name)
+            if not paths:
+                return None
+            keys = [self._get_cache_key(x, fmt, num_mips, check) for x in paths]
+            results = [self.CACHE.get(x) if x else None for x in keys]
+            misses = [paths[i] for i in range(len(paths)) if results[i] is None]
+            jobs = min(self.JOBS, len(misses))
+            if jobs > 1:
+                with ProcessPoolExecutor(jobs, initializer=init_encode_worker,
+                                         initargs=(Tex0.MAX_IMG_SIZE, self.RESAMPLE)) as pool:
+                    futures = [pool.submit(encode_image_file, x, fmt, num_mips, check) for x in misses]
+                    encoded = [self._get_result(path, x.result) for path, x in zip(misses, futures)]
+            else:
+                encoded = [self._get_result(x, encode_image_file, x, fmt, num_mips, check) for x in misses]
+            encoded = iter(encoded)
+            for i in range(len(results)):
+                if results[i] is None:
+                    results[i] = next(encoded)
+                    if results[i] is not None and keys[i]:
+                        self.CACHE.put(keys[i], results[i])
+            tex0s = []
+            for name, path, result in zip(names, paths, results):
+                if result is not None:
+                    tex0s.append(self._create_tex0(name, path, brres, fmt, result))
+            return tex0s
+
+        def _get_cache_key(self, img_file, fmt, num_mips, check):
+            if self.CACHE is not None:
+                return self.CACHE.get_key(img_file, fmt, num_mips, check, self.RESAMPLE, Tex0.MAX_IMG_SIZE,
+                                          tex_codec.VERSION)
+
+        @staticmethod
+        def _get_result(img_file, fptr, *args):
+            try:
+                return fptr(*args)
+            except (EncodeError, OSError) as e:
+                AutoFix.get().warn('Failed to encode {}, {}'.format(img_file, e))
+
+        def decode(self, tex0, dest_file, overwrite=None, num_mips=0):
+            dest_file = self._get_decode_dest(tex0, dest_file, overwrite)
+            if dest_file is None:
+                return None
+            from PIL import Image
+            images = self.decode_tex0(tex0, num_mips)
+            Image.fromarray(images[0]).save(dest_file)
+            base_name = os.path.splitext(dest_file)[0]
+            for i in range(1, len(images)):
+                Image.fromarray(images[i]).save(base_name + '.mm' + str(i) + '.png')
+            return dest_file
+
+        def batch_decode(self, tex0s, dest_dir=None, overwrite=None):
+            if not tex0s:
+                return
+            if overwrite is None:
+                overwrite = self.OVERWRITE_IMAGES
+            if dest_dir is None:
+                dest_dir = os.getcwd()
+            elif not os.path.exists(dest_dir):
+                os.mkdir(dest_dir)
+            files = []
+            for tex in tex0s:
+                dest = os.path.join(dest_dir, tex.name + '.png')
+                if overwrite or not os.path.exists(dest):
+                    self.decode(tex, dest, overwrite=True)
+                    files.append(os.path.basename(dest))
+            return files
+
+        def convert(self, tex0, tex_format):
+            return self.encode_tex0(tex0, self.decode_tex0(tex0, -1), self.get_format(tex_format))
+
+        def set_mipmap_count(self, tex0, mip_count=-1):
+            return self.encode_tex0(tex0, self.decode_tex0(tex0)[0], tex0.format, mip_count)
+
+        def set_dimensions(self, tex0, width, height):
+            from PIL import Image
+            im = Image.fromarray(self.decode_tex0(tex0)[0])
+            im = im.resize((width, height), self.get_resample())
+            return self.encode_tex0(tex0, np.asarray(im), tex0.format, int(tex0.num_mips))
+
     def __getattr__(self, item):
         if not self.INSTANCE:
             raise NoImgConverterError()
@@ -1,8 +1,10 @@
 import getopt
 import os
 import sys
+from concurrent.futures import ProcessPoolExecutor
+from itertools import repeat
 
-from abmatt.autofix import AutoFix
+from abmatt.autofix import AutoFix, MessageLog
 from abmatt.brres import Brres
 from abmatt.brres.lib.matching import validBool, MATCHING, parse_color, validInt
 from abmatt.brres.material_library import MaterialLibrary
@@ -17,6 +19,8 @@ from abmatt.command import Command, NoSuchFile, Shell
 from abmatt.config import Config
 from abmatt.converters.material import Material
 from abmatt.image_converter import ImgConverterI, ImgConverter
+from abmatt.server import CommandServer
+from abmatt.texture_cache import TextureCache
 
 
 def set_rename_unknown(val):
@@ -45,6 +49,9 @@ def load_config(app_dir, loudness=None, autofix_level=None):
     conf = Config.get_instance(os.path.join(app_dir, 'config.conf'))
     tmp_dir = os.path.join(app_dir, 'temp_files')
     MaterialLibrary.LIBRARY_PATH = os.path.join(app_dir, 'mat_lib.brres')
+    img_converter = conf['img_converter']
+    if img_converter is not None:
+        ImgConverter.USE_WIMGT = img_converter.lower() == 'wimgt'
     converter = ImgConverter(tmp_dir)
     Tex0.converter = converter
     if not loudness:
@@ -67,6 +74,14 @@ def load_config(app_dir, loudness=None, autofix_level=None):
         SubFile.FORCE_VERSION = validBool(conf['force_version'])
     except ValueError:
         pass
+    try:
+        Brres.MEMORY_MAP = validBool(conf['memory_map'])
+    except ValueError:
+        pass
+    try:
+        Brres.LAZY_LOAD = validBool(conf['lazy_load'])
+    except ValueError:
+        pass
     try:
         Brres.REMOVE_UNUSED_TEXTURES = validBool(conf['remove_unused_textures'])
     except ValueError:
@@ -102,14 +117,67 @@ def load_config(app_dir, loudness=None, autofix_level=None):
         Tex0.set_max_image_size(validInt(conf['max_image_size'], 0, 10000))
     except (TypeError, ValueError):
         pass
+    try:
+        cache_size = validInt(conf['texture_cache_size'], 0)
+        ImgConverterI.CACHE = TextureCache(os.path.join(app_dir, 'texture_cache'), cache_size * 0x100000) \
+            if cache_size else None
+    except (TypeError, ValueError):
+        pass
     resample = conf['img_resample']
     if resample is not None:
         ImgConverterI.set_resample(resample)
     return conf
 
 
+def init_job_worker(app_dir, loudness, debug, overwrite):
+    """Configures a worker process for running commands on files"""
+    load_config(app_dir, loudness)
+    Command.APP_DIR = app_dir
+    Command.DEBUG = debug
+    if overwrite:
+        Command.OVERWRITE = Brres.OVERWRITE = True
+    ImgConverterI.JOBS = 1
+    AutoFix.get().sink = open(os.devnull, 'w')
+
+
+def run_file_job(filename, cmd_texts, command_file):
+    """Runs the commands on the file, returns if it succeeded and the logged messages"""
+    fixer = AutoFix.get()
+    fixer.pipe = log = MessageLog()
+    success = False
+    try:
+        Command.updateSelection(filename)
+        cmds = [Command(x) for x in cmd_texts]
+        if command_file:
+            cmds.extend(Command.load_commandfile(command_file) or [])
+        success = Command.run_commands(cmds)
+    except Exception as e:
+        fixer.exception(e)
+    finally:
+        Command.close_all(success)
+    fixer.flush()
+    fixer.pipe = None
+    return success, log.messages
+
+
+def run_jobs(files, cmds, command_file, jobs, app_dir, loudness, debug, overwrite):
+    """Runs the commands on each file in worker processes, logging the results in file order"""
+    fixer = AutoFix.get()
+    failed = 0
+    with ProcessPoolExecutor(min(jobs, len(files)), initializer=init_job_worker,
+                             initargs=(app_dir, loudness, debug, overwrite)) as executor:
+        results = executor.map(run_file_job, files, repeat([x.txt for x in cmds]), repeat(command_file))
+        for success, messages in results:
+            for x in messages:
+                fixer.enqueue(x)
+            failed += not success
+    if failed:
+        fixer.error('Failed on {} of {} files'.format(failed, len(files)))
+    return not failed
+
+
 VERSION = '0.9.3'
-USAGE = "USAGE: abmatt [command_line][--interactive -f <file> -b <brres-file> -d <destination> --overwrite]"
+USAGE = "USAGE: abmatt [command_line][--interactive -f <file> -b <brres-file> -d <destination> --overwrite --jobs <n> --serve <socket|->]"
 
 
 def hlp(cmd=None):
@@ -140,11 +208,13 @@ To see what keys are available, try `info keys`
 | -f | --file | File with ABMatt commands to be processed as specified in file format. |
 | -h | --help | Displays a help message about program usage. |
 | -i | --interactive | Interactive shell mode. |
+| -j | --jobs | Number of worker processes for encoding textures or running commands on each brres file. Files are run in this process when combined with -d, -i or --serve. |
 | -k | --key | Setting key to be updated. |
 | -l | --loudness | Sets the verbosity level. (0-5)
 | -m | --model | Model selection. |
 | -n | --name | Material or layer name or regular expression to be found. |
 | -o | --overwrite | Overwrite existing files.  |
+|    | --serve | Serves JSON line requests {"command": "..."} on a unix socket path, or stdin if '-'. |
 | -t | --type | Type selection. |
 | -v | --value | Value to set corresponding with key. (set command) |
 
@@ -179,6 +249,8 @@ def parse_args(argv, app_dir):
     command = destination = brres_file = command_file = model = value = key = ""
     autofix = loudness = None
     name = None
+    jobs = 1
+    serve = None
     do_help = False
     for i in range(len(argv)):
         if argv[i][0] == '-':
@@ -188,11 +260,11 @@ def parse_args(argv, app_dir):
             break
 
     try:
-        opts, args = getopt.getopt(argv, "hd:oc:t:k:v:n:b:m:f:iul:g",
+        opts, args = getopt.getopt(argv, "hd:oc:t:k:v:n:b:m:f:iul:gj:",
                                    ["help", "destination=", "overwrite",
                                     "command=", "type=", "key=", "value=",
                                     "name=", "brres=", "model=", "file=", "interactive",
-                                    "loudness=", "debug"])
+                                    "loudness=", "debug", "jobs=", "serve="])
     except getopt.GetoptError as e:
         print(e)
         print(USAGE)
@@ -229,6 +301,15 @@ def parse_args(argv, app_dir):
             loudness = arg
         elif opt in ("-g", "--debug"):
             debug = True
+        elif opt == "--serve":
+            serve = arg
+        elif opt in ("-j", "--jobs"):
+            try:
+                jobs = validInt(arg, 1)
+            except ValueError as e:
+                print(e)
+                print(USAGE)
+                sys.exit(2)
         else:
             print("Unknown option '{}'".format(opt))
             print(USAGE)
@@ -248,6 +329,7 @@ def parse_args(argv, app_dir):
     if debug and loudness is None:
         loudness = 5
     config = load_config(app_dir, loudness, autofix)
+    ImgConverterI.JOBS = jobs
     Command.APP_DIR = app_dir
     Command.DEBUG = debug
     cmds = []
@@ -272,6 +354,21 @@ def parse_args(argv, app_dir):
     if overwrite:
         Command.OVERWRITE = overwrite
         Brres.OVERWRITE = overwrite
+    if brres_file and jobs > 1 and not destination and not interactive and not serve:
+        try:
+            files = sorted(Command.getFiles(brres_file))
+        except NoSuchFile as e:
+            AutoFix.get().exception(e, True)
+        if len(files) > 1:
+            if command_file:
+                try:
+                    Command.load_commandfile(command_file)  # checked before starting the workers
+                except NoSuchFile as err:
+                    AutoFix.get().error(err)
+                    command_file = None
+            if not run_jobs(files, cmds, command_file, jobs, app_dir, loudness, debug, overwrite):
+                sys.exit(1)
+            return Command.OPEN_FILES
     if brres_file:
         try:
             Command.updateSelection(brres_file)
@@ -292,4 +389,6 @@ def parse_args(argv, app_dir):
             sys.exit(1)
     if interactive:
         Shell().cmdloop('Interactive shell started...')
+    elif serve:
+        CommandServer().serve(serve)
     return Command.OPEN_FILES
\ No newline at end of file
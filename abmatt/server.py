@@ -0,0 +1,113 @@
+"""Serves commands as JSON lines, keeping opened brres files in memory between requests"""
+import io
+import json
+import os
+import socket
+import socketserver
+import sys
+from contextlib import redirect_stdout
+
+from abmatt.autofix import AutoFix, MessageLog
+from abmatt.command import Command, ParsingException
+
+
+class CommandServer:
+    """Runs requests of the form {"id": any, "command": "command text"} where the text may hold
+    multiple lines of commands. Each request is answered with
+    {"id": any, "ok": bool, "messages": [{"level": str, "message": str}], "output": str}.
+    A "quit" command closes the files, saving the modified ones, and stops the server.
+    """
+    QUIT_COMMANDS = ('quit', 'exit')
+
+    def __init__(self):
+        self.running = False
+
+    def handle_line(self, line):
+        """Handles a json request, returning the json response"""
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise ValueError('Expected a json object')
+        except ValueError as e:
+            return json.dumps({'id': None, 'ok': False, 'messages': [{'level': 'ERROR', 'message': str(e)}],
+                               'output': ''})
+        return json.dumps(self.handle(request))
+
+    def handle(self, request):
+        text = request.get('command', '')
+        fixer = AutoFix.get()
+        fixer.pipe = log = MessageLog()
+        output = io.StringIO()
+        ok = False
+        try:
+            with redirect_stdout(output):
+                ok = self.run(text)
+        except Exception as e:  # the server keeps running
+            fixer.exception(e)
+        fixer.flush()
+        fixer.pipe = None
+        return {'id': request.get('id'), 'ok': ok, 'messages': [x.as_record() for x in log.messages],
+                'output': output.getvalue()}
+
+    def run(self, text):
+        lines = [x for x in text.splitlines() if x.strip()]
+        if len(lines) == 1 and lines[0].strip().lower() in self.QUIT_COMMANDS:
+            self.running = False
+            Command.close_all()
+            return True
+        try:
+            cmds = [Command(x) for x in lines]
+        except ParsingException as e:
+            AutoFix.get().error(e)
+            return False
+        return Command.run_commands(cmds)
+
+    def serve(self, address):
+        """Serves on stdin and stdout if address is '-', otherwise on the unix socket address"""
+        fixer = AutoFix.get()
+        sink = fixer.sink
+        fixer.sink = open(os.devnull, 'w')  # messages are sent in the responses
+        try:
+            if address == '-':
+                self.serve_stream(sys.stdin, sys.stdout)
+            else:
+                self.serve_socket(address)
+        finally:
+            fixer.flush()
+            fixer.sink.close()
+            fixer.sink = sink
+
+    def serve_stream(self, instream, outstream):
+        self.running = True
+        for line in instream:
+            if line.strip():
+                outstream.write(self.handle_line(line) + '\n')
+                outstream.flush()
+                if not self.running:
+                    break
+
+    def serve_socket(self, address):
+        if not hasattr(socket, 'AF_UNIX'):
+            raise OSError('Unix sockets are not supported on this platform, serve on stdin with "-"')
+        server = self
+
+        class Handler(socketserver.StreamRequestHandler):
+            def handle(self):
+                stream = io.TextIOWrapper(self.wfile, 'utf-8', write_through=True)
+                for line in self.rfile:
+                    line = line.decode('utf-8')
+                    if line.strip():
+                        stream.write(server.handle_line(line) + '\n')
+                        if not server.running:
+                            break
+                stream.detach()
+
+        if os.path.exists(address):
+            os.remove(address)
+        self.running = True
+        with socketserver.UnixStreamServer(address, Handler) as unix_server:
+            try:
+                while self.running:
+                    unix_server.handle_request()
+            finally:
+                os.remove(address)
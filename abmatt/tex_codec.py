@@ -0,0 +1,328 @@
+"""In-process codec for the GX texture formats, operates on RGBA ndarrays of shape (height, width, 4)"""
+import numpy as np
+
+I4 = 0
+I8 = 1
+IA4 = 2
+IA8 = 3
+RGB565 = 4
+RGB5A3 = 5
+RGBA32 = 6
+C4 = 8
+C8 = 9
+C14X2 = 10
+CMPR = 14
+
+VERSION = 1  # part of the texture cache key, bump whenever the encoded output changes
+
+# format: (block width, block height, bits per pixel)
+BLOCK_INFO = {I4: (8, 8, 4), I8: (8, 4, 8), IA4: (8, 4, 8), IA8: (4, 4, 16),
+              RGB565: (4, 4, 16), RGB5A3: (4, 4, 16), RGBA32: (4, 4, 32),
+              C4: (8, 8, 4), C8: (8, 4, 8), C14X2: (4, 4, 16), CMPR: (8, 8, 4)}
+
+MIN_MIP_SIZE = 8  # smallest mipmap dimension generated automatically
+MAX_AUTO_MIPS = 4
+
+
+def get_block_info(fmt):
+    info = BLOCK_INFO.get(fmt)
+    if info is None:
+        raise ValueError('Unknown texture format {}'.format(fmt))
+    return info
+
+
+def get_image_size(fmt, width, height):
+    """Gets the size in bytes of a single encoded image"""
+    block_width, block_height, bits = get_block_info(fmt)
+    width = -(-width // block_width) * block_width
+    height = -(-height // block_height) * block_height
+    return width * height * bits // 8
+
+
+def get_mip_dimensions(width, height, num_mips):
+    """Gets the dimensions of the image and each mipmap"""
+    return [(max(1, width >> i), max(1, height >> i)) for i in range(num_mips + 1)]
+
+
+def get_auto_mip_count(width, height):
+    count = 0
+    while count < MAX_AUTO_MIPS and min(width, height) >> (count + 1) >= MIN_MIP_SIZE:
+        count += 1
+    return count
+
+
+def get_data_size(fmt, width, height, num_mips):
+    return sum(get_image_size(fmt, w, h) for w, h in get_mip_dimensions(width, height, num_mips))
+
+
+def pad_image(pixels, block_width, block_height):
+    """Pads the image to a whole number of blocks by repeating the edge"""
+    height, width = pixels.shape[:2]
+    pad_height = -height % block_height
+    pad_width = -width % block_width
+    if pad_height or pad_width:
+        pad = [(0, pad_height), (0, pad_width)] + [(0, 0)] * (pixels.ndim - 2)
+        pixels = np.pad(pixels, pad, mode='edge')
+    return pixels
+
+
+def tile(pixels, block_width, block_height):
+    """Splits the image into blocks in row order, (block, pixel, ...)"""
+    pixels = pad_image(pixels, block_width, block_height)
+    height, width = pixels.shape[:2]
+    rest = pixels.shape[2:]
+    blocks = pixels.reshape((height // block_height, block_height, width // block_width, block_width) + rest)
+    return blocks.swapaxes(1, 2).reshape((-1, block_height * block_width) + rest)
+
+
+def untile(blocks, block_width, block_height, width, height):
+    """Inverse of tile, crops the padding"""
+    padded_width = -(-width // block_width) * block_width
+    padded_height = -(-height // block_height) * block_height
+    rest = blocks.shape[2:]
+    pixels = blocks.reshape((padded_height // block_height, padded_width // block_width,
+                             block_height, block_width) + rest)
+    pixels = pixels.swapaxes(1, 2).reshape((padded_height, padded_width) + rest)
+    return pixels[:height, :width]
+
+
+def expand_bits(values, bits):
+    """Expands the n-bit values to 8 bits by repeating the high bits"""
+    values = values.astype(np.uint16)
+    return ((values << (8 - bits)) | (values >> (2 * bits - 8))).astype(np.uint8) if bits >= 4 \
+        else (values * 255 // ((1 << bits) - 1)).astype(np.uint8)
+
+
+def reduce_bits(values, bits):
+    """Quantizes the 8-bit values to n bits with rounding"""
+    return ((values.astype(np.uint32) * ((1 << bits) - 1) + 127) // 255).astype(np.uint16)
+
+
+def get_intensity(rgba):
+    rgb = rgba[..., :3].astype(np.uint32)
+    return ((rgb[..., 0] * 299 + rgb[..., 1] * 587 + rgb[..., 2] * 114 + 500) // 1000).astype(np.uint8)
+
+
+def gray_to_rgba(intensity, alpha=None):
+    rgba = np.empty(intensity.shape + (4,), np.uint8)
+    rgba[..., :3] = intensity[..., None]
+    rgba[..., 3] = 0xff if alpha is None else alpha
+    return rgba
+
+
+def rgb565_to_rgb(values):
+    rgb = np.empty(values.shape + (3,), np.uint8)
+    rgb[..., 0] = expand_bits(values >> 11 & 0x1f, 5)
+    rgb[..., 1] = expand_bits(values >> 5 & 0x3f, 6)
+    rgb[..., 2] = expand_bits(values & 0x1f, 5)
+    return rgb
+
+
+def rgb_to_rgb565(rgb):
+    return reduce_bits(rgb[..., 0], 5) << 11 | reduce_bits(rgb[..., 1], 6) << 5 | reduce_bits(rgb[..., 2], 5)
+
+
+# --------------------------------------------------------------------
+# Decoding
+# --------------------------------------------------------------------
+def decode(data, fmt, width, height):
+    """Decodes a single image to RGBA"""
+    block_width, block_height, bits = get_block_info(fmt)
+    if fmt in (C4, C8, C14X2):
+        raise ValueError('Palette texture formats are not supported')
+    size = get_image_size(fmt, width, height)
+    data = np.frombuffer(data, np.uint8, size)
+    if fmt == CMPR:
+        return decode_cmpr(data, width, height)
+    if fmt == I4:
+        pixels = np.empty(size * 2, np.uint8)
+        pixels[0::2] = data >> 4
+        pixels[1::2] = data & 0xf
+    elif bits == 8:
+        pixels = data
+    elif bits == 16:
+        pixels = data.view('>u2')
+    elif fmt == RGBA32:
+        blocks = data.reshape((-1, 2, 16, 2))
+        pixels = np.stack((blocks[:, 0, :, 1], blocks[:, 1, :, 0], blocks[:, 1, :, 1], blocks[:, 0, :, 0]), -1)
+        pixels = pixels.reshape((-1, 4))
+    pixels = untile(pixels.reshape((-1, block_width * block_height) + pixels.shape[1:]),
+                    block_width, block_height, width, height)
+    if fmt == I4:
+        return gray_to_rgba(expand_bits(pixels, 4))
+    elif fmt == I8:
+        return gray_to_rgba(pixels)
+    elif fmt == IA4:
+        return gray_to_rgba(expand_bits(pixels & 0xf, 4), expand_bits(pixels >> 4, 4))
+    elif fmt == IA8:
+        return gray_to_rgba((pixels & 0xff).astype(np.uint8), (pixels >> 8).astype(np.uint8))
+    elif fmt == RGB565:
+        return np.concatenate((rgb565_to_rgb(pixels), np.full(pixels.shape + (1,), 0xff, np.uint8)), -1)
+    elif fmt == RGB5A3:
+        return decode_rgb5a3(pixels)
+    return np.ascontiguousarray(pixels)  # RGBA32
+
+
+def decode_rgb5a3(pixels):
+    rgba = np.empty(pixels.shape + (4,), np.uint8)
+    opaque = (pixels & 0x8000) != 0
+    rgba[..., 0] = np.where(opaque, expand_bits(pixels >> 10 & 0x1f, 5), expand_bits(pixels >> 8 & 0xf, 4))
+    rgba[..., 1] = np.where(opaque, expand_bits(pixels >> 5 & 0x1f, 5), expand_bits(pixels >> 4 & 0xf, 4))
+    rgba[..., 2] = np.where(opaque, expand_bits(pixels & 0x1f, 5), expand_bits(pixels & 0xf, 4))
+    rgba[..., 3] = np.where(opaque, 0xff, expand_bits(pixels >> 12 & 0x7, 3))
+    return rgba
+
+
+def get_cmpr_palette(color0, color1):
+    """Gets the 4 colors (block, color, rgba) of each cmpr sub block"""
+    c0 = rgb565_to_rgb(color0).astype(np.uint16)
+    c1 = rgb565_to_rgb(color1).astype(np.uint16)
+    four_color = (color0 > color1)[:, None]
+    palette = np.empty((len(color0), 4, 4), np.uint8)
+    palette[:, 0, :3] = c0
+    palette[:, 1, :3] = c1
+    palette[:, 2, :3] = np.where(four_color, (c0 * 5 + c1 * 3) >> 3, (c0 + c1) >> 1)
+    palette[:, 3, :3] = np.where(four_color, (c0 * 3 + c1 * 5) >> 3, 0)
+    palette[:, :, 3] = 0xff
+    palette[:, 3, 3] = np.where(four_color[:, 0], 0xff, 0)
+    return palette
+
+
+def decode_cmpr(data, width, height):
+    sub_blocks = data.reshape((-1, 8))
+    colors = sub_blocks[:, :4].copy().view('>u2')
+    palette = get_cmpr_palette(colors[:, 0], colors[:, 1])
+    shifts = np.array([6, 4, 2, 0], np.uint8)
+    indices = (sub_blocks[:, 4:, None] >> shifts & 3).reshape((-1, 16))
+    pixels = palette[np.arange(len(palette))[:, None], indices]
+    padded_width = -(-width // 8) * 8
+    padded_height = -(-height // 8) * 8
+    pixels = pixels.reshape((padded_height // 8, padded_width // 8, 2, 2, 4, 4, 4))
+    pixels = pixels.transpose((0, 2, 4, 1, 3, 5, 6)).reshape((padded_height, padded_width, 4))
+    return pixels[:height, :width]
+
+
+def decode_mips(data, fmt, width, height, num_mips):
+    """Decodes the image and its mipmaps, returns a list of RGBA arrays"""
+    images = []
+    data = memoryview(data)
+    offset = 0
+    for w, h in get_mip_dimensions(width, height, num_mips):
+        images.append(decode(data[offset:], fmt, w, h))
+        offset += get_image_size(fmt, w, h)
+    return images
+
+
+# --------------------------------------------------------------------
+# Encoding
+# --------------------------------------------------------------------
+def encode(rgba, fmt):
+    """Encodes a single RGBA image"""
+    rgba = np.asarray(rgba, np.uint8)
+    if fmt == CMPR:
+        return encode_cmpr(rgba)
+    block_width, block_height, bits = get_block_info(fmt)
+    if fmt == I4 or fmt == I8:
+        intensity = get_intensity(rgba)
+        pixels = reduce_bits(intensity, 4).astype(np.uint8) if fmt == I4 else intensity
+    elif fmt == IA4:
+        pixels = (reduce_bits(rgba[..., 3], 4) << 4 | reduce_bits(get_intensity(rgba), 4)).astype(np.uint8)
+    elif fmt == IA8:
+        pixels = (rgba[..., 3].astype(np.uint16) << 8 | get_intensity(rgba)).astype('>u2')
+    elif fmt == RGB565:
+        pixels = rgb_to_rgb565(rgba).astype('>u2')
+    elif fmt == RGB5A3:
+        pixels = encode_rgb5a3(rgba).astype('>u2')
+    elif fmt == RGBA32:
+        blocks = tile(rgba, block_width, block_height)
+        ar = blocks[:, :, [3, 0]].reshape((-1, 32))
+        gb = blocks[:, :, [1, 2]].reshape((-1, 32))
+        return np.concatenate((ar, gb), 1).tobytes()
+    else:
+        raise ValueError('Unsupported texture encode format {}'.format(fmt))
+    pixels = tile(pixels, block_width, block_height).reshape(-1)
+    if fmt == I4:
+        pixels = pixels[0::2] << 4 | pixels[1::2]
+    return pixels.tobytes()
+
+
+def encode_rgb5a3(rgba):
+    alpha = rgba[..., 3] >> 5
+    rgb555 = 0x8000 | reduce_bits(rgba[..., 0], 5) << 10 | reduce_bits(rgba[..., 1], 5) << 5 | \
+        reduce_bits(rgba[..., 2], 5)
+    rgb4443 = alpha.astype(np.uint16) << 12 | reduce_bits(rgba[..., 0], 4) << 8 | \
+        reduce_bits(rgba[..., 1], 4) << 4 | reduce_bits(rgba[..., 2], 4)
+    return np.where(alpha == 7, rgb555, rgb4443)
+
+
+def get_cmpr_endpoints(rgb, transparent):
+    """Fits the endpoints of each sub block along the principal axis of its colors"""
+    weights = (~transparent).astype(np.float64)[:, :, None]
+    counts = np.maximum(weights.sum(1), 1)
+    mean = (rgb * weights).sum(1) / counts
+    centered = (rgb - mean[:, None]) * weights
+    covariance = np.einsum('npi,npj->nij', centered, centered)
+    axis = np.ones_like(mean)
+    for i in range(4):  # power iteration
+        axis = np.einsum('nij,nj->ni', covariance, axis)
+        axis /= np.maximum(np.abs(axis).max(1, keepdims=True), 1e-9)
+    axis /= np.maximum(np.linalg.norm(axis, axis=1, keepdims=True), 1e-9)
+    projection = np.einsum('npi,ni->np', centered, axis)
+    low = np.where(transparent, np.inf, projection).min(1)
+    high = np.where(transparent, -np.inf, projection).max(1)
+    low[~np.isfinite(low)] = 0
+    high[~np.isfinite(high)] = 0
+    color0 = np.clip(np.around(mean + axis * high[:, None]), 0, 255)
+    color1 = np.clip(np.around(mean + axis * low[:, None]), 0, 255)
+    return rgb_to_rgb565(color0), rgb_to_rgb565(color1)
+
+
+def encode_cmpr(rgba):
+    """Encodes the image as cmpr, one 8x8 block of four 4x4 dxt1 sub blocks at a time"""
+    pixels = pad_image(rgba, 8, 8)
+    height, width = pixels.shape[:2]
+    sub_blocks = pixels.reshape((height // 8, 2, 4, width // 8, 2, 4, 4))
+    sub_blocks = sub_blocks.transpose((0, 3, 1, 4, 2, 5, 6)).reshape((-1, 16, 4))
+    rgb = sub_blocks[:, :, :3].astype(np.float64)
+    transparent = sub_blocks[:, :, 3] < 0x80
+    has_alpha = transparent.any(1)
+    color0, color1 = get_cmpr_endpoints(rgb, transparent)
+    # four color blocks need color0 > color1, blocks with transparency the opposite
+    swap = np.where(has_alpha, color0 > color1, color0 < color1)
+    color0, color1 = np.where(swap, color1, color0), np.where(swap, color0, color1)
+    palette = get_cmpr_palette(color0, color1).astype(np.float64)
+    distance = ((rgb[:, :, None] - palette[:, None, :, :3]) ** 2).sum(-1)
+    distance[:, :, 3] = np.where((color0 > color1)[:, None], distance[:, :, 3], np.inf)
+    indices = np.argmin(distance, 2).astype(np.uint8)
+    indices[transparent] = 3
+    indices = indices.reshape((-1, 4, 4))
+    encoded = np.empty((len(sub_blocks), 8), np.uint8)
+    encoded[:, 0:2] = color0.astype('>u2').view(np.uint8).reshape((-1, 2))
+    encoded[:, 2:4] = color1.astype('>u2').view(np.uint8).reshape((-1, 2))
+    encoded[:, 4:] = indices[:, :, 0] << 6 | indices[:, :, 1] << 4 | indices[:, :, 2] << 2 | indices[:, :, 3]
+    return encoded.tobytes()
+
+
+def downsample(rgba):
+    """Halves the image dimensions with a box filter"""
+    pixels = rgba.astype(np.uint16)
+    if pixels.shape[0] > 1:
+        height = pixels.shape[0] // 2 * 2
+        pixels = pixels[0:height:2] + pixels[1:height:2]
+    else:
+        pixels = pixels * 2
+    if pixels.shape[1] > 1:
+        width = pixels.shape[1] // 2 * 2
+        pixels = pixels[:, 0:width:2] + pixels[:, 1:width:2]
+    else:
+        pixels = pixels * 2
+    return ((pixels + 2) >> 2).astype(np.uint8)
+
+
+def encode_mips(rgba, fmt, num_mips):
+    """Encodes the image followed by num_mips mipmaps"""
+    data = bytearray(encode(rgba, fmt))
+    for i in range(num_mips):
+        rgba = downsample(rgba)
+        data.extend(encode(rgba, fmt))
+    return data
@@ -0,0 +1,110 @@
+"""Content addressed on-disk cache of encoded textures"""
+import hashlib
+import os
+import uuid
+from collections import OrderedDict
+from struct import pack, unpack_from
+
+from abmatt.autofix import AutoFix
+
+
+class TextureCache:
+    """Maps a hash of the source image and encoding settings to the encoded texture,
+    evicting the least recently used entries once max_size bytes is exceeded
+    """
+    HEADER = '>5I'  # width, height, mipmap count, original width, original height
+    HEADER_SIZE = 20
+    EXT = '.tex'
+
+    def __init__(self, cache_dir, max_size):
+        self.cache_dir = cache_dir
+        self.max_size = max_size
+        self.entries = OrderedDict()  # key to file size, least recently used first
+        self.size = 0
+        self.hits = self.misses = 0
+        self.write_failed = False  # warned about being unable to write to the cache
+        if os.path.isdir(cache_dir):
+            files = [x for x in os.scandir(cache_dir) if x.name.endswith(self.EXT)]
+            for x in sorted(files, key=lambda x: x.stat().st_mtime):
+                size = x.stat().st_size
+                self.entries[x.name[:-len(self.EXT)]] = size
+                self.size += size
+            self.evict()
+
+    @staticmethod
+    def get_key(img_file, *settings):
+        """Gets the key from the image file contents and settings that affect the encoding"""
+        h = hashlib.sha1()
+        with open(img_file, 'rb') as f:
+            for chunk in iter(lambda: f.read(0x100000), b''):
+                h.update(chunk)
+        h.update(repr(settings).encode())
+        return h.hexdigest()
+
+    def get_path(self, key):
+        return os.path.join(self.cache_dir, key + self.EXT)
+
+    def get(self, key):
+        """Gets the encoded texture (width, height, num_mips, data, original size or None) or None if not cached"""
+        if key not in self.entries:
+            self.misses += 1
+            return None
+        path = self.get_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+            os.utime(path)  # keeps the order across sessions
+        except OSError:
+            self.size -= self.entries.pop(key)
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        width, height, num_mips, original_width, original_height = unpack_from(self.HEADER, data)
+        original_size = (original_width, original_height) if original_width else None
+        return width, height, num_mips, data[self.HEADER_SIZE:], original_size
+
+    def put(self, key, encoded):
+        width, height, num_mips, data, original_size = encoded
+        size = self.HEADER_SIZE + len(data)
+        if size > self.max_size:
+            return False
+        if not original_size:
+            original_size = (0, 0)
+        tmp = os.path.join(self.cache_dir, str(uuid.uuid4()))
+        try:
+            if not os.path.exists(self.cache_dir):
+                os.makedirs(self.cache_dir)
+            with open(tmp, 'wb') as f:
+                f.write(pack(self.HEADER, width, height, num_mips, *original_size))
+                f.write(data)
+            os.replace(tmp, self.get_path(key))
+        except OSError as e:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            if not self.write_failed:
+                self.write_failed = True
+                AutoFix.get().warn('Unable to write to texture cache {}, {}'.format(self.cache_dir, e))
+            return False
+        if key in self.entries:
+            self.size -= self.entries.pop(key)
+        self.entries[key] = size
+        self.size += size
+        self.evict()
+        return True
+
+    def evict(self):
+        while self.size > self.max_size and self.entries:
+            key, size = self.entries.popitem(last=False)
+            self.size -= size
+            try:
+                os.remove(self.get_path(key))
+            except OSError:
+                pass
+
+    def clear(self):
+        self.max_size, max_size = 0, self.max_size
+        self.evict()
+        self.max_size = max_size
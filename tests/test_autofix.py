@@ -0,0 +1,68 @@
+import io
+import sys
+from unittest import mock
+import unittest
+
+from abmatt.autofix import AutoFix, MessageReceiver, MessageLog
+
+
+class RecordReceiver(MessageReceiver):
+    def __init__(self):
+        self.records = []
+
+    def receive(self, messages):
+        self.records.extend(x.as_record() for x in messages)
+
+
+class TestAutoFix(unittest.TestCase):
+    def test_quit_writes_queued_messages(self):
+        AutoFix.quit()
+        autofix = AutoFix.get(loudness=3)
+        autofix.sink = io.StringIO()
+        pipe = RecordReceiver()
+        autofix.set_pipe(pipe)
+        for i in range(2000):
+            autofix.warn('warning {}'.format(i))
+        autofix.info('done')
+        AutoFix.quit()
+        self.assertFalse(autofix.thread.is_alive())
+        self.assertEqual(autofix.sink.getvalue().count('\n'), 2001)
+        self.assertEqual(pipe.records[0], {'level': 'WARN', 'message': 'warning 0'})
+        self.assertEqual(pipe.records[-1], {'level': 'INFO', 'message': 'done'})
+
+    def test_flush(self):
+        AutoFix.quit()
+        autofix = AutoFix.get(loudness=3)
+        autofix.sink = io.StringIO()
+        autofix.pipe = log = MessageLog()
+        autofix.error('failed')
+        autofix.flush()
+        self.assertEqual([x.as_record() for x in log.messages], [{'level': 'ERROR', 'message': 'failed'}])
+        AutoFix.quit()
+
+    def test_failed_write(self):
+        AutoFix.quit()
+        autofix = AutoFix.get(loudness=3)
+        autofix.sink = io.StringIO()
+        autofix.pipe = pipe = mock.Mock()
+        pipe.receive.side_effect = RuntimeError('broken pipe')
+        with mock.patch('sys.__stderr__', io.StringIO()) as stderr:
+            autofix.error('failed')
+            autofix.flush()
+            self.assertTrue(autofix.thread.is_alive())
+            self.assertIn('broken pipe', stderr.getvalue())
+        autofix.pipe = None
+        autofix.info('written')
+        autofix.flush()
+        self.assertIn('written', autofix.sink.getvalue())
+        AutoFix.quit()
+        autofix.queue.put(None)
+        autofix.queue.put(AutoFix.Info('after quit'))  # queued behind the quit sentinel
+        autofix.run()
+        self.assertEqual(autofix.queue.unfinished_tasks, 0)
+        self.assertNotIn('after quit', autofix.sink.getvalue())
+
+
+if __name__ == '__main__':
+    unittest.main()
+    sys.exit(0)
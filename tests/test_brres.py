@@ -1,8 +1,13 @@
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 
+import numpy as np
+
 from abmatt.brres import Brres
+from abmatt.brres.srt0.srt0_animation import SRTKeyFrameList
 
 
 class MyTestCase(unittest.TestCase):
@@ -33,6 +38,159 @@ class MyTestCase(unittest.TestCase):
         for x in self.original_model.polygons:
             self.assertEqual(x, )
 
+class TestMemoryMap(unittest.TestCase):
+    def test_save_over_mapped_file(self):
+        test_file = '../brres_files/test.brres'
+        shutil.copy('../brres_files/beginner_course.brres', test_file)
+        Brres.MEMORY_MAP = True
+        try:
+            brres = Brres(test_file)
+        finally:
+            Brres.MEMORY_MAP = False
+        self.assertEqual(type(brres.textures[0].data), memoryview)
+        expected = brres.textures[0].data.tobytes()
+        self.assertTrue(brres.save(overwrite=True))
+        self.assertIsNone(brres.mapped_file)
+        self.assertEqual(type(brres.textures[0].data), bytes)
+        self.assertEqual(Brres(test_file).textures[0].data, expected)
+
+
+class TestLazyLoad(unittest.TestCase):
+    def test_subfiles_unpacked_on_access(self):
+        Brres.LAZY_LOAD = True
+        try:
+            brres = Brres('../brres_files/beginner_course.brres')
+        finally:
+            Brres.LAZY_LOAD = False
+        model = brres.models[0]
+        self.assertFalse(model.is_loaded())
+        self.assertFalse(brres.textures[0].is_loaded())
+        self.assertEqual(len(model.materials), 22)
+        self.assertTrue(model.is_loaded())
+        self.assertIs(model.srt0_collection, brres.srt0[0])
+        self.assertFalse(brres.textures[0].is_loaded())
+
+
+class TestPassThrough(unittest.TestCase):
+    def test_unmodified_file_saved_as_is(self):
+        test_file = '../brres_files/test.brres'
+        self.assertTrue(Brres('../brres_files/cow.brres').save(test_file, True))
+        with open('../brres_files/cow.brres', 'rb') as f:
+            expected = f.read()
+        with open(test_file, 'rb') as f:
+            self.assertEqual(f.read(), expected)
+
+    def test_modified_model_repacked(self):
+        test_file = '../brres_files/test.brres'
+        brres = Brres('../brres_files/beginner_course.brres')
+        material = brres.models[0].materials[0]
+        material.set_str('cullmode', 'all')
+        self.assertTrue(material.is_modified)
+        expected = brres.textures[0].section.data.tobytes()
+        self.assertTrue(brres.save(test_file, True))
+        self.assertIsNone(brres.models[0].section)
+        test = Brres(test_file)
+        self.assertEqual(test.models[0].materials[0].cullmode, material.cullmode)
+        self.assertEqual(test.textures[0].section.data.tobytes()[16:], expected[16:])
+
+
+class TestPointData(unittest.TestCase):
+    def test_points_decoded_as_arrays(self):
+        brres = Brres('../brres_files/beginner_course.brres')
+        vertices = brres.models[0].vertices[0]
+        self.assertEqual(vertices.data.shape, (vertices.count, vertices.point_width))
+        self.assertEqual(vertices.data.dtype, vertices.dtype)
+        test_file = '../brres_files/test.brres'
+        brres.models[0].mark_modified()
+        brres.save(test_file, True)
+        self.assertTrue((Brres(test_file).models[0].vertices[0].data == vertices.data).all())
+
+
+class TestOpenFileIndex(unittest.TestCase):
+    def setUp(self):
+        self.tmp = tempfile.TemporaryDirectory()
+        self.course_file = os.path.join(self.tmp.name, 'course.brres')
+        self.cow_file = os.path.join(self.tmp.name, 'cow.brres')
+        shutil.copy('../brres_files/beginner_course.brres', self.course_file)
+        shutil.copy('../brres_files/cow.brres', self.cow_file)
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_find_texture(self):
+        course = Brres(self.course_file)
+        cow = Brres(self.cow_file)
+        tex0 = course.textures[0]
+        course.rename_texture(tex0, 'renamed_tex0')
+        self.assertIs(course.getTexture('renamed_tex0'), tex0)
+        self.assertIs(cow.findTexture('renamed_tex0'), tex0)
+        self.assertIsNone(course.findTexture('renamed_tex0'))
+        course.remove_tex0('renamed_tex0')
+        self.assertIsNone(cow.findTexture('renamed_tex0'))
+        other = course.textures[1]
+        course.rename_texture(other, 'other_tex0')
+        self.assertIs(cow.findTexture('other_tex0'), other)
+        course.close(False)
+        self.assertIsNone(cow.findTexture('other_tex0'))
+
+    def test_get_brres(self):
+        cow = Brres(self.cow_file)
+        self.assertIs(Brres.get_brres(self.cow_file), cow)
+        cow.close(False)
+        self.assertIsNot(Brres.get_brres(self.cow_file), cow)
+
+
+class TestShaderStateKey(unittest.TestCase):
+    def test_key_updated_on_modify(self):
+        materials = Brres('../brres_files/beginner_course.brres').models[0].materials
+        shader = materials[0].shader
+        other = materials[1].shader
+        other.paste(shader)
+        self.assertEqual(shader.get_state_key(), other.get_state_key())
+        stage = other.stages[0]
+        stage['colorscale'] = 'divideby2' if stage['colorscale'] != 'divideby2' else 'multiplyby2'
+        self.assertNotEqual(shader, other)
+        stage['colorscale'] = shader.stages[0]['colorscale']
+        self.assertEqual(shader, other)
+        other.setIndMap(3)
+        self.assertNotEqual(shader.get_state_key(), other.get_state_key())
+
+
+class TestSrtKeyFrames(unittest.TestCase):
+    def test_get_values(self):
+        frames = SRTKeyFrameList(20)
+        frames.setKeyFrame(2.0, 10)
+        frames.setKeyFrame(1.0, 15, 0.5)
+        self.assertEqual(len(frames), 3)
+        self.assertEqual(frames.getValue(15), 1.0)
+        self.assertIsNone(frames.getValue(5))
+        values = frames.get_values([-1, 0, 5, 10, 12.5, 15, 20])
+        self.assertTrue(np.allclose(values[[0, 1, 3, 5, 6]], [0, 0, 2, 1, 1]))
+        # hermite midpoints: average of the end points plus an eighth of the tangent difference
+        self.assertAlmostEqual(values[2], 1 + (frames.deltas[0] - frames.deltas[1]) * 10 / 8)
+        self.assertAlmostEqual(values[4], 1.5 + (frames.deltas[1] - 0.5) * 5 / 8)
+        self.assertEqual(frames.get_values().shape, (20,))
+        frames.removeKeyFrame(10)
+        self.assertEqual(frames.entries[1], SRTKeyFrameList.SRTKeyFrame(1.0, 15, 0.5))
+        frames.setFrameCount(12)
+        self.assertTrue(frames.isFixed())
+
+    def test_unpack_pack(self):
+        brres = Brres('../brres_files/beginner_course.brres')
+        animation = brres.srt0[0].collection[0].tex_animations[0]
+        key_frames = [x for x in animation.animations.values() if not x.isFixed()][0]
+        self.assertEqual(key_frames.frames.dtype, float)
+        key_frames.setKeyFrame(0.5, 1)
+        animation.mark_modified()
+        test_file = '../brres_files/test.brres'
+        brres.save(test_file, True)
+        test = Brres(test_file).srt0[0].collection[0].tex_animations[0]
+        for key in animation.animations:
+            expected = animation.animations[key]
+            for x in ('frames', 'values', 'deltas'):   # saved as 32 bit floats
+                self.assertTrue(np.allclose(getattr(test.animations[key], x), getattr(expected, x)))
+
+
 if __name__ == '__main__':
     unittest.main()
     sys.exit(0)
@@ -0,0 +1,42 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from abmatt.brres import Brres
+from abmatt.brres_cache import BrresCache
+
+
+class TestBrresCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            files = []
+            for i in range(3):
+                files.append(os.path.join(tmp, 'cow{}.brres'.format(i)))
+                shutil.copy('../brres_files/cow.brres', files[-1])
+            size = Brres(files[0]).get_size_estimate()
+            self.assertGreater(size, 0)
+            cache = BrresCache(2 * size)
+            first = cache.get(files[0])
+            cache.get(files[1])
+            self.assertIs(cache.get(files[0]), first)
+            cache.get(files[2])
+            self.assertEqual([x.name for x in cache.evict()], [files[1]])
+            self.assertEqual(list(cache), [files[0], files[2]])
+            # modified files are saved on eviction
+            first.models[0].materials[0].enable_xlu(True)
+            Brres.OVERWRITE = True
+            try:
+                cache.get(files[1])
+                self.assertEqual(cache.evict(exclude=[cache[files[1]]]), [first])
+            finally:
+                Brres.OVERWRITE = False
+            self.assertTrue(cache.get(files[0]).models[0].materials[0].xlu)
+            self.assertEqual(cache.get_stats()['reloads'], 2)
+            self.assertEqual((cache.hits, cache.misses, cache.evictions), (1, 5, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
+    sys.exit(0)
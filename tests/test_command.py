@@ -0,0 +1,32 @@
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from abmatt.autofix import AutoFix
+from abmatt.brres import Brres
+from abmatt.command import Command
+from abmatt.load_config import run_jobs
+
+
+class TestRunJobs(unittest.TestCase):
+    def test_run_jobs(self):
+        app_dir = os.path.abspath('../etc/abmatt')
+        with tempfile.TemporaryDirectory() as tmp:
+            files = []
+            for i in range(3):
+                files.append(os.path.join(tmp, 'cow{}.brres'.format(i)))
+                shutil.copy('../brres_files/cow.brres', files[-1])
+            self.assertTrue(run_jobs(files, [Command('set material xlu:true for *')], None, 2, app_dir,
+                                     None, False, True))
+            for x in files:
+                self.assertTrue(all(mat.xlu for mat in Brres(x).models[0].materials))
+            self.assertFalse(run_jobs(files + [os.path.join(tmp, 'missing.brres')],
+                                      [Command('set material xlu:false for *')], None, 2, app_dir, None, False, True))
+        AutoFix.get().flush()
+
+
+if __name__ == '__main__':
+    unittest.main()
+    sys.exit(0)
@@ -0,0 +1,215 @@
+import os
+import sys
+import tempfile
+import unittest
+from types import SimpleNamespace
+
+from abmatt.brres import Brres
+import numpy as np
+
+from abmatt.converters.convert_dae import DaeConverter2
+from abmatt.converters.dae import Dae
+from abmatt.converters.geometry import decode_indices, decode_geometry_group, Geometry
+from abmatt.converters.influence import Influence, InfluenceCollection, WeightedTriGroup, decode_mdl0_influences
+from abmatt.converters.points import consolidate_data, PointCollection
+from abmatt.converters.triangle import TriangleStripper, TriangleSet
+
+
+LARGE_DAE = '''<?xml version="1.0" encoding="utf-8"?>
+<COLLADA xmlns="http://www.collada.org/2005/11/COLLADASchema" version="1.4.1">
+  <asset><unit meter="1" name="meter"/><up_axis>Y_UP</up_axis></asset>
+  <library_effects>
+    <effect id="mat-effect">
+      <profile_COMMON><technique sid="common"><phong><diffuse><color>1 1 1 1</color></diffuse></phong></technique>
+      </profile_COMMON>
+    </effect>
+  </library_effects>
+  <library_materials><material id="mat" name="mat"><instance_effect url="#mat-effect"/></material></library_materials>
+  <library_geometries>
+    <geometry id="terrain-mesh" name="terrain">
+      <mesh>
+        <source id="terrain-positions">
+          <float_array id="terrain-positions-array" count="{float_count}">{values}</float_array>
+          <technique_common>
+            <accessor source="#terrain-positions-array" count="{count}" stride="3">
+              <param name="X" type="float"/><param name="Y" type="float"/><param name="Z" type="float"/>
+            </accessor>
+          </technique_common>
+        </source>
+        <vertices id="terrain-vertices"><input semantic="POSITION" source="#terrain-positions"/></vertices>
+        <triangles material="mat" count="{tri_count}">
+          <input semantic="VERTEX" source="#terrain-vertices" offset="0"/>
+          <p>{indices}</p>
+        </triangles>
+      </mesh>
+    </geometry>
+  </library_geometries>
+  <library_visual_scenes>
+    <visual_scene id="scene" name="scene">
+      <node id="terrain" name="terrain">
+        <instance_geometry url="#terrain-mesh">
+          <bind_material><technique_common><instance_material symbol="mat" target="#mat"/></technique_common></bind_material>
+        </instance_geometry>
+      </node>
+    </visual_scene>
+  </library_visual_scenes>
+  <scene><instance_visual_scene url="#scene"/></scene>
+</COLLADA>
+'''
+
+
+class TestDecodeIndices(unittest.TestCase):
+    def test_tri_strip_and_tris(self):
+        data = bytes([0x98, 0, 5, 0, 1, 2, 3, 4,  # strip of 5 face points
+                      0x90, 0, 3, 5, 6, 7])  # triangle list
+        tris, weights = decode_indices(SimpleNamespace(data=data, facepoint_count=8), '>B')
+        self.assertEqual(tris[:, :, 0].tolist(), [[0, 1, 2], [2, 1, 3], [2, 3, 4], [5, 6, 7]])
+        self.assertEqual(weights, {})
+
+    def test_short_indices(self):
+        data = bytes([0x90, 0, 3, 0, 0xff, 5, 0, 6, 0])
+        tris, weights = decode_indices(SimpleNamespace(data=data, facepoint_count=3), '>H')
+        self.assertEqual(tris[:, :, 0].tolist(), [[0xff, 0x500, 0x600]])
+
+    def test_weight_groups(self):
+        polygon = Brres('../brres_files/cow.brres').getModel('cow').objects[0]
+        tris, weights = decode_indices(polygon, polygon.encode_str)
+        self.assertEqual(tris.shape, (polygon.face_count, 3, len(polygon.encode_str) - 1))
+        self.assertEqual(sorted(weights), [0, 118])
+
+
+class TestTriangleStripper(unittest.TestCase):
+    def test_quad_strip(self):
+        tris = np.array([[[0], [1], [2]], [[2], [1], [3]]])
+        data, face_count, facepoint_count = TriangleStripper(tris).get_tri_strips('>B')
+        self.assertEqual((face_count, facepoint_count), (2, 4))
+        self.assertEqual(data[:3], bytearray([0x98, 0, 4]))
+
+    def test_long_strip_matches_triangle_set(self):
+        n = 2000
+        tris = np.array([[[i], [i + 1], [i + 2]] if i % 2 == 0 else [[i + 1], [i], [i + 2]] for i in range(n)])
+        expected = TriangleSet(tris[:200]).get_tri_strips('>H')
+        self.assertEqual(TriangleStripper(tris[:200]).get_tri_strips('>H'), expected)
+        data, face_count, facepoint_count = TriangleStripper(tris).get_tri_strips('>H')
+        self.assertEqual(face_count, n)
+        self.assertEqual(len(data), 3 + facepoint_count * 2)
+
+
+class TestWeightedTriGroups(unittest.TestCase):
+    def test_groups_cover_triangles(self):
+        rand = np.random.RandomState(0)
+        influences = [Influence(influence_id=i) for i in range(40)]
+        vertex_influences = (np.arange(600) // 15 + rand.randint(0, 3, 600)) % 40
+        collection = InfluenceCollection({i: influences[x] for i, x in enumerate(vertex_influences)})
+        tris = np.sort(rand.randint(0, 580, (300, 1, 1)) + rand.randint(0, 20, (300, 3, 1)), axis=1)
+        tris = np.concatenate((tris, tris), axis=2)
+        groups = collection.get_weighted_tri_groups(tris)
+        self.assertLessEqual(len(groups), 10)
+        found = []
+        for group in groups:
+            matrices, indices = group.get_influence_indices()
+            self.assertLessEqual(len(matrices), WeightedTriGroup.MAX_INFLUENCES)
+            self.assertEqual(indices.shape[1:], (3, 3))
+            matrix_ids = np.array(matrices)[indices[:, :, 0] // 3]
+            self.assertEqual(matrix_ids.tolist(), vertex_influences[indices[:, :, 1]].tolist())
+            found.extend(indices[:, :, 1:].tolist())
+        self.assertEqual(sorted(found), sorted(tris.tolist()))
+
+
+class TestGeometrySplit(unittest.TestCase):
+    def setUp(self):
+        n = 20
+        x, y = np.meshgrid(np.arange(n), np.arange(n))
+        self.points = np.stack((x.ravel(), np.zeros(n * n), y.ravel()), 1).astype(float)
+        quads = (np.arange(n - 1)[:, None] * n + np.arange(n - 1)).ravel()
+        self.tris = np.concatenate((np.stack((quads, quads + n, quads + 1), 1),
+                                    np.stack((quads + 1, quads + n, quads + n + 1), 1)))
+
+    def test_split_chunks(self):
+        geometry = Geometry('terrain', 'mat', PointCollection(self.points, self.tris),
+                            texcoords=[PointCollection(self.points[:, :2], self.tris)])
+        self.assertEqual(geometry.split(), [geometry])
+        chunks = geometry.split(100)
+        self.assertGreater(len(chunks), 1)
+        found = []
+        for x in chunks:
+            self.assertLessEqual(len(x.vertices), 100)
+            self.assertEqual(len(x.texcoords[0]), len(x.vertices))
+            found.extend(x.vertices.points[x.vertices.face_indices].tolist())
+            size = x.vertices.points.max(axis=0) - x.vertices.points.min(axis=0)
+            self.assertLess(size[0] * size[2], 200)  # spatially compact
+        self.assertEqual(sorted(found), sorted(self.points[self.tris].tolist()))
+
+    def test_encode_split(self):
+        mdl0 = Brres('../brres_files/beginner_course.brres').models[0]
+        count = len(mdl0.objects)
+        geometry = Geometry('terrain', mdl0.materials[0].name, PointCollection(self.points, self.tris))
+        geometry.MAX_POINTS = 100
+        polygons = geometry.encode(mdl0)
+        self.assertEqual(len(mdl0.objects) - count, len(polygons))
+        self.assertEqual(sum(x.face_count for x in polygons), len(self.tris))
+        for x in polygons:
+            self.assertIs(x.get_material(), mdl0.materials[0])
+            self.assertEqual(x.encode_str, '>B')
+
+
+    def test_import_large_dae(self):
+        n = 260     # more than 0xffff vertices
+        x, y = np.meshgrid(np.arange(n), np.arange(n))
+        points = np.stack((x.ravel(), np.zeros(n * n), y.ravel()), 1).astype(float)
+        quads = (np.arange(n - 1)[:, None] * n + np.arange(n - 1)).ravel()
+        tris = np.concatenate((np.stack((quads, quads + n, quads + 1), 1),
+                               np.stack((quads + 1, quads + n, quads + n + 1), 1)))
+        with tempfile.TemporaryDirectory() as tmp:
+            dae_file = os.path.join(tmp, 'terrain.dae')
+            with open(dae_file, 'w') as f:
+                f.write(LARGE_DAE.format(count=len(points), values=' '.join(str(x) for x in points.ravel()),
+                                         float_count=points.size, tri_count=len(tris),
+                                         indices=' '.join(str(x) for x in tris.ravel())))
+            geometry = Dae(dae_file).get_scene()[0].geometries[0]
+            self.assertTrue((geometry.vertices.face_indices == tris).all())
+            converter = DaeConverter2(Brres(os.path.join(tmp, 'terrain.brres'), readFile=False), dae_file)
+            converter.DETECT_FILE_UNITS = False
+            mdl0 = converter.load_model()
+        self.assertGreater(len(mdl0.objects), 1)
+        self.assertEqual(sum(x.face_count for x in mdl0.objects), len(tris))
+        found = []
+        for x in mdl0.objects:
+            face_points, weights = decode_indices(x, x.encode_str)
+            found.extend(decode_geometry_group(x.get_vertex_group())[face_points[:, :, 0]].tolist())
+        self.assertTrue(sorted(map(sorted, found)) == sorted(map(sorted, points[tris].tolist())))
+
+
+class TestEncodeWeighted(unittest.TestCase):
+    def test_influences_remapped(self):
+        mdl0 = Brres('../brres_files/simple_multi_bone.brres').models[0]
+        influences = decode_mdl0_influences(mdl0)
+        points = np.array([[0, 0, 0], [1, 0, 0], [0, 0, 0], [0, 1, 0], [5, 5, 5]], float)  # 2 is a duplicate, 4 unused
+        collection = InfluenceCollection({i: influences[i % 2] for i in range(5)})
+        geometry = Geometry('weighted', mdl0.materials[0].name, PointCollection(points, np.array([[0, 1, 3], [2, 3, 1]])),
+                            influences=collection)
+        geometry.encode(mdl0)
+        self.assertEqual(collection.influences, {0: influences[0], 1: influences[1], 2: influences[1]})
+        self.assertEqual({type(x) for x in collection.influences}, {int})
+
+
+class TestConsolidateData(unittest.TestCase):
+    def test_duplicates_and_unused_removed(self):
+        points = np.array([[1, 2], [3, 4], [1, 2], [5, 6], [3, 4]])
+        face_indices = np.array([[2, 0, 1], [4, 2, 0]])
+        points, face_indices, remapper = consolidate_data(points, face_indices)
+        self.assertEqual(points.tolist(), [[1, 2], [3, 4]])
+        self.assertEqual(face_indices.tolist(), [[0, 0, 1], [1, 0, 0]])
+        self.assertEqual(remapper[[0, 1, 2, 4]].tolist(), [0, 1, 0, 1])
+
+    def test_no_gain(self):
+        points = np.array([[1.0], [2.0], [3.0]])
+        face_indices = np.array([[0, 1, 2]])
+        result = consolidate_data(points, face_indices)
+        self.assertIs(result[0], points)
+        self.assertIsNone(result[2])
+
+
+if __name__ == '__main__':
+    unittest.main()
+    sys.exit(0)
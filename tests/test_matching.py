@@ -0,0 +1,37 @@
+import sys
+import unittest
+
+from abmatt.brres import Brres
+from abmatt.brres.lib.matching import Matching, MATCHING
+
+
+class TestIndexedMatching(unittest.TestCase):
+    def setUp(self):
+        self.materials = Brres('../brres_files/beginner_course.brres').models[0].materials
+        self.assertGreaterEqual(len(self.materials), Matching.INDEX_MIN_SIZE)
+
+    def test_same_as_scanning(self):
+        names = ['*', 'ef_', 'EF_', 'lc_ami', 'LC_AMI', 'ef.*', 'EF.*', 'l?c.*', '.*ami', 'nothing', '[', 'b|l', 'ami$']
+        for case_sensitive in (True, False):
+            for partial in (0, 1, 2):
+                for regex in (0, 1, 2):
+                    indexed = Matching(case_sensitive, partial, regex)
+                    scanning = Matching(case_sensitive, partial, regex)
+                    scanning.INDEX_MIN_SIZE = len(self.materials) + 1
+                    for name in names:
+                        self.assertEqual(indexed.findAll(name, self.materials),
+                                         scanning.findAll(name, self.materials))
+                    self.assertEqual(len(indexed.indexes), 1)
+
+    def test_index_updates(self):
+        material = self.materials[3]
+        self.assertEqual(MATCHING.findAll(material.name, self.materials), [material])
+        material.rename('renamed_material')
+        self.assertEqual(MATCHING.findAll('renamed_material', self.materials), [material])
+        self.materials.remove(material)
+        self.assertEqual(MATCHING.findAll('renamed_material', self.materials), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
+    sys.exit(0)
@@ -3,7 +3,10 @@ import unittest
 
 import numpy as np
 
-from abmatt.converters.matrix import srt_to_matrix, matrix_to_srt
+from abmatt.brres import Brres
+from abmatt.converters.influence import decode_mdl0_influences, apply_influences, get_world_positions, Joint, \
+    Influence, Weight
+from abmatt.converters.matrix import srt_to_matrix, matrix_to_srt, apply_matrix
 
 
 class TestMatrix(unittest.TestCase):
@@ -30,6 +33,36 @@ class TestMatrix(unittest.TestCase):
         self.assertTrue(np.allclose(translation, t, atol=0.0001))
 
 
+class TestSkinning(unittest.TestCase):
+    def test_apply_matrix(self):
+        matrix = srt_to_matrix((1, 2, 1), (90.0, 0.0, -90.0), (-2255.436, -129.5237, 1528.046))
+        points = np.random.RandomState(0).rand(20, 3)
+        expected = [np.dot(matrix[:3], np.append(x, 1)) for x in points]
+        self.assertTrue(np.allclose(apply_matrix(matrix, points), expected))
+
+    def test_apply_influences(self):
+        mdl0 = Brres('../brres_files/simple_multi_bone.brres').models[0]
+        influences = decode_mdl0_influences(mdl0)
+        influences = [influences[i % len(influences)] for i in range(30)]
+        influences[3] = Influence({x.name: Weight(x, 0.5) for x in mdl0.bones[:2]})  # mixed are ignored
+        points = np.random.RandomState(0).rand(30, 3)
+        for decode in (True, False):
+            expected = [x.apply_to(y, decode) for x, y in zip(influences, points)]
+            self.assertTrue(np.allclose(apply_influences(influences, points, decode), expected))
+
+    def test_world_positions_cached(self):
+        bones = Brres('../brres_files/simple_multi_bone.brres').models[0].bones
+        bone = bones[-1]
+        expected = np.dot(bone.get_inv_transform_matrix(), Joint.get_world_position(bone.get_bone_parent()))
+        self.assertTrue(np.allclose(get_world_positions(bones)[-1], expected))
+        self.assertIs(Joint.get_world_position(bone), get_world_positions([bone])[0])
+        parent = bone.get_bone_parent()
+        parent.transform_matrix, parent.inverse_matrix = parent.inverse_matrix, parent.transform_matrix
+        self.assertNotIn('world', bone.matrix_cache)
+        expected = np.dot(bone.get_inv_transform_matrix(), Joint.get_world_position(bone.get_bone_parent()))
+        self.assertTrue(np.allclose(Joint.get_world_position(bone), expected))
+
+
 if __name__ == '__main__':
     unittest.main()
     sys.exit(0)
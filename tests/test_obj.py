@@ -0,0 +1,78 @@
+import os
+import sys
+import tempfile
+import unittest
+from threading import Thread
+
+import numpy as np
+
+from abmatt.brres import Brres
+from abmatt.converters.convert_obj import ObjConverter
+from abmatt.converters.obj import Obj, ObjGeometry
+from abmatt.converters.points import PointCollection
+
+
+class TestObj(unittest.TestCase):
+    def test_save_and_parse(self):
+        vertices = np.array([[0, 0, 0], [1.5, 0, 0], [0, -2.25, 1], [1, 1, 1]])
+        normals = np.array([[0, 1, 0], [0, 0, 1]])
+        triangles = np.array([[[0, 0], [1, 0], [2, 1]], [[1, 1], [3, 1], [2, 0]]])
+        with tempfile.TemporaryDirectory() as tmp:
+            obj = Obj(os.path.join(tmp, 'test.obj'), False)
+            geometry = ObjGeometry('test')
+            geometry.vertices = PointCollection(vertices, triangles[:, :, 0])
+            geometry.normals = PointCollection(normals, triangles[:, :, 1])
+            geometry.triangles = triangles
+            geometry.material_name = 'mat'
+            obj.geometries.append(geometry)
+            obj.save()
+            with open(obj.filename) as f:
+                self.assertIn('v 0 -2.25 1\nv 1 1 1\n', f.read())
+            parsed = Obj(obj.filename).geometries[0]
+        self.assertTrue(parsed.has_normals)
+        self.assertFalse(parsed.has_texcoords)
+        self.assertTrue((parsed.vertices.points == vertices).all())
+        self.assertTrue((parsed.normals.points == normals).all())
+        self.assertTrue((parsed.triangles == triangles).all())
+
+    def test_quads_rejected(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'quad.obj')
+            with open(filename, 'w') as f:
+                f.write('v 0 0 0 1\nv 1 0 0 1\nv 1 1 0 1\nv 0 1 0 1\nvt 0 0 0\no quad\nf 1/1 2/1 3/1 4/1\n')
+            obj = Obj(filename)
+        self.assertEqual(obj.vertices.shape, (4, 3))
+        self.assertEqual(obj.texcoords.shape, (1, 2))
+        self.assertFalse(obj.geometries)
+
+    def test_mixed_width_points(self):
+        points = Obj.parse_points(['1 2 3', '4 5 6', '7 8 9 0.5 0.5 0.5'], 3)
+        self.assertEqual(points.tolist(), [[1, 2, 3], [4, 5, 6], [7, 8, 9]])
+        points = Obj.parse_points(['1 2 3 1', '4 5 6 1\n'], 3)
+        self.assertEqual(points.tolist(), [[1, 2, 3], [4, 5, 6]])
+
+
+class TestObjConverter(unittest.TestCase):
+    def test_concurrent_conversions(self):
+        cwd = os.getcwd()
+        with tempfile.TemporaryDirectory() as tmp:
+            converters = []
+            for i in range(2):
+                brres = Brres('../brres_files/beginner_course.brres')
+                converters.append(ObjConverter(brres, os.path.join(tmp, str(i), 'course.obj'), encode=False))
+                os.mkdir(converters[-1].base_dir)
+            threads = [Thread(target=x.convert) for x in converters]
+            for x in threads:
+                x.start()
+            for x in threads:
+                x.join()
+            self.assertEqual(os.getcwd(), cwd)
+            for x in converters:
+                obj = Obj(x.mdl_file)
+                self.assertEqual(len(obj.materials), len(x.mdl0.materials))
+                self.assertTrue(os.path.exists(x.get_path(next(iter(obj.images)))))
+
+
+if __name__ == '__main__':
+    unittest.main()
+    sys.exit(0)
@@ -0,0 +1,38 @@
+import io
+import json
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+
+from abmatt.command import Command
+from abmatt.server import CommandServer
+
+
+class TestCommandServer(unittest.TestCase):
+    def test_serve_stream(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            filename = os.path.join(tmp, 'cow.brres')
+            shutil.copy('../brres_files/cow.brres', filename)
+            requests = [{'id': 1, 'command': 'set material xlu:true for * in file ' + filename},
+                        {'id': 2, 'command': 'info material xlu for mat_body'},
+                        {'id': 3, 'command': 'bogus'},
+                        {'id': 4, 'command': 'save overwrite'},
+                        {'id': 5, 'command': 'quit'},
+                        {'id': 6, 'command': 'info material'}]
+            instream = io.StringIO('\n'.join(json.dumps(x) for x in requests) + '\nnot json\n')
+            outstream = io.StringIO()
+            CommandServer().serve_stream(instream, outstream)
+            responses = [json.loads(x) for x in outstream.getvalue().splitlines()]
+            self.assertEqual([(x['id'], x['ok']) for x in responses], [(1, True), (2, True), (3, False), (4, True), (5, True)])
+            self.assertIn('xlu:True', responses[1]['messages'][0]['message'])
+            self.assertEqual(responses[2]['messages'][0]['level'], 'ERROR')
+            self.assertFalse(Command.OPEN_FILES)
+            with open(filename, 'rb') as f, open('../brres_files/cow.brres', 'rb') as original:
+                self.assertNotEqual(f.read(), original.read())
+
+
+if __name__ == '__main__':
+    unittest.main()
+    sys.exit(0)
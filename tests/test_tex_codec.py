@@ -0,0 +1,132 @@
+import os
+import sys
+import tempfile
+import unittest
+
+import numpy as np
+
+from abmatt import tex_codec
+from abmatt.brres import Brres
+from abmatt.image_converter import ImgConverter, ImgConverterI
+from abmatt.texture_cache import TextureCache
+
+
+class TestTexCodec(unittest.TestCase):
+    def test_encode_decode_all_formats(self):
+        image = np.random.RandomState(0).randint(0, 256, (16, 24, 4)).astype(np.uint8)
+        for fmt in (tex_codec.I4, tex_codec.I8, tex_codec.IA4, tex_codec.IA8, tex_codec.RGB565,
+                    tex_codec.RGB5A3, tex_codec.RGBA32, tex_codec.CMPR):
+            data = tex_codec.encode(image, fmt)
+            self.assertEqual(len(data), tex_codec.get_image_size(fmt, 24, 16))
+            decoded = tex_codec.decode(data, fmt, 24, 16)
+            self.assertEqual(decoded.shape, image.shape)
+            self.assertEqual(tex_codec.encode(decoded, fmt), data)
+            self.assertEqual(tex_codec.decode(data[:tex_codec.get_image_size(fmt, 5, 3)], fmt, 5, 3).shape, (3, 5, 4))
+        self.assertTrue((tex_codec.decode(tex_codec.encode(image, tex_codec.RGBA32), tex_codec.RGBA32, 24, 16)
+                         == image).all())
+
+    def test_reencode_textures(self):
+        brres = Brres('../brres_files/beginner_course.brres')
+        for name in ('drm_env04', 'bc_spot1', 'ef_rainbowRed2'):
+            tex0 = brres.getTexture(name)
+            image = tex_codec.decode(tex0.data, tex0.format, tex0.width, tex0.height)
+            self.assertEqual(tex_codec.encode(image, tex0.format), tex0.data)
+
+    def test_decode_mips(self):
+        tex0 = Brres('../brres_files/beginner_course.brres').getTexture('lc_ami')
+        images = tex_codec.decode_mips(tex0.data, tex0.format, tex0.width, tex0.height, int(tex0.num_mips))
+        self.assertEqual([x.shape[:2] for x in images], [(128, 128), (64, 64), (32, 32)])
+
+    def test_native_converter(self):
+        brres = Brres('../brres_files/beginner_course.brres')
+        tex0 = brres.getTexture('bc_spot1')
+        converter = ImgConverter.Native()
+        converter.convert(tex0, 'cmpr')
+        self.assertEqual((tex0.format, tex0.num_mips), (14, 0))
+        converter.set_mipmap_count(tex0, -1)
+        self.assertEqual(tex0.num_mips, 3)
+        self.assertEqual(len(tex0.data), tex_codec.get_data_size(14, 64, 64, 3))
+        converter.set_dimensions(tex0, 32, 16)
+        self.assertEqual((tex0.width, tex0.height, tex0.num_mips), (32, 16, 3))
+
+    def test_parallel_batch_encode(self):
+        brres = Brres('../brres_files/beginner_course.brres')
+        converter = ImgConverter.Native()
+        with tempfile.TemporaryDirectory() as tmp:
+            converter.batch_decode(brres.textures[:6], tmp)
+            files = [os.path.join(tmp, x.name + '.png') for x in brres.textures[:6]]
+            results = []
+            for jobs in (1, 3):
+                ImgConverterI.JOBS = jobs
+                try:
+                    tex0s = converter.batch_encode(files, Brres('../brres_files/cow.brres'), 'rgb5a3', 1)
+                finally:
+                    ImgConverterI.JOBS = 1
+                results.append([(x.name, x.num_mips, x.data) for x in tex0s])
+        self.assertEqual([x[0] for x in results[0]], [x.name for x in brres.textures[:6]])
+        self.assertEqual(results[0], results[1])
+
+
+class TestTextureCache(unittest.TestCase):
+    def test_lru_eviction(self):
+        with tempfile.TemporaryDirectory() as tmp:
+            cache = TextureCache(tmp, 3 * (TextureCache.HEADER_SIZE + 100))
+            for i in range(4):
+                cache.put(str(i), (8, 8, 0, bytes([i]) * 100, None))
+                cache.get('0')
+            self.assertEqual(list(cache.entries), ['2', '3', '0'])
+            self.assertIsNone(cache.get('1'))
+            self.assertEqual(TextureCache(tmp, cache.max_size).get('3'), (8, 8, 0, bytes([3]) * 100, None))
+
+    def test_unwritable_dir(self):
+        brres = Brres('../brres_files/beginner_course.brres')
+        converter = ImgConverter.Native()
+        with tempfile.TemporaryDirectory() as tmp:
+            image = converter.decode(brres.textures[0], tmp)
+            cache_dir = os.path.join(tmp, 'cache')
+            open(cache_dir, 'w').close()  # a file in the way of the cache directory
+            ImgConverterI.CACHE = cache = TextureCache(cache_dir, 0x1000000)
+            try:
+                self.assertFalse(cache.put('0', (8, 8, 0, bytes(100), None)))
+                tex0 = converter.encode(image, Brres('../brres_files/cow.brres'))
+            finally:
+                ImgConverterI.CACHE = None
+        self.assertTrue(cache.write_failed)
+        self.assertFalse(cache.entries)
+        self.assertEqual((tex0.width, tex0.height), (brres.textures[0].width, brres.textures[0].height))
+
+    def test_encode_hit(self):
+        brres = Brres('../brres_files/beginner_course.brres')
+        converter = ImgConverter.Native()
+        with tempfile.TemporaryDirectory() as tmp:
+            image = converter.decode(brres.textures[0], tmp)
+            ImgConverterI.CACHE = cache = TextureCache(os.path.join(tmp, 'cache'), 0x1000000)
+            try:
+                first = converter.encode(image, Brres('../brres_files/cow.brres'), check=True)
+                second = converter.batch_encode([image], Brres('../brres_files/cow.brres'), check=True)[0]
+            finally:
+                ImgConverterI.CACHE = None
+        self.assertEqual((cache.hits, cache.misses), (1, 1))
+        self.assertEqual((first.width, first.height, first.num_mips, first.data),
+                         (second.width, second.height, second.num_mips, second.data))
+
+    def test_codec_version_miss(self):
+        brres = Brres('../brres_files/beginner_course.brres')
+        converter = ImgConverter.Native()
+        version = tex_codec.VERSION
+        with tempfile.TemporaryDirectory() as tmp:
+            image = converter.decode(brres.textures[0], tmp)
+            ImgConverterI.CACHE = cache = TextureCache(os.path.join(tmp, 'cache'), 0x1000000)
+            try:
+                converter.encode(image, Brres('../brres_files/cow.brres'))
+                tex_codec.VERSION = version + 1
+                converter.encode(image, Brres('../brres_files/cow.brres'))
+            finally:
+                ImgConverterI.CACHE = None
+                tex_codec.VERSION = version
+        self.assertEqual((cache.hits, cache.misses), (0, 2))
+
+
+if __name__ == '__main__':
+    unittest.main()
+    sys.exit(0)
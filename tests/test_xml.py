@@ -1,6 +1,10 @@
 import sys
 import unittest
 
+import numpy as np
+
+from abmatt.converters.convert_lib import float_to_str, floats_to_str, ints_to_str
+from abmatt.converters.dae import Dae, parse_array
 from abmatt.converters.xml import XML
 
 
@@ -12,6 +16,34 @@ class MyTestCase(unittest.TestCase):
         self.assertTrue(root.children)
 
 
+class TestDaeReader(unittest.TestCase):
+    def test_parse_array(self):
+        self.assertTrue((parse_array('1 2.5\n-3e2') == [1, 2.5, -300]).all())
+        self.assertTrue((parse_array(' 4 5 6 ', int) == [4, 5, 6]).all())
+        self.assertEqual(len(parse_array(None)), 0)
+
+    def test_read(self):
+        dae = Dae('../test_files/3ds_simple.DAE')
+        self.assertEqual(dae.xml.getroot().tag, 'COLLADA')
+        self.assertTrue(dae.elements_by_id)
+        self.assertTrue(all('}' not in x.tag for x in dae.elements_by_id.values()))
+        geometry = dae.decode_geometry(next(dae.xml.getroot().iter('geometry')))
+        self.assertEqual(geometry.vertices.face_indices.dtype, np.uint32)
+        self.assertEqual(geometry.vertices.points.shape[1], 3)
+
+
+class TestDaeWriter(unittest.TestCase):
+    def test_floats_to_str(self):
+        rs = np.random.RandomState(0)
+        floats = rs.randn(1000) * 10.0 ** rs.randint(-8, 6, 1000)
+        floats[:6] = [0, -0.0, 10, 100.5, 0.0000005, -2.5e-7]
+        floats[6:100] = (rs.randint(-10 ** 7, 10 ** 7, 94) + 0.5) / 1e6  # rounding ties
+        for x in (floats, floats.astype(np.float32), [1e20, np.nan, -1], np.zeros((0, 3))):
+            self.assertEqual(floats_to_str(x), ' '.join([float_to_str(y) for y in np.ravel(x)]))
+        self.assertEqual(floats_to_str(np.eye(2), '\n'), '1\n0\n0\n1')
+        self.assertEqual(ints_to_str(np.arange(6, dtype=np.uint16).reshape((2, 3))), '0 1 2 3 4 5')
+
+
 if __name__ == '__main__':
     unittest.main()
     sys.exit(0)